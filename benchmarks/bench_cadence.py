@@ -0,0 +1,133 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************   BENCHMARK: CADENCE   *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This script compares two ways of measuring the cadence of the launches per company, base and country (see
+# cadence.py), without any network:
+#   - "pandas":     go through the groups one by one, with the time-based rolling windows of pandas and a Python
+#                   loop for the streaks
+#   - "vectorized": launch_cadence(), which sorts the launches once and works on NumPy arrays
+# The launches of launches_until_2022.csv are replicated (with new ids) to reach the requested sizes. For each size
+# and grouping it prints the best time of both ways, and checks that they give the same values: the script exits
+# with an error otherwise. The pandas way is only run up to PANDAS_MAX_SIZE, it gets slow beyond.
+#
+# Usage: python benchmarks/bench_cadence.py [size ...]
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from spaceflight.cadence import CADENCE_GROUPS, RATE_WINDOWS, SUCCESS_WINDOW, cadence_summary, launch_cadence
+from spaceflight.storage import read_csv_typed
+
+# runs of every measure, the best one is kept
+REPEATS = 3
+
+# largest size the pandas way is run on
+PANDAS_MAX_SIZE = 100
+
+
+# 1) replicate
+# This Function replicates the typed launches `size` times, with new ids.
+#   As Arguments, the function takes the typed DataFrame and the number of copies
+#   It returns the typed DataFrame of all the copies
+def replicate(typed, size):
+    offset = int(typed['id'].max()) + 1
+    return pd.concat([typed.assign(id=typed['id'] + copy * offset) for copy in range(size)], ignore_index=True)
+
+
+# 2) with_pandas
+# The previous way: one group after the other.
+#   As Arguments, the function takes the typed launches and the column they are grouped by
+#   It returns the DataFrame of the same columns as launch_cadence
+def with_pandas(res, by):
+    res = res.dropna(subset=['date', by])
+    res = res.assign(date=res['date'].dt.tz_convert(None)).sort_values([by, 'date'], kind="stable")
+    frames = []
+    for group, launches in res.groupby(by, observed=True, sort=True):
+        dates = pd.DatetimeIndex(launches['date'])
+        frame = {'group': str(group), 'id': launches['id'].to_numpy(), 'date': dates,
+                 'gap_days': dates.to_series().diff().dt.total_seconds().to_numpy() / 86400}
+        for days in RATE_WINDOWS:
+            frame['launches_{0}d'.format(days)] = pd.Series(1, index=dates).rolling("{0}D".format(days)).sum() \
+                .to_numpy().astype(int)
+        status = launches['status']
+        successes = pd.Series(status.fillna(False).to_numpy(dtype=float), index=dates)
+        known = pd.Series(status.notna().to_numpy(dtype=float), index=dates)
+        window = "{0}D".format(SUCCESS_WINDOW)
+        frame['success_rate_{0}d'.format(SUCCESS_WINDOW)] = (successes.rolling(window).sum() /
+                                                             known.rolling(window).sum().replace(0, np.nan)).to_numpy()
+        streaks, streak = [], 0
+        for success in status.fillna(False):
+            streak = streak + 1 if success else 0
+            streaks.append(streak)
+        frame['success_streak'] = streaks
+        frames.append(pd.DataFrame(frame))
+    return pd.concat(frames, ignore_index=True)
+
+
+# 3) best_time
+# This Function runs a function REPEATS times and gives its best time in seconds and its result
+def best_time(func, *args, **kwargs):
+    best, result = None, None
+    for repeat in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+# 4) same_values
+# This Function tells whether the pandas way and the vectorized way give the same values
+def same_values(expected, found):
+    if len(expected) != len(found):
+        return False
+    for column in expected:
+        left, right = expected[column].to_numpy(), found[column].to_numpy()
+        if left.dtype.kind == "f" or right.dtype.kind == "f":
+            if not np.allclose(left.astype(float), right.astype(float), equal_nan=True):
+                return False
+        elif not (left == right).all():
+            return False
+    return True
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [1, 10, 100]
+    typed = read_csv_typed(os.path.join(ROOT, "launches_until_2022.csv"))
+    errors = []
+
+    print("{0:>5} {1:<8} {2:>9} {3:>12} {4:>12} {5:>10}".format("size", "by", "launches", "pandas", "vectorized",
+                                                                  "summary"))
+    for size in sizes:
+        res = replicate(typed, size)
+        for by in CADENCE_GROUPS:
+            vectorized_time, found = best_time(launch_cadence, res, by)
+            summary_time, summary = best_time(cadence_summary, res, by)
+            pandas_time = None
+            if size <= PANDAS_MAX_SIZE:
+                pandas_time, expected = best_time(with_pandas, res, by)
+                if not same_values(expected, found.drop(columns=['by'])):
+                    errors.append("{0}x {1}: the vectorized cadence differs from the pandas one".format(size, by))
+            if summary['launches'].sum() != len(found):
+                errors.append("{0}x {1}: the summary does not count every launch".format(size, by))
+            print("{0:>4}x {1:<8} {2:>9} {3:>12} {4:>10.1f}ms {5:>8.1f}ms".format(
+                size, by, len(found), "-" if pandas_time is None else "{0:.1f}ms".format(pandas_time * 1000),
+                vectorized_time * 1000, summary_time * 1000))
+
+    if errors:
+        print("\n".join(errors))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************   BENCHMARK: DATABASE  *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This script compares two ways of answering filtered questions on the launches, without any network:
+#   - "pandas":   load all the typed launches (see storage.py) and filter the DataFrame, as before
+#   - "database": ask the SQLite database of the launches (see database.py), which reads the indexes
+# The launches of launches_until_2022.csv are replicated (with new ids) to reach the requested sizes, and upserted
+# in a temporary database. For each size it prints the time of the upsert, then for every question the best time
+# of both ways and the plan of the database query: every question must be answered through an index ("SEARCH ...
+# USING INDEX"), the script exits with an error if one reads the whole table ("SCAN launches").
+#
+# Usage: python benchmarks/bench_database.py [size ...]
+
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from spaceflight.database import LaunchStore
+from spaceflight.storage import read_csv_typed
+
+# runs of every question, the best one is kept
+REPEATS = 20
+
+# the questions: name -> filters of LaunchStore.count (see database.py)
+QUESTIONS = {
+    "Falcon 9 from SLC-40 in 2021": {'rocket': "Falcon 9", 'pad': "SLC-40", 'year': 2021},
+    "SpaceX launches": {'company': "SpaceX"},
+    "launches from China in the 2010s": {'country': "China", 'start': "2010-01-01", 'end': "2020-01-01"},
+    "launches in 1999": {'year': 1999},
+}
+
+
+# 1) replicate
+# This Function replicates the typed launches `size` times, with new ids.
+#   As Arguments, the function takes the typed DataFrame and the number of copies
+#   It returns the typed DataFrame of all the copies
+def replicate(typed, size):
+    offset = int(typed['id'].max()) + 1
+    return pd.concat([typed.assign(id=typed['id'] + copy * offset) for copy in range(size)], ignore_index=True)
+
+
+# 2) with_pandas
+# The previous way: filter the DataFrame of all the launches (the loading time is measured apart)
+def with_pandas(res, rocket=None, pad=None, company=None, country=None, year=None, start=None, end=None):
+    mask = pd.Series(True, index=res.index)
+    if rocket is not None:
+        mask &= res['title_1'].astype(str).str.startswith(rocket)
+    if pad is not None:
+        mask &= res['base'].astype(str).str.split(", ", n=1).str[0] == pad
+    if company is not None:
+        mask &= res['company'] == company
+    if country is not None:
+        mask &= res['Country'] == country
+    if year is not None:
+        mask &= res['year'] == year
+    if start is not None:
+        mask &= res['date'] >= start
+    if end is not None:
+        mask &= res['date'] < end
+    return int(mask.sum())
+
+
+# 3) best_time
+# This Function runs a function REPEATS times and gives its best time in seconds and its result
+def best_time(func, *args, **kwargs):
+    best, result = None, None
+    for repeat in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [1, 10, 100]
+    typed = read_csv_typed(os.path.join(ROOT, "launches_until_2022.csv"))
+    errors = []
+
+    for size in sizes:
+        res = replicate(typed, size)
+        with tempfile.TemporaryDirectory() as directory:
+            with LaunchStore(os.path.join(directory, "launches.sqlite")) as store:
+                start = time.perf_counter()
+                store.upsert(res, "Past")
+                print("{0}x: {1:0.0f} launches upserted in {2:0.3f}s".format(size, len(res),
+                                                                            time.perf_counter() - start))
+
+                print("  {0:<36} {1:>8} {2:>12} {3:>12}   {4}".format("question", "launches", "pandas", "database",
+                                                                     "plan"))
+                for question, filters in QUESTIONS.items():
+                    pandas_time, expected = best_time(with_pandas, res, **filters)
+                    database_time, found = best_time(store.count, **filters)
+                    plan = store.explain(**filters).replace("\n", "; ")
+                    print("  {0:<36} {1:>8} {2:>10.3f}ms {3:>10.3f}ms   {4}".format(
+                        question, found, pandas_time * 1000, database_time * 1000, plan))
+                    if found != expected:
+                        errors.append("{0}x {1}: {2} launches instead of {3}".format(size, question, found, expected))
+                    if "SCAN launches" in plan:
+                        errors.append("{0}x {1}: the query reads the whole table".format(size, question))
+
+    if errors:
+        print("\n".join(errors))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
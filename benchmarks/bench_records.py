@@ -0,0 +1,101 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************   BENCHMARK: RECORDS   *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This script compares the two ways of building the DataFrame of the scraped launches, without any network:
+#   - "frames":  one single-row DataFrame per launch, concatenated per page and then across the pages
+#                (what scrape_page and scrape_past_launches used to do)
+#   - "records": one dictionary per launch and a single DataFrame built at the end (see records.py)
+# The launches are taken from launches_until_2022.csv and replicated to reach the requested sizes.
+# For each size it prints the time and the peak memory allocated (tracemalloc) by both ways, and checks that both
+# DataFrames give the same csv file, byte for byte: the script exits with an error otherwise.
+#
+# Usage: python benchmarks/bench_records.py [size ...]
+
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from spaceflight.records import DETAIL_COLUMNS, LAUNCH_COLUMNS, make_record, records_to_frame
+
+# launches per listing page on the website
+PAGE_SIZE = 30
+
+
+# 1) load_scraped
+# This Function rebuilds from the csv file what the scraper collects before building the DataFrame: per each
+# launch the dictionary of the listing page and the dictionary of the detail page, as strings.
+#   As Arguments, the function takes the number of launches wanted (the csv file is replicated if needed)
+#   It returns the list of (launch, detail) pairs
+def load_scraped(size):
+    csv = pd.read_csv(os.path.join(ROOT, "launches_until_2022.csv"), dtype=str)
+    rows = csv.to_dict('records')
+    scraped = []
+    for i in range(size):
+        row = rows[i % len(rows)]
+        launch = {'id': i}
+        launch.update({column: row[column] for column in LAUNCH_COLUMNS})
+        detail = {column: row[column] for column in DETAIL_COLUMNS if isinstance(row[column], str)}
+        scraped.append((launch, detail))
+    return scraped
+
+
+# 2) build_with_frames
+# The previous way: a single-row DataFrame per launch and two rounds of pd.concat
+def build_with_frames(scraped):
+    pages = []
+    for start in range(0, len(scraped), PAGE_SIZE):
+        page = scraped[start:start + PAGE_SIZE]
+        page_details = [pd.DataFrame(detail, index=[launch['id']]) for launch, detail in page]
+        res = pd.DataFrame([launch for launch, detail in page]).set_index('id')
+        res['date'] = pd.to_datetime(res['date'])
+        res_2 = pd.concat(page_details, sort=False)
+        res[res_2.columns] = res_2
+        pages.append(res)
+    return pd.concat(pages, sort=True)
+
+
+# 3) build_with_records
+# The new way: a dictionary per launch and one DataFrame at the end
+def build_with_records(scraped):
+    return records_to_frame([make_record(launch, detail) for launch, detail in scraped])
+
+
+# 4) measure
+# This Function runs a builder and returns its duration in seconds, its peak allocated memory in MB and the
+# DataFrame built
+def measure(builder, scraped):
+    tracemalloc.start()
+    start = time.perf_counter()
+    res = builder(scraped)
+    duration = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return duration, peak, res
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [300, 3000]
+    print("{0:>8} {1:>12} {2:>12} {3:>12} {4:>12} {5:>8}".format(
+        "launches", "frames s", "records s", "frames MB", "records MB", "speedup"))
+    errors = []
+    for size in sizes:
+        scraped = load_scraped(size)
+        frames_time, frames_peak, frames = measure(build_with_frames, scraped)
+        records_time, records_peak, records = measure(build_with_records, scraped)
+        print("{0:>8} {1:>12.3f} {2:>12.3f} {3:>12.1f} {4:>12.1f} {5:>7.1f}x".format(
+            size, frames_time, records_time, frames_peak, records_peak, frames_time / records_time))
+        if frames.to_csv() != records.to_csv():
+            errors.append("{0} launches: the csv of the records differs from the csv of the frames".format(size))
+
+    if errors:
+        print("\n".join(errors))
+        sys.exit(1)
@@ -0,0 +1,95 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************  BENCHMARK: REEXTRACT  *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This script measures the archive of the pages (see archive.py), without any network: the listing and detail
+# pages of the launches of launches_until_2022.csv (replicated with new ids to reach the requested sizes) are
+# built as the website shows them (see fixtures.py) and appended to a temporary archive. For each size it prints
+# the size of the pages and of the archive, the time of the appends, then the time of reextract() for every
+# number of worker processes, and checks that the launches extracted are those of the pages: the script exits
+# with an error otherwise.
+#
+# Usage: python benchmarks/bench_reextract.py [size ...]
+
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from spaceflight.archive import PageArchive, reextract
+from spaceflight.fixtures import PAGE_SIZE, load_launches, render_detail_page, render_listing_page
+from spaceflight.storage import launches_path
+
+# numbers of worker processes measured
+WORKERS = [1, 2, 4]
+
+
+# 1) replicate
+# This Function replicates the fixture launches `size` times, with new ids.
+#   As Arguments, the function takes the DataFrame of strings returned by load_launches and the number of copies
+#   It returns the DataFrame of all the copies
+def replicate(launches, size):
+    offset = launches['id'].astype(int).max() + 1
+    return pd.concat([launches.assign(id=(launches['id'].astype(int) + copy * offset).astype(str))
+                      for copy in range(size)], ignore_index=True)
+
+
+# 2) build_archive
+# This Function appends the listing and detail pages of the launches to an archive.
+#   As Arguments, the function takes the launches and the path of the archive
+#   It returns the number of bytes of the pages
+def build_archive(launches, path):
+    size = 0
+    with PageArchive(path) as archive:
+        for page in range(1, (len(launches) + PAGE_SIZE - 1) // PAGE_SIZE + 1):
+            html = render_listing_page(launches, page).encode()
+            archive.append("https://nextspaceflight.com/launches/past/?page={0}".format(page), html)
+            size += len(html)
+        for row in launches.to_dict('records'):
+            html = render_detail_page(row).encode()
+            archive.append("https://nextspaceflight.com/launches/details/{0}".format(row['id']), html)
+            size += len(html)
+    return size
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [1, 10]
+    fixtures = load_launches()
+    errors = []
+
+    for size in sizes:
+        launches = replicate(fixtures, size)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pages.archive")
+            start = time.perf_counter()
+            pages = build_archive(launches, path)
+            print("{0}x: {1:0.0f} pages, {2:0.1f} MB archived in {3:0.1f} MB, in {4:0.2f}s".format(
+                size, len(launches) + (len(launches) + PAGE_SIZE - 1) // PAGE_SIZE, pages / 1e6,
+                os.path.getsize(path) / 1e6, time.perf_counter() - start))
+
+            for workers in WORKERS:
+                start = time.perf_counter()
+                saved = reextract(path, ("Past",), workers, directory)
+                print("  {0} workers: {1:0.0f} launches extracted in {2:0.2f}s".format(
+                    workers, saved.get("Past", 0), time.perf_counter() - start))
+
+                res = pd.read_csv(launches_path("Past", "csv", directory), dtype=str, keep_default_na=False)
+                if res['id'].tolist() != launches['id'].tolist() or \
+                        res['title_2'].tolist() != launches['title_2'].tolist():
+                    errors.append("{0}x, {1} workers: the launches extracted differ from the pages".format(
+                        size, workers))
+
+    if errors:
+        print("\n".join(errors))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************    BENCHMARK: SUITE    *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This script measures the functions of the program (spaceflight/scraper.py and charts.py) without the website,
+# so that a change can be checked to make the program faster (or at least not slower):
+#   - the scraping functions (get_detailed_info, scrape_page and the whole scrape_past_launches path) download
+#     the pages from a local server answering like nextspaceflight.com (see serve_fixtures in fixtures.py), which
+#     waits LATENCY seconds before each answer to imitate the round-trip to the website
+#   - read_csv (raw and typed), launch_cadence and the plot_* functions read the launches of launches_until_2022.csv replicated
+#     SCALE times (with new ids), e.g. 1x, 10x and 100x
+# Each measure runs in its own process, so that the peak memory (RSS) reported is the one of that function only
+# (plus the libraries it imports); the local server runs in the process of the script. For every measure the
+# script prints the best time of REPEATS runs, the throughput (launches or pages per second) and the peak RSS,
+# and compares the time with the baseline stored in benchmarks/baseline.json: a measure slower than the baseline
+# by more than TOLERANCE is a regression, and the script exits with an error. The baseline depends on the
+# machine, store a new one (--save-baseline) before comparing changes on another machine.
+#
+# Usage: python benchmarks/bench_suite.py [--scales 1 10 100] [--latency 0.02] [--pages 5] [--repeats 3]
+#                                         [--only read_csv ...] [--save-baseline] [--client urllib|aiohttp]
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+from spaceflight import fixtures
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# File of the stored baseline: {"<measure>@<scale>x": seconds}
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# A measure slower than its baseline by more than this share, and by more than MIN_SLOWDOWN seconds (the
+# measures of a few milliseconds vary too much from a run to the next), is a regression
+TOLERANCE = 0.25
+MIN_SLOWDOWN = 0.05
+
+# Number of detail pages downloaded by the get_detailed_info measure
+DETAIL_PAGES = 50
+
+# The measures: name -> (function preparing it, unit of the throughput), see measure() below
+MEASURES = {}
+
+
+# 1) measure
+# This decorator registers a measure. The function is called in the folder of the dataset with the scraper module
+# (its base_url pointing to the local server), the charts module and the options: it prepares what the measure needs
+# and returns the function which is timed, returning the number of items processed (the throughput is items per
+# second).
+#   As Arguments, the decorator takes the unit of the throughput
+def measure(unit):
+    def register(func):
+        MEASURES[func.__name__] = (func, unit)
+        return func
+    return register
+
+
+@measure("pages/s")
+def get_detailed_info(scraper, charts, options):
+    ids = list(pd.read_csv("launches_until_2022.csv", usecols=['id'], nrows=DETAIL_PAGES)['id'])
+
+    def run():
+        for launch_id in ids:
+            scraper.get_detailed_info(launch_id)
+        return len(ids)
+    return run
+
+
+@measure("launches/s")
+def scrape_page(scraper, charts, options):
+    return lambda: len(scraper.scrape_page(1))
+
+
+@measure("launches/s")
+def scrape_past_launches(scraper, charts, options):
+    # the scraped launches are written in a folder of their own, not over the dataset served
+    os.makedirs("scraped", exist_ok=True)
+
+    def run():
+        os.chdir("scraped")
+        try:
+            scraper.scrape_past_launches(options.pages)
+            return len(scraper.read_csv("Past"))
+        finally:
+            os.chdir("..")
+    return run
+
+
+@measure("launches/s")
+def read_csv(scraper, charts, options):
+    return lambda: len(scraper.read_csv("Past"))
+
+
+@measure("launches/s")
+def read_csv_typed(scraper, charts, options):
+    # the first call builds the Parquet/Feather file, we measure the following ones
+    scraper.read_csv("Past", normalized=True)
+    return lambda: len(scraper.read_csv("Past", normalized=True))
+
+
+@measure("launches/s")
+def load_cube(scraper, charts, options):
+    charts.load_cube("Past")
+    return lambda: int(charts.load_cube("Past")['launches'].sum())
+
+
+# the three charts are measured the same way, on the cube of the launches (see cube.py)
+def plot(name):
+    def run_plot(scraper, charts, options):
+        cube = charts.load_cube("Past")
+        launches = int(cube['launches'].sum())
+
+        def run():
+            getattr(charts, name)(cube)
+            charts.plt.close('all')
+            return launches
+        return run
+    run_plot.__name__ = name
+    return measure("launches/s")(run_plot)
+
+
+for plot_name in ["plot_launches_by_country", "plot_launches_byCountryYear", "plot_launches_USAvsRUSSIA"]:
+    plot(plot_name)
+
+
+@measure("charts/s")
+def render_reports(scraper, charts, options):
+    # all the charts, and the reports of the 10 largest companies and of every decade, in png, drawn by one worker
+    # process per core (see render_charts in charts.py)
+    cube = charts.load_cube("Past")
+    os.makedirs("charts", exist_ok=True)
+    return lambda: len(charts.render_charts(cube, "charts", ["png"], ["company", "decade"], top=10))
+
+
+@measure("launches/s")
+def launch_cadence(scraper, charts, options):
+    # the cadence of every launch per company, base and country (see cadence.py)
+    from spaceflight.cadence import launch_cadence
+    res = scraper.read_csv("Past", normalized=True)
+    return lambda: len(launch_cadence(res)) // 3
+
+
+# 2) make_dataset
+# This Function writes in a folder the csv file of the launches replicated `scale` times: the copies get new ids
+# so that every launch is different, and keep the order of the file (newest first) copy after copy.
+#   As Arguments, the function takes the folder and the scale
+def make_dataset(directory, scale):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "launches_until_2022.csv")
+    if os.path.exists(path):
+        return path
+    csv = pd.read_csv(os.path.join(ROOT, "launches_until_2022.csv"), dtype=str, keep_default_na=False)
+    offset = int(csv['id'].astype(int).max()) + 1
+    copies = []
+    for copy in range(scale):
+        replica = csv.copy()
+        replica['id'] = (replica['id'].astype(int) + copy * offset).astype(str)
+        replica['link'] = "/launches/details/" + replica['id']
+        copies.append(replica)
+    pd.concat(copies, ignore_index=True).to_csv(path, index=False)
+    return path
+
+
+# 3) run_measure
+# This Function runs one measure in the current process (it is called in a child process by run_in_process).
+#   As Arguments, the function takes the name of the measure, the folder of the dataset, the base url of the
+#   local server and the options
+#   It returns a dictionary with the best time in seconds, the items processed and the peak RSS in MB
+def run_measure(name, directory, base_url, options):
+    from spaceflight import fetching
+
+    os.chdir(directory)
+    from spaceflight import charts, scraper
+    from spaceflight.vehicles import vehicle_specs
+
+    # all the output of the scraper (RES tables, live feedback) is hidden, the local server does not need to be
+    # spared and every run downloads the pages again
+    scraper.print = lambda *args, **kwargs: None
+    fetching.rate_limiter.requests_per_second = 0
+    fetching.use_cache(None)
+    if options.client == "aiohttp":
+        from spaceflight import async_fetching
+        async_fetching.use_async_client()
+
+    scraper.base_url = base_url
+    run = MEASURES[name][0](scraper, charts, options)
+    best, items = None, 0
+    for repeat in range(options.repeats):
+        # the specs of the rockets remembered by a run would spare the next runs their work (see vehicles.py),
+        # every run starts without them
+        vehicle_specs.clear()
+        start = time.perf_counter()
+        items = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {'seconds': best, 'items': items, 'peak_rss_mb': peak_rss()}
+
+
+# 3.1) peak_rss
+# This Function gives the peak memory (RSS) of the current process in MB. On Linux it is read from /proc
+# (VmHWM), since ru_maxrss also counts the memory of the parent process before the child was started
+def peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+# 3.2) run_in_process
+# This Function runs a measure in a new process and returns its result
+def run_in_process(name, directory, base_url, options):
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(run_measure, (name, directory, base_url, options))
+
+
+# 4) compare
+# This Function compares a time with its baseline.
+#   It returns the text shown in the last column and whether it is a regression
+def compare(key, seconds, baseline):
+    if key not in baseline:
+        return "no baseline", False
+    ratio = seconds / baseline[key]
+    if ratio > 1 + TOLERANCE and seconds - baseline[key] > MIN_SLOWDOWN:
+        return "REGRESSION x{0:.2f}".format(ratio), True
+    return "x{0:.2f}".format(ratio), False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the scraper and of the charts")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="sizes of the dataset, as multiples of launches_until_2022.csv")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every answer of the server")
+    parser.add_argument("--pages", type=int, default=5, help="listing pages scraped by scrape_past_launches")
+    parser.add_argument("--repeats", type=int, default=3, help="runs of every measure, the best one is kept")
+    parser.add_argument("--only", nargs="+", choices=sorted(MEASURES), help="measures to run (by default all)")
+    parser.add_argument("--client", choices=["urllib", "aiohttp"], default="urllib", help="HTTP client")
+    parser.add_argument("--save-baseline", action="store_true", help="store the times as the new baseline")
+    parser.add_argument("--data", default=os.path.join(tempfile.gettempdir(), "spaceflight_bench"),
+                        help="folder where the datasets are written")
+    options = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+
+    names = options.only or list(MEASURES)
+    results, regressions = {}, []
+    print("{0:<30} {1:>6} {2:>10} {3:>18} {4:>10}   {5}".format(
+        "measure", "scale", "seconds", "throughput", "peak RSS", "vs baseline"))
+    for scale in options.scales:
+        directory = os.path.join(options.data, "{0}x".format(scale))
+        server = fixtures.serve_fixtures(fixtures.load_launches(make_dataset(directory, scale)), options.latency)
+        for name in names:
+            result = run_in_process(name, directory, server.base_url, options)
+            key = "{0}@{1}x".format(name, scale)
+            results[key] = result['seconds']
+            verdict, regression = compare(key, result['seconds'], baseline)
+            if regression:
+                regressions.append(key)
+            print("{0:<30} {1:>5}x {2:>10.3f} {3:>11.0f} {4:<6} {5:>7.0f} MB   {6}".format(
+                name, scale, result['seconds'], result['items'] / result['seconds'], MEASURES[name][1],
+                result['peak_rss_mb'], verdict))
+        server.stop()
+
+    if options.save_baseline:
+        baseline.update(results)
+        with open(BASELINE, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print("baseline saved in", BASELINE)
+
+    if regressions and not options.save_baseline:
+        print("regressions:", ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
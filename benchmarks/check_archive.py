@@ -0,0 +1,113 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************     CHECK: ARCHIVE     *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This script checks that the archive of the pages (see archive.py) survives a crash, without any network: in a
+# temporary folder it archives the fixture pages (see fixtures.py), then imitates a program stopped in the middle
+# of a crawl (records written to the archive but not saved in its index, and a last record only half written),
+# opens the archive again, archives more pages and reads every page back. It also checks that a page already
+# archived is not archived again, and that the archive opened read-only (as reextract() does) lists the pages
+# without cutting a record a crawl is still writing. It exits with an error if a page read back differs from the
+# page archived.
+#
+# Usage: python benchmarks/check_archive.py
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from spaceflight import archive
+from spaceflight.archive import ArchiveReader, PageArchive
+from spaceflight.fixtures import load_launches, render_detail_page
+
+# pages archived before the crash, archived but not indexed when it happens, and archived after it
+SAVED_PAGES = 20
+UNSAVED_PAGES = 5
+LATER_PAGES = 10
+
+
+# 1) detail_pages
+# This Function builds the detail pages of the first launches of the fixtures.
+#   It returns a dictionary url -> page (bytes)
+def detail_pages(count):
+    rows = load_launches().iloc[:count].to_dict('records')
+    return {"https://nextspaceflight.com/launches/details/{0}".format(row['id']): render_detail_page(row).encode()
+            for row in rows}
+
+
+def main():
+    pages = detail_pages(SAVED_PAGES + UNSAVED_PAGES + LATER_PAGES)
+    urls = list(pages)
+    errors = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pages.archive")
+        with PageArchive(path) as pages_archive:
+            for url in urls[:SAVED_PAGES]:
+                pages_archive.append(url, pages[url])
+            if pages_archive.append(urls[0], pages[urls[0]]):
+                errors.append("a page already archived was archived again")
+
+        # the crash: the index is not saved after the last records (the connection is closed without committing)
+        # and the last record stops in the middle of the page
+        commit_every, archive.COMMIT_EVERY = archive.COMMIT_EVERY, 10 ** 6
+        pages_archive = PageArchive(path)
+        for url in urls[SAVED_PAGES:SAVED_PAGES + UNSAVED_PAGES]:
+            pages_archive.append(url, pages[url])
+        pages_archive._db.close()
+        pages_archive._file.close()
+        archive.COMMIT_EVERY = commit_every
+        size = os.path.getsize(path)
+        with open(path, "ab") as f:
+            f.write(archive.RECORD_HEADER.pack(archive.MAGIC, 40, 4000) + b"{" * 60)
+
+        with PageArchive(path) as pages_archive:
+            if os.path.getsize(path) != size:
+                errors.append("the record half written was not cut: {0} bytes instead of {1}".format(
+                    os.path.getsize(path), size))
+            for url in urls[SAVED_PAGES + UNSAVED_PAGES:]:
+                pages_archive.append(url, pages[url])
+            latest = pages_archive.latest()
+
+        reader = ArchiveReader(path)
+        try:
+            found = {}
+            for url, kind, key, body_offset, body_length, codec in latest:
+                try:
+                    found[url] = reader.read(body_offset, body_length, codec)
+                except Exception as e:
+                    errors.append("{0}: {1}".format(url, e))
+        finally:
+            reader.close()
+
+        for url in urls:
+            if url not in found:
+                errors.append("{0}: missing from the index".format(url))
+            elif found[url] != pages[url]:
+                errors.append("{0}: the page read back differs".format(url))
+
+        # a crawl is writing a record while the archive is read
+        with open(path, "ab") as f:
+            f.write(archive.RECORD_HEADER.pack(archive.MAGIC, 40, 4000) + b"{" * 60)
+        size = os.path.getsize(path)
+        with PageArchive(path, read_only=True) as pages_archive:
+            if len(pages_archive.latest()) != len(urls):
+                errors.append("the archive opened read-only lists {0} pages instead of {1}".format(
+                    len(pages_archive.latest()), len(urls)))
+        if os.path.getsize(path) != size:
+            errors.append("the archive opened read-only cut the record being written")
+
+    print("{0} pages archived, crashed, recovered and read back: {1}".format(
+        len(urls), "OK" if not errors else "{0} errors".format(len(errors))))
+    if errors:
+        print("\n".join(errors[:10]))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
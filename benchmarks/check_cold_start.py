@@ -0,0 +1,100 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************   CHECK: COLD START    *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This script starts the commands of the program in new Python processes, as a user would, on a copy of
+# launches_until_2022.csv, and measures with "python -X importtime" how long each command spends importing
+# modules. It checks that:
+#   - "plot" imports what it needs within PLOT_COLD_START_BUDGET seconds (see cli.py)
+#   - no command loads a module it does not need, e.g. "plot" must not load the HTML parsers nor the HTTP clients
+# It exits with an error if a check fails.
+#
+# Usage: python benchmarks/check_cold_start.py [number of runs]
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from spaceflight.cli import PLOT_COLD_START_BUDGET
+
+
+# the commands measured, with the modules they must not import (lxml is not checked for "plot": the pdf backend
+# of matplotlib uses it through fontTools)
+COMMANDS = {
+    "plot": (["plot"], ["bs4", "aiohttp", "IPython", "spaceflight.parsing", "spaceflight.fetching"]),
+    "export": (["export", "launches.parquet"], ["matplotlib", "bs4", "lxml", "aiohttp", "IPython"]),
+    "help": (["--help"], ["pandas", "matplotlib", "bs4", "lxml", "aiohttp", "IPython"]),
+}
+
+
+# 1) run_command
+# This Function starts a command of the program in a new process with -X importtime.
+#   As Arguments, the function takes the arguments of the command and the folder it runs in
+#   It returns the total time of the process, the time spent importing and the set of the modules imported
+def run_command(arguments, directory):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-m", "spaceflight"] + arguments, cwd=directory,
+                             env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError("spaceflight {0} failed:\n{1}".format(" ".join(arguments), process.stderr[-2000:]))
+
+    # every line is "import time: <self us> | <cumulative us> | <indentation><module>", the modules imported
+    # directly (not by another module) have no indentation
+    imports, modules = 0, set()
+    for line in process.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)", line)
+        if match:
+            modules.add(match.group(4))
+            if not match.group(3):
+                imports += int(match.group(2))
+    return elapsed, imports / 1e6, modules
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    errors = []
+
+    directory = tempfile.mkdtemp()
+    try:
+        shutil.copy(os.path.join(ROOT, "launches_until_2022.csv"), directory)
+
+        # a first run builds the columnar files and the cube, and compiles the modules
+        for name, (arguments, forbidden) in COMMANDS.items():
+            run_command(arguments, directory)
+
+        print("{0:<8} {1:>10} {2:>10}   {3}".format("command", "total", "imports", "unneeded modules loaded"))
+        for name, (arguments, forbidden) in COMMANDS.items():
+            results = [run_command(arguments, directory) for run in range(runs)]
+            elapsed = min(result[0] for result in results)
+            imports = min(result[1] for result in results)
+            loaded = sorted(module for module in forbidden
+                            if any(imported == module or imported.startswith(module + ".")
+                                   for imported in results[0][2]))
+            print("{0:<8} {1:>9.3f}s {2:>9.3f}s   {3}".format(name, elapsed, imports, ", ".join(loaded) or "-"))
+            if loaded:
+                errors.append("{0} loads {1}".format(name, ", ".join(loaded)))
+            if name == "plot" and imports > PLOT_COLD_START_BUDGET:
+                errors.append("plot spends {0:.3f}s importing, over the budget of {1}s".format(
+                    imports, PLOT_COLD_START_BUDGET))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if errors:
+        print("\n".join(errors))
+        sys.exit(1)
+    print("plot starts within its budget of {0}s".format(PLOT_COLD_START_BUDGET))
+
+
+if __name__ == "__main__":
+    main()
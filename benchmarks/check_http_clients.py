@@ -0,0 +1,97 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************   CHECK: HTTP CLIENTS  *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This script downloads the detail pages of the fixture launches from a local server (see serve_fixtures in
+# fixtures.py), which waits a little before each answer like the real website, with:
+#   - urllib and the worker threads of fetch_all, as the scraper does by default
+#   - the pooled aiohttp client (async_fetching.py) behind the same worker threads
+#   - the pooled aiohttp client downloading everything on its event loop (fetch_many)
+# It checks that every client gets the same pages, prints the time taken and the number of connections opened,
+# and then downloads the pages again from a server failing the first requests of some of the pages (always the
+# same ones, see FixtureServer in fixtures.py) to check the retries.
+#
+# Usage: python benchmarks/check_http_clients.py [number of pages] [latency in seconds]
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from spaceflight import async_fetching
+from spaceflight import fetching
+from spaceflight import fixtures
+
+
+# 1) run
+# This Function downloads the urls with one client and returns the bodies, the time taken and the number of
+# connections the server received
+def run(server, label, download_all):
+    connections = server.connections
+    start = time.perf_counter()
+    bodies = download_all()
+    elapsed = time.perf_counter() - start
+    print("{0:<32} {1:7.2f}s   {2:4d} connections".format(label, elapsed, server.connections - connections))
+    return bodies
+
+
+def main():
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    workers = 8
+
+    # the server is local, we do not need to be polite with it
+    fetching.rate_limiter.requests_per_second = 0
+    fetching.BACKOFF = 0.01
+
+    launches = fixtures.load_launches()
+    server = fixtures.serve_fixtures(launches, latency)
+    urls = [server.base_url + "/launches/details/" + launch_id for launch_id in launches['id'][:n_pages]]
+    print("{0} pages, {1:.0f} ms of latency, {2} workers".format(len(urls), latency * 1000, workers))
+
+    def threaded():
+        return [body for status, headers, body in fetching.fetch_all(lambda url: fetching.open_url(url, {}),
+                                                                     urls, workers)]
+
+    fetching.use_http_client(fetching.UrllibClient())
+    results = {"urllib + threads": run(server, "urllib + threads", threaded)}
+
+    if async_fetching.aiohttp is None:
+        print("aiohttp is not installed, the pooled client is not checked")
+        server.stop()
+        return
+
+    client = async_fetching.use_async_client(connections_per_host=workers)
+    results["aiohttp + threads"] = run(server, "aiohttp + threads", threaded)
+    results["aiohttp fetch_many"] = run(server, "aiohttp fetch_many", lambda: client.fetch_many(urls, workers))
+    server.stop()
+
+    errors = [label for label, bodies in results.items() if bodies != results["urllib + threads"]]
+
+    # the same downloads from a server answering 503 to the first requests of 20% of the pages must still give the
+    # same pages, each failing page being requested FAILED_ATTEMPTS more times
+    flaky = fixtures.serve_fixtures(launches, latency, error_rate=0.2)
+    flaky_urls = [url.replace(server.base_url, flaky.base_url) for url in urls]
+    bodies = client.fetch_many(flaky_urls, workers)
+    failing = len(flaky.attempts)
+    print("with 503 answers on {0} pages: {1} requests for {2} pages".format(failing, flaky.requests, len(urls)))
+    flaky.stop()
+    if bodies != results["urllib + threads"]:
+        errors.append("retries")
+    if flaky.requests != len(urls) + failing * fixtures.FAILED_ATTEMPTS:
+        errors.append("retries: {0} requests instead of {1}".format(
+            flaky.requests, len(urls) + failing * fixtures.FAILED_ATTEMPTS))
+
+    client.close()
+    if errors:
+        print("different pages:", ", ".join(errors))
+        sys.exit(1)
+    print("all the clients downloaded the same pages")
+
+
+if __name__ == "__main__":
+    main()
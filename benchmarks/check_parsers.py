@@ -0,0 +1,244 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************   CHECK: HTML PARSERS  *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This script checks that every HTML parser available gives, field for field, the launches the fixture pages
+# were built from (see fixtures.py), and times the parsing of the pages with each of them:
+#   - "full tree": the whole page parsed with html.parser, as the scraper used to do
+#   - each available parser (html.parser, lxml) with the SoupStrainers of parsing.py (lxml parses the whole page)
+# For the detail pages of rockets whose specs are already known, only the status is read (see parse_status): the
+# script also checks and times it with each parser.
+# The same pages are checked again with a head holding the classes and tags the extraction looks for inside a
+# script and a comment (see misleading_page): a parser must follow the structure of the page, not its text.
+# The fixture pages are written by fixtures.py, hence the script also checks every parser on the pages saved from
+# nextspaceflight.com in benchmarks/pages (see benchmarks/save_pages.py): there the reference is the full tree
+# parsed with html.parser, the way the scraper always read the website.
+# It exits with an error if any parser extracts something different.
+#
+# Usage: python benchmarks/check_parsers.py [number of listing pages]
+
+import math
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from spaceflight import fixtures
+from spaceflight import parsing
+from spaceflight.parsing import parse_detail, parse_listing, parse_page_count, parse_status
+
+# folder of the pages saved from the website (see save_pages.py)
+PAGES_DIRECTORY = os.path.join(ROOT, "benchmarks", "pages")
+
+
+# 1) available_parsers
+# This Function lists the parsers BeautifulSoup can use here
+def available_parsers():
+    parsers = ["html.parser"]
+    try:
+        import lxml
+        parsers.append("lxml")
+    except ImportError:
+        pass
+    return parsers
+
+
+# 2) same
+# This Function compares two extracted values, NaN being equal to NaN
+def same(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+# 2.1) full_tree
+# This Function makes parsing.py parse the whole pages (no strainer) when `enabled`, and gives back the previous
+# strainers to restore them with restore()
+def full_tree(enabled):
+    names = ["LISTING_STRAINER", "PAGINATION_STRAINER", "DETAIL_STRAINER", "STATUS_STRAINER"]
+    previous = {name: getattr(parsing, name) for name in names}
+    if enabled:
+        for name in names:
+            setattr(parsing, name, None)
+    return previous
+
+
+def restore(previous):
+    for name, value in previous.items():
+        setattr(parsing, name, value)
+
+
+# 2.2) misleading_page
+# This Function adds to the head of a page a script and a comment holding the markup of the elements the
+# extraction looks for, as the scripts of the website may do: they are text, not elements of the page.
+#   As Arguments, the function takes the page (bytes)
+#   It returns the page (bytes)
+def misleading_page(html):
+    head = (b"<script>var templates = ['<div class=\"mdl-grid\">', '<div class=\"mdl-card__supporting-text\">', "
+            b"'<h6 class=\"status\">', '<button class=\"mdc-button mdc-button--raised\">'];</script>"
+            b"<!-- <footer> <div class=\"mdl-card__supporting-text\"> -->")
+    return html.replace(b"</head>", head + b"</head>", 1)
+
+
+# 3) check
+# This Function parses the pages with one parser and returns the list of differences with the expected values
+# and the time spent parsing
+def check(parser, listing_pages, detail_pages, launches, whole_pages=False):
+    errors = []
+    previous = full_tree(whole_pages)
+    try:
+        start = time.perf_counter()
+        listings = [parse_listing(html, future, parser) for page, future, html in listing_pages]
+        n_pages = parse_page_count(listing_pages[0][2], parser)
+        details = [parse_detail(html, parser) for row, html in detail_pages]
+        duration = time.perf_counter() - start
+    finally:
+        restore(previous)
+
+    for (page, future, html), launches_found in zip(listing_pages, listings):
+        expected = fixtures.expected_listing(launches, page, future)
+        if launches_found != expected:
+            errors.append("listing page {0} (future={1}): {2} != {3}".format(
+                page, future, launches_found[:1], expected[:1]))
+
+    if n_pages != (len(launches) + fixtures.PAGE_SIZE - 1) // fixtures.PAGE_SIZE:
+        errors.append("page count: {0}".format(n_pages))
+
+    for (row, html), infos in zip(detail_pages, details):
+        expected = fixtures.expected_detail(row)
+        if infos.keys() != expected.keys() or not all(same(infos[k], expected[k]) for k in expected):
+            errors.append("detail page {0}: {1} != {2}".format(row['id'], infos, expected))
+
+    return errors, duration
+
+
+# 4) check_status
+# This Function reads only the status of the detail pages with one parser and returns the list of differences with
+# the expected values and the time spent parsing
+def check_status(parser, detail_pages):
+    start = time.perf_counter()
+    statuses = [parse_status(html, parser) for row, html in detail_pages]
+    duration = time.perf_counter() - start
+
+    errors = []
+    for (row, html), infos in zip(detail_pages, statuses):
+        expected = fixtures.expected_detail(row)['status']
+        if not same(infos['status'], expected):
+            errors.append("status of detail page {0}: {1} != {2}".format(row['id'], infos['status'], expected))
+    return errors, duration
+
+
+# 5) saved_pages
+# This Function reads the pages saved from the website: listing_past_<page>.html, listing_future_<page>.html and
+# detail_<id>.html in PAGES_DIRECTORY.
+#   It returns the list of (file name, kind of page, page) tuples, kind being "Past", "Future" or "detail"
+def saved_pages():
+    pages = []
+    if not os.path.isdir(PAGES_DIRECTORY):
+        return pages
+    for name in sorted(os.listdir(PAGES_DIRECTORY)):
+        match = re.match(r"^(listing_past|listing_future|detail)_\d+\.html$", name)
+        if match:
+            with open(os.path.join(PAGES_DIRECTORY, name), "rb") as f:
+                kind = {"listing_past": "Past", "listing_future": "Future"}.get(match.group(1), "detail")
+                pages.append((name, kind, f.read()))
+    return pages
+
+
+# 5.1) extract_saved
+# This Function extracts a saved page with one parser: the launches of a listing page (and the number of pages
+# of the first ones), the details and the status of a detail page
+def extract_saved(kind, html, parser):
+    if kind == "detail":
+        return parse_detail(html, parser), parse_status(html, parser)
+    return parse_listing(html, kind == "Future", parser), parse_page_count(html, parser)
+
+
+# 5.2) check_saved
+# This Function checks every parser on the saved pages against the full tree parsed with html.parser.
+#   It returns the list of differences
+def check_saved(pages):
+    errors = []
+    for name, kind, html in pages:
+        previous = full_tree(True)
+        try:
+            expected = extract_saved(kind, html, "html.parser")
+        finally:
+            restore(previous)
+        for parser in available_parsers():
+            try:
+                found = extract_saved(kind, html, parser)
+            except Exception as e:
+                errors.append("{0} with {1}: {2!r}".format(name, parser, e))
+                continue
+            if not same_extraction(found, expected):
+                errors.append("{0} with {1}: {2} != {3}".format(name, parser, found, expected))
+    return errors
+
+
+# 5.3) same_extraction
+# This Function compares two extractions of a page, NaN being equal to NaN
+def same_extraction(a, b):
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same_extraction(a[key], b[key]) for key in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(same_extraction(x, y) for x, y in zip(a, b))
+    return same(a, b)
+
+
+if __name__ == "__main__":
+    launches = fixtures.load_launches()
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    listing_pages = [(page, future, fixtures.render_listing_page(launches, page, future).encode())
+                     for page in range(1, n_pages + 1) for future in (False, True)]
+    rows = launches.iloc[:n_pages * fixtures.PAGE_SIZE].to_dict('records')
+    detail_pages = [(row, fixtures.render_detail_page(row).encode()) for row in rows]
+
+    misleading_listing_pages = [(page, future, misleading_page(html)) for page, future, html in listing_pages]
+    misleading_detail_pages = [(row, misleading_page(html)) for row, html in detail_pages]
+
+    failed = False
+    runs = [("full tree", "html.parser", True, False)] + \
+           [(parser, parser, False, False) for parser in available_parsers()] + \
+           [("misleading/" + parser, parser, False, True) for parser in available_parsers()]
+    reference = None
+    for name, parser, whole_pages, misleading in runs:
+        if misleading:
+            errors, duration = check(parser, misleading_listing_pages, misleading_detail_pages, launches)
+        else:
+            errors, duration = check(parser, listing_pages, detail_pages, launches, whole_pages)
+        reference = reference or duration
+        print("{0:<22} {1:>4} pages {2:>8.3f} s {3:>6.1f}x   {4}".format(
+            name, len(listing_pages) + len(detail_pages), duration, reference / duration,
+            "OK" if not errors else "{0} differences".format(len(errors))))
+        for error in errors[:5]:
+            print("    " + error)
+        failed = failed or bool(errors)
+
+    for parser in available_parsers():
+        errors, duration = check_status(parser, detail_pages)
+        print("{0:<22} {1:>4} pages {2:>8.3f} s            {3}".format(
+            "status/" + parser, len(detail_pages), duration,
+            "OK" if not errors else "{0} differences".format(len(errors))))
+        for error in errors[:5]:
+            print("    " + error)
+        failed = failed or bool(errors)
+
+    pages = saved_pages()
+    if not pages:
+        print("no page saved from the website in {0}, see benchmarks/save_pages.py".format(PAGES_DIRECTORY))
+    else:
+        errors = check_saved(pages)
+        print("{0:<22} {1:>4} pages                       {2}".format(
+            "saved pages", len(pages), "OK" if not errors else "{0} differences".format(len(errors))))
+        for error in errors[:5]:
+            print("    " + error)
+        failed = failed or bool(errors)
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,96 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************   SAVE WEBSITE PAGES   *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This script saves a few pages of nextspaceflight.com in benchmarks/pages, as they are served, so that
+# benchmarks/check_parsers.py can check every parser on the real markup of the website and not only on the pages
+# written by fixtures.py:
+#   - the first listing pages of the past and of the upcoming launches (listing_past_<page>.html and
+#     listing_future_<page>.html)
+#   - the detail pages of the first launches of these pages (detail_<id>.html)
+# The pages are downloaded from the website (at the pace of the rate limiter of fetching.py), or read from the
+# archive of the pages of a previous crawl (see archive.py) with --archive, without any network.
+#
+# Usage: python benchmarks/save_pages.py [--listing 2] [--details 10] [--archive pages.archive]
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from check_parsers import PAGES_DIRECTORY
+
+
+# 1) from_website
+# This Function downloads the pages from the website.
+#   As Arguments, the function takes the number of listing pages per horizon and of detail pages
+#   It returns a dictionary file name -> page (bytes)
+def from_website(n_listing, n_details):
+    from spaceflight import scraper
+    from spaceflight.fetching import download
+    from spaceflight.parsing import parse_listing
+
+    pages, launches = {}, []
+    for future, name in ((False, "listing_past"), (True, "listing_future")):
+        for page in range(1, n_listing + 1):
+            html = download(scraper.listing_url(page, future))
+            pages["{0}_{1}.html".format(name, page)] = html
+            launches.extend(parse_listing(html, future))
+    for launch in launches[:n_details]:
+        pages["detail_{0}.html".format(launch['id'])] = download(scraper.base_url + launch['link'])
+    return pages
+
+
+# 2) from_archive
+# This Function reads the pages from the archive of a crawl: the first listing pages of each horizon and the
+# first detail pages archived (the last version of each page).
+#   As Arguments, the function takes the path of the archive, the number of listing pages per horizon and of
+#   detail pages
+#   It returns a dictionary file name -> page (bytes)
+def from_archive(path, n_listing, n_details):
+    from spaceflight.archive import ArchiveReader, PageArchive
+
+    with PageArchive(path, read_only=True) as archive:
+        latest = sorted(archive.latest(), key=lambda record: (record[1] or "", record[2] or 0))
+    reader = ArchiveReader(path)
+    pages, details = {}, 0
+    try:
+        for url, kind, key, body_offset, body_length, codec in latest:
+            if kind in ("Past", "Future") and key <= n_listing:
+                name = "listing_{0}_{1}.html".format(kind.lower(), key)
+            elif kind == "detail" and details < n_details:
+                name = "detail_{0}.html".format(key)
+                details += 1
+            else:
+                continue
+            pages[name] = reader.read(body_offset, body_length, codec)
+    finally:
+        reader.close()
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Save pages of nextspaceflight.com for check_parsers.py")
+    parser.add_argument("--listing", type=int, default=2, help="listing pages saved per horizon")
+    parser.add_argument("--details", type=int, default=10, help="detail pages saved")
+    parser.add_argument("--archive", help="read the pages from this archive instead of the website")
+    options = parser.parse_args()
+
+    if options.archive:
+        pages = from_archive(options.archive, options.listing, options.details)
+    else:
+        pages = from_website(options.listing, options.details)
+
+    os.makedirs(PAGES_DIRECTORY, exist_ok=True)
+    for name, html in pages.items():
+        with open(os.path.join(PAGES_DIRECTORY, name), "wb") as f:
+            f.write(html)
+    print("{0} pages saved in {1}".format(len(pages), PAGES_DIRECTORY))
+
+
+if __name__ == "__main__":
+    main()
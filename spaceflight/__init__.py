@@ -0,0 +1,2 @@
+# This package scrapes the rocket launches listed on nextspaceflight.com and draws charts of them. Its modules are
+# imported only when they are needed (see cli.py), hence this file imports nothing: "import spaceflight" is free.
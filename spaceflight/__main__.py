@@ -0,0 +1,7 @@
+# Entry point of "python -m spaceflight", see cli.py for the commands. The guard keeps the worker processes
+# started with "spawn" or "forkserver" (see processes.py), which import this module again, from running the command
+
+from .cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************      PAGE ARCHIVE      *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module keeps every page the crawler downloads, as it was downloaded, so that the launches can be extracted
+# again from the pages (after a change of the layout of the website broke the extraction, or to read a new field)
+# without crawling the website again:
+#   - the pages are appended, each one compressed on its own (zstd if the zstandard package is installed, zlib
+#     otherwise), to a single archive file which is never rewritten: a record is a small header (url, time of the
+#     download, codec, digest) followed by the compressed page, like the records of a WARC file
+#   - a SQLite index next to the archive gives the offset and the length of every record, hence a page is read by
+#     decompressing its bytes only. The archive is read through a memory map, the operating system only loads the
+#     parts of the file which are read
+#   - a page identical to the last version archived for its url is not archived again
+#   - the index can always be rebuilt by reading the records one after the other: when the program was stopped
+#     before the index was saved the missing records are indexed again, and a record left half written is cut
+#   - reextract() runs the extraction of parsing.py over the last version of every page of the archive in worker
+#     processes (one per core), and saves the launches as a crawl would (see save_launches in storage.py)
+
+# Json, Struct: To write the headers of the records. Hashlib: To compute the digest of the pages.
+# Mmap: To read the archive. Zlib: To compress the pages when zstandard is not installed.
+
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, quote, urlparse
+
+from .metrics import metrics
+from .processes import worker_context
+
+# Zstandard is an optional dependency: without it the pages are compressed with zlib
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# File of the archive, and extension of its index
+ARCHIVE_PATH = "pages.archive"
+INDEX_SUFFIX = ".index.sqlite"
+
+# Codec of the pages written: "zstd" or "zlib", and its level of compression
+CODEC = "zstd" if zstandard is not None else "zlib"
+COMPRESSION_LEVEL = 6
+
+# Every record starts with MAGIC, the length of its header and the length of its compressed page
+MAGIC = b"SFPA"
+RECORD_HEADER = struct.Struct("<4sII")
+
+# The index is saved every COMMIT_EVERY records (and when the archive is closed)
+COMMIT_EVERY = 100
+
+# Number of worker processes of reextract() (None: one per core)
+REEXTRACT_WORKERS = None
+
+
+# 1) compress, decompress
+# These Functions compress and decompress a page with a codec ("zstd" or "zlib")
+def compress(body, codec=CODEC):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(body)
+    return zlib.compress(body, COMPRESSION_LEVEL)
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("the archive holds zstd pages, install the zstandard package to read them")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+# 2) classify_url
+# This Function tells which page of the website a url is.
+#   As Arguments, the function takes the url
+#   It returns the kind of page ("Past" or "Future" for a listing page, "detail" for a detail page, None for
+#   another page) and its key (number of the listing page, or id of the launch)
+def classify_url(url):
+    parts = urlparse(url)
+    path = parts.path.rstrip("/")
+    if "/launches/details/" in path + "/":
+        try:
+            return "detail", int(path.rsplit("/", 1)[-1])
+        except ValueError:
+            return None, None
+    page = parse_qs(parts.query).get("page", ["1"])[0]
+    if path.endswith("/launches/past") and page.isdigit():
+        return "Past", int(page)
+    if path.endswith("/launches") and page.isdigit():
+        return "Future", int(page)
+    return None, None
+
+
+# 3) PageArchive
+# This class appends the downloaded pages to the archive and indexes them. The pages are downloaded by many
+# threads at the same time (see fetch_all in fetching.py), hence the appends are guarded by a lock.
+# Opened `read_only`, it only lists the pages of the index: the archive is neither created nor recovered (a crawl
+# may be appending to it at the same time, its last record is not cut), and append() is not allowed. The records
+# not indexed yet are left out, they are indexed the next time the archive is opened to be written.
+#   As Arguments, the constructor takes the path of the archive (created if it does not exist) and whether it is
+#   only read
+class PageArchive:
+    def __init__(self, path=ARCHIVE_PATH, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._pending = 0
+        if read_only:
+            if not os.path.exists(path + INDEX_SUFFIX):
+                raise FileNotFoundError("No index of the archive of the pages: " + path + INDEX_SUFFIX)
+            self._db = sqlite3.connect("file:" + quote(os.path.abspath(path + INDEX_SUFFIX)) + "?mode=ro", uri=True,
+                                       check_same_thread=False)
+            self._file = None
+            return
+        self._db = sqlite3.connect(path + INDEX_SUFFIX, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS records ("
+                         " offset INTEGER PRIMARY KEY,"
+                         " url TEXT NOT NULL,"
+                         " kind TEXT,"
+                         " key INTEGER,"
+                         " body_offset INTEGER NOT NULL,"
+                         " body_length INTEGER NOT NULL,"
+                         " codec TEXT NOT NULL,"
+                         " digest TEXT NOT NULL,"
+                         " size INTEGER NOT NULL,"
+                         " fetched_at REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS records_url ON records (url, offset)")
+        self._db.commit()
+
+        self._file = open(path, "ab")
+        self._recover()
+
+    # 3.1) append
+    # This Method archives a page, unless it is identical to the last version archived for its url.
+    #   As Arguments, the method takes the url and the page (bytes)
+    #   It returns True if the page was archived
+    def append(self, url, body):
+        if self.read_only:
+            raise ValueError("The archive {0} is opened read-only".format(self.path))
+        digest = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            # a page already archived is not compressed again
+            last = self._db.execute("SELECT digest FROM records WHERE url = ? ORDER BY offset DESC LIMIT 1",
+                                    (url,)).fetchone()
+            if last is not None and last[0] == digest:
+                return False
+
+            data = compress(body)
+            header = json.dumps({'url': url, 'fetched_at': time.time(), 'codec': CODEC, 'digest': digest,
+                                 'size': len(body)}).encode()
+            offset = self._file.tell()
+            self._file.write(RECORD_HEADER.pack(MAGIC, len(header), len(data)) + header + data)
+            self._file.flush()
+            self._index(offset, json.loads(header), offset + RECORD_HEADER.size + len(header), len(data))
+        metrics.count("pages_archived")
+        return True
+
+    # 3.2) latest
+    # This Method lists the last version archived of every page.
+    #   As Arguments, the method optionally takes the kind of pages wanted (see classify_url)
+    #   It returns a list of (url, kind, key, body_offset, body_length, codec) tuples
+    def latest(self, kind=None):
+        self.commit()
+        sql = "SELECT url, kind, key, body_offset, body_length, codec FROM records WHERE offset IN (" \
+              "SELECT MAX(offset) FROM records GROUP BY url)"
+        with self._lock:
+            if kind is None:
+                return self._db.execute(sql).fetchall()
+            return self._db.execute(sql + " AND kind = ?", (kind,)).fetchall()
+
+    # 3.3) commit, close
+    # These Methods save the index, and close the archive
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self):
+        self.commit()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # adds a record to the index (called with the lock held)
+    def _index(self, offset, header, body_offset, body_length):
+        kind, key = classify_url(header['url'])
+        self._db.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (offset, header['url'], kind, key, body_offset, body_length, header['codec'],
+                          header['digest'], header['size'], header['fetched_at']))
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._db.commit()
+            self._pending = 0
+
+    # indexes the records written after the last one of the index, and cuts a record left half written
+    def _recover(self):
+        row = self._db.execute("SELECT body_offset + body_length FROM records ORDER BY offset DESC LIMIT 1") \
+            .fetchone()
+        end = row[0] if row is not None else 0
+        size = os.path.getsize(self.path)
+        if size == end:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(end)
+            while end < size:
+                start = f.read(RECORD_HEADER.size)
+                if len(start) < RECORD_HEADER.size:
+                    break
+                magic, header_length, body_length = RECORD_HEADER.unpack(start)
+                body_offset = end + RECORD_HEADER.size + header_length
+                if magic != MAGIC or body_offset + body_length > size:
+                    break
+                header = json.loads(f.read(header_length))
+                f.seek(body_length, os.SEEK_CUR)
+                self._index(end, header, body_offset, body_length)
+                end = body_offset + body_length
+        self._db.commit()
+        self._pending = 0
+
+        if end < size:
+            print("The end of {0} was not written completely, {1:0.0f} bytes removed".format(self.path, size - end))
+            # truncate() does not move the position of the file, which would stay after the end
+            self._file.truncate(end)
+            self._file.seek(end)
+
+
+# 4) ArchiveReader
+# This class reads pages from the archive through a memory map.
+#   As Arguments, the constructor takes the path of the archive
+class ArchiveReader:
+    def __init__(self, path=ARCHIVE_PATH):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if os.path.getsize(path) else b""
+
+    # 4.1) read
+    # This Method reads a page of the archive.
+    #   As Arguments, the method takes the offset and the length of the compressed page and its codec (see
+    #   PageArchive.latest)
+    #   It returns the page (bytes)
+    def read(self, body_offset, body_length, codec):
+        return decompress(self._map[body_offset:body_offset + body_length], codec)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************      RE-EXTRACTION     *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# The reader of the archive of a worker process, opened once per worker by init_worker()
+reader = None
+
+
+# 5) init_worker
+# This Function is run once by every worker process when it starts: it opens the archive. In a worker process
+# (`measured`), it also forgets the measures inherited from the parent process when it is forked, the worker only
+# sends its own to the parent (see extract_measured).
+def init_worker(path, measured=False):
+    global reader
+    reader = ArchiveReader(path)
+    if measured:
+        metrics.take()
+
+
+# 5.1) extract_page
+# This Function reads a page of the archive and extracts it, in a worker process.
+#   As Arguments, the function takes the job: (kind, key, body_offset, body_length, codec)
+#   It returns (kind, key, extracted): the launches of a listing page, or the detailed information of a launch
+#   (None if the page could not be read)
+def extract_page(job):
+    from .parsing import parse_detail, parse_listing
+
+    kind, key, body_offset, body_length, codec = job
+    html = reader.read(body_offset, body_length, codec)
+    try:
+        if kind == "detail":
+            return kind, key, parse_detail(html)
+        return kind, key, parse_listing(html, future=kind == "Future")
+    except Exception as e:
+        return kind, key, None
+
+
+# 5.2) extract_measured
+# This Function extracts a page in a worker process, as extract_page, and gives back what the worker measured
+# meanwhile (pages parsed, time spent, cards dropped, see metrics.py), which would be lost with the process.
+#   It returns (result of extract_page, measures of metrics.take())
+def extract_measured(job):
+    return extract_page(job), metrics.take()
+
+
+# 5.3) close_worker
+# This Function closes the reader opened by init_worker() when the pages are extracted in the calling process
+# (the worker processes close theirs when they exit)
+def close_worker():
+    global reader
+    if reader is not None:
+        reader.close()
+        reader = None
+
+
+# 6) reextract
+# This Function extracts the launches again from the pages of the archive, without any network, and saves them
+# as a crawl would (csv, columnar files, database and cube of the horizon): the launches of the last version of
+# every listing page of the horizon, in the order of the pages (a launch listed twice is kept once), with the
+# details read from the last version of their detail page.
+#   As Arguments, the function takes the path of the archive, the horizons to extract, the number of worker
+#   processes and the folder the launches are saved in
+#   It returns a dictionary horizon -> number of launches saved
+def reextract(path=ARCHIVE_PATH, horizons=("Past", "Future"), workers=REEXTRACT_WORKERS, directory="."):
+    from .cube import refresh_cube
+    from .records import make_record, records_to_frame
+    from .storage import save_launches
+
+    if not os.path.exists(path):
+        raise FileNotFoundError("No archive of the pages: " + path)
+    # the archive is only read: a crawl may be appending pages to it meanwhile
+    with PageArchive(path, read_only=True) as archive:
+        jobs = [(kind, key, body_offset, body_length, codec)
+                for url, kind, key, body_offset, body_length, codec in archive.latest()
+                if kind == "detail" or kind in horizons]
+
+    # the pages are independent of each other: the worker processes each open the archive once and receive the
+    # jobs by batches
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    if workers <= 1:
+        init_worker(path)
+        try:
+            results = [extract_page(job) for job in jobs]
+        finally:
+            close_worker()
+    else:
+        context = worker_context()
+        results = []
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                                 initargs=(path, True)) as pool:
+            for result, measures in pool.map(extract_measured, jobs, chunksize=max(1, len(jobs) // (workers * 8))):
+                metrics.merge(measures)
+                results.append(result)
+
+    listings = {horizon: {} for horizon in horizons}
+    details = {}
+    for kind, key, extracted in results:
+        if extracted is None:
+            metrics.drop("reextract: " + kind)
+        elif kind == "detail":
+            details[key] = extracted
+        else:
+            listings[kind][key] = extracted
+
+    saved = {}
+    for horizon in horizons:
+        records, seen = [], set()
+        for page in sorted(listings[horizon]):
+            for launch in listings[horizon][page]:
+                if launch['id'] in seen:
+                    continue
+                seen.add(launch['id'])
+                if launch['id'] not in details:
+                    metrics.drop("reextract: no detail page")
+                records.append(make_record(launch, details.get(launch['id'], {})))
+        if not records:
+            continue
+        save_launches(records_to_frame(records), horizon, directory)
+        refresh_cube(horizon, directory)
+        saved[horizon] = len(records)
+    return saved
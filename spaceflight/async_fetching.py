@@ -0,0 +1,148 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************     ASYNC FETCHING     *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module sends the requests with aiohttp, an HTTP client built on asyncio. Unlike urllib, which opens a new
+# TCP+TLS connection for each page, aiohttp keeps a pool of open connections to the website and reuses them
+# (HTTP keep-alive), so after the first requests no time is lost in handshakes.
+#   - AsyncHttpClient runs an asyncio event loop in a background thread, with one aiohttp session shared by the
+#     whole program. Its request() method can be called from any thread and waits for the answer, hence it can
+#     replace the urllib client of fetching.py (see use_async_client) without changing any function of main.py
+#   - fetch_many() downloads a list of urls directly on the event loop, with a bounded number of requests in
+#     flight, for callers which do not need the worker threads
+# Every request has a timeout, and the failed requests are sent again with the same policy as fetching.py
+# (RETRIES, jittered BACKOFF, RETRY_STATUSES).
+
+import asyncio
+import atexit
+import threading
+import urllib.error
+
+from . import fetching
+
+# Aiohttp is an optional dependency: without it the program keeps using urllib
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Maximum number of open connections to the same host, and seconds an unused connection is kept open
+CONNECTIONS_PER_HOST = 16
+KEEPALIVE_TIMEOUT = 30
+
+
+# 1) AsyncHttpClient
+# This class owns the event loop thread and the aiohttp session.
+#   As Arguments, the constructor takes the timeout of a request in seconds and the maximum number of
+#   connections per host
+class AsyncHttpClient:
+    def __init__(self, timeout=fetching.TIMEOUT, connections_per_host=CONNECTIONS_PER_HOST):
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for the async HTTP client")
+        self.timeout = timeout
+        self.connections_per_host = connections_per_host
+        self.retryable_errors = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError,
+                                 OSError)
+
+        # the event loop runs in its own thread for the whole life of the client
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-http", daemon=True)
+        self._thread.start()
+        self._session = self.run(self._open_session())
+        atexit.register(self.close)
+
+    async def _open_session(self):
+        connector = aiohttp.TCPConnector(limit_per_host=self.connections_per_host,
+                                         keepalive_timeout=KEEPALIVE_TIMEOUT)
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    # 1.1) run
+    # This Method runs a coroutine on the event loop of the client and waits for its result.
+    #   As Arguments, the method takes the coroutine
+    #   It returns what the coroutine returns (or raises its exception)
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    # 1.2) request
+    # This Method sends one request, it is the synchronous method used by fetching.open_url (which handles the
+    # rate limiting and the retries).
+    #   As Arguments, the method takes the url and a dictionary of request headers
+    #   It returns the HTTP status, the response headers and the body
+    def request(self, url, headers):
+        return self.run(self.fetch(url, headers))
+
+    # 1.3) fetch
+    # This Coroutine sends one request on the shared session. As with urllib, a "304 Not Modified" is returned as
+    # a status and the other HTTP errors are raised as urllib.error.HTTPError.
+    #   As Arguments, the coroutine takes the url and a dictionary of request headers
+    #   It returns the HTTP status, the response headers and the body
+    async def fetch(self, url, headers=None):
+        async with self._session.get(url, headers=headers or {}) as response:
+            body = await response.read()
+            if response.status >= 400:
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+            return response.status, response.headers, body
+
+    # 1.4) fetch_with_retries
+    # This Coroutine sends a request and sends it again when it fails for a reason that may not happen again, as
+    # fetching.open_url does, but waiting on the event loop instead of blocking a thread.
+    #   As Arguments, the coroutine takes the url and a dictionary of request headers
+    #   It returns the HTTP status, the response headers and the body
+    async def fetch_with_retries(self, url, headers=None):
+        attempt = 0
+        while True:
+            try:
+                return await self.fetch(url, headers)
+            except Exception as e:
+                if attempt >= fetching.RETRIES or not fetching.is_retryable(e, self):
+                    raise
+            await asyncio.sleep(fetching.backoff_delay(attempt))
+            attempt += 1
+
+    # 1.5) fetch_many
+    # This Method downloads a list of urls on the event loop, with at most `concurrency` requests in flight.
+    #   As Arguments, the method takes the list of urls and the maximum number of requests in flight
+    #   It returns the list of bodies, in the same order as the urls (an exception in place of a body when a
+    #   download failed after all its retries)
+    def fetch_many(self, urls, concurrency=CONNECTIONS_PER_HOST):
+        async def fetch_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def fetch_one(url):
+                async with semaphore:
+                    return (await self.fetch_with_retries(url))[2]
+
+            return await asyncio.gather(*[fetch_one(url) for url in urls], return_exceptions=True)
+
+        return self.run(fetch_all())
+
+    # 1.6) close
+    # This Method closes the connections and stops the event loop
+    def close(self):
+        if self._loop.is_closed():
+            return
+        if self._loop.is_running():
+            self.run(self._session.close())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        self._loop.close()
+
+
+# 2) use_async_client
+# This Function makes all the downloads of fetching.py go through a pooled AsyncHttpClient. If aiohttp is not
+# installed, urllib keeps being used.
+#   It returns the client, or None if aiohttp is not installed
+def use_async_client(timeout=fetching.TIMEOUT, connections_per_host=CONNECTIONS_PER_HOST):
+    if aiohttp is None:
+        print("aiohttp is not installed, the pages are downloaded with urllib")
+        return None
+    client = AsyncHttpClient(timeout, connections_per_host)
+    fetching.use_http_client(client)
+    return client
@@ -0,0 +1,205 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************     LAUNCH CADENCE     *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module measures how often the companies, the bases and the countries launch: for every launch, the days
+# since the previous launch of its group (inter-launch gap), the number of launches of the group in the last 30,
+# 90 and 365 days, the share of successes among them and the number of successes in a row.
+# Going through every group with a Python loop (or a groupby-apply) gets slow when there are many launches, hence
+# the launches are sorted once by (group, date) into NumPy arrays (see SortedLaunches), where every group is a
+# contiguous slice of dates in increasing order:
+#   - the gaps are the differences between two neighbours of the same group
+#   - a window "the last N days" starts at the first launch whose date is after the date of the launch minus N
+#     days: one np.searchsorted over all the launches finds it for every launch at once, on a key mixing the group
+#     and the date so that a window never reaches the previous group
+#   - the successes of a window are the difference of two cumulative sums
+# The results are tidy DataFrames (one row per launch, or per group), whatever the grouping, so that they can be
+# concatenated, filtered or drawn directly.
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# the columns the launches are grouped by
+CADENCE_GROUPS = ['company', 'base', 'Country']
+
+# the windows (in days) of the launch rates, and of the success rate
+RATE_WINDOWS = (30, 90, 365)
+SUCCESS_WINDOW = 365
+
+# the columns of the launches needed (see load_launches in storage.py)
+CADENCE_SOURCE_COLUMNS = ['id', 'date', 'status'] + CADENCE_GROUPS
+
+SECONDS_PER_DAY = 86400
+
+
+# 1) SortedLaunches
+# This class holds the launches of a grouping sorted by (group, date), as NumPy arrays. The launches without a
+# date or without a group are left out, the launches of a group at the same date keep the order of the DataFrame.
+#   As Arguments, the constructor takes the DataFrame of the launches (typed, with 'date', optionally 'status'
+#   and 'id') and the column they are grouped by
+class SortedLaunches:
+    def __init__(self, res, by, windows=RATE_WINDOWS):
+        dates = res['date']
+        if getattr(dates.dt, "tz", None) is not None:
+            dates = dates.dt.tz_convert(None)
+        group = res[by].astype("category")
+        codes = group.cat.codes.to_numpy()
+        seconds = dates.to_numpy("datetime64[s]").astype(np.int64)
+
+        # np.lexsort sorts by the last key first and is stable
+        rows = np.flatnonzero((codes >= 0) & dates.notna().to_numpy())
+        self.rows = rows[np.lexsort((seconds[rows], codes[rows]))]
+        self.by = by
+        self.groups = group.cat.categories
+        self.codes = codes[self.rows]
+        self.seconds = seconds[self.rows]
+        self.dates = dates.to_numpy()[self.rows]
+        self.ids = res['id'].to_numpy()[self.rows] if 'id' in res else None
+
+        # a missing status is neither a success nor a failure
+        if 'status' in res:
+            status = res['status'].astype("boolean")
+            self.success = status.fillna(False).to_numpy(dtype=bool)[self.rows]
+            self.known = status.notna().to_numpy()[self.rows]
+        else:
+            self.success = np.zeros(len(self.rows), dtype=bool)
+            self.known = np.zeros(len(self.rows), dtype=bool)
+
+        # the position of the first launch of every group
+        self.first = np.ones(len(self.rows), dtype=bool)
+        self.first[1:] = self.codes[1:] != self.codes[:-1]
+        self.starts = np.flatnonzero(self.first)
+
+        # the key of a launch is its group times `span` plus its date: the keys increase along the arrays, and
+        # `span` being longer than all the dates plus the longest window, the key of a launch minus a window never
+        # falls in the previous group
+        origin = int(self.seconds.min()) if len(self.rows) else 0
+        longest = max(max(windows, default=0), SUCCESS_WINDOW) * SECONDS_PER_DAY
+        span = (int(self.seconds.max()) - origin if len(self.rows) else 0) + longest + 1
+        self.keys = self.codes.astype(np.int64) * span + (self.seconds - origin)
+
+    def __len__(self):
+        return len(self.rows)
+
+    # 1.1) window_starts
+    # This Method finds, for every launch, the first launch of its group in the `days` days up to it.
+    #   As Arguments, the method takes the length of the window in days
+    #   It returns the array of the positions
+    def window_starts(self, days):
+        return np.searchsorted(self.keys, self.keys - days * SECONDS_PER_DAY, side="right")
+
+    # 1.2) gaps
+    # This Method gives the days since the previous launch of the group (NaN for the first launch of a group)
+    def gaps(self):
+        gaps = np.empty(len(self.rows))
+        gaps[1:] = np.diff(self.seconds) / SECONDS_PER_DAY
+        gaps[self.first] = np.nan
+        return gaps
+
+    # 1.3) window_counts
+    # This Method gives the number of launches of the group in the `days` days up to every launch (included)
+    def window_counts(self, days):
+        return np.arange(1, len(self.rows) + 1) - self.window_starts(days)
+
+    # 1.4) success_rates
+    # This Method gives the share of successes among the launches of the group with a known status in the `days`
+    # days up to every launch (NaN when none of them has a known status)
+    def success_rates(self, days=SUCCESS_WINDOW):
+        starts = self.window_starts(days)
+        ends = np.arange(1, len(self.rows) + 1)
+        successes = np.concatenate(([0], np.cumsum(self.success)))
+        known = np.concatenate(([0], np.cumsum(self.known)))
+        successes = successes[ends] - successes[starts]
+        known = known[ends] - known[starts]
+        return np.divide(successes, known, out=np.full(len(self.rows), np.nan), where=known > 0)
+
+    # 1.5) streaks
+    # This Method gives the number of successes in a row of the group up to every launch (0 for a launch which
+    # is not a success): the streak starts after the last launch which was not a success, or at the first launch
+    # of the group
+    def streaks(self):
+        positions = np.arange(len(self.rows))
+        breaks = np.where(self.success, -1, positions)
+        breaks[self.first & self.success] = positions[self.first & self.success] - 1
+        return positions - np.maximum.accumulate(breaks) if len(self.rows) else positions
+
+    # 1.6) group_values
+    # This Method gives the group of every launch, as a Categorical of strings
+    def group_values(self):
+        return pd.Categorical.from_codes(self.codes, self.groups.astype(str))
+
+
+# 2) launch_cadence
+# This Function measures the cadence of every launch within its company, base and/or country.
+#   As Arguments, the function takes the DataFrame of the launches (typed, see normalize.py), the column(s) they
+#   are grouped by, the windows of the launch rates and the window of the success rate (in days)
+#   It returns a tidy DataFrame with one row per launch and grouping, sorted by grouping, group and date: 'by'
+#   (the column grouped by), 'group' (its value), 'id', 'date', 'gap_days', 'launches_<N>d' for every window,
+#   'success_rate_<N>d' and 'success_streak'
+def launch_cadence(res, by=CADENCE_GROUPS, windows=RATE_WINDOWS, success_window=SUCCESS_WINDOW):
+    frames = []
+    for column in [by] if isinstance(by, str) else by:
+        launches = SortedLaunches(res, column, windows)
+        frame = {'by': column, 'group': launches.group_values()}
+        if launches.ids is not None:
+            frame['id'] = launches.ids
+        frame['date'] = launches.dates
+        frame['gap_days'] = launches.gaps()
+        for days in windows:
+            frame['launches_{0}d'.format(days)] = launches.window_counts(days)
+        frame['success_rate_{0}d'.format(success_window)] = launches.success_rates(success_window)
+        frame['success_streak'] = launches.streaks()
+        frames.append(pd.DataFrame(frame))
+
+    # the groups of the groupings have different categories, we unite them instead of falling back to strings
+    groups = union_categoricals([frame['group'].array for frame in frames])
+    cadence = pd.concat([frame.drop(columns='group') for frame in frames], ignore_index=True)
+    cadence.insert(1, 'group', groups)
+    cadence['by'] = cadence['by'].astype("category")
+    return cadence
+
+
+# 3) cadence_summary
+# This Function sums the cadence up per group, from the same sorted arrays: every statistic is one reduceat over
+# the slices of the groups.
+#   As Arguments, the function takes the DataFrame of the launches, the column they are grouped by and the
+#   window of the peak launch rate (in days)
+#   It returns a DataFrame with one row per group, the most active first: 'group', 'launches', 'first' and
+#   'last' (dates), 'mean_gap_days', 'max_gap_days', 'peak_launches_<N>d', 'longest_streak' and 'success_rate'
+def cadence_summary(res, by='company', window=max(RATE_WINDOWS)):
+    launches = SortedLaunches(res, by, (window,))
+    starts = launches.starts
+    if not len(starts):
+        return pd.DataFrame(columns=['group', 'launches', 'first', 'last', 'mean_gap_days', 'max_gap_days',
+                                     'peak_launches_{0}d'.format(window), 'longest_streak', 'success_rate'])
+
+    ends = np.append(starts[1:], len(launches)) - 1
+    counts = ends - starts + 1
+    gaps = launches.gaps()
+    gaps[launches.first] = -np.inf
+    successes = np.add.reduceat(launches.success.astype(np.int64), starts)
+    known = np.add.reduceat(launches.known.astype(np.int64), starts)
+
+    summary = pd.DataFrame({
+        'group': np.asarray(launches.groups.astype(str))[launches.codes[starts]],
+        'launches': counts,
+        'first': launches.dates[starts],
+        'last': launches.dates[ends],
+        'mean_gap_days': np.divide(launches.seconds[ends] - launches.seconds[starts], (counts - 1) * SECONDS_PER_DAY,
+                                   out=np.full(len(starts), np.nan), where=counts > 1),
+        'max_gap_days': np.maximum.reduceat(gaps, starts),
+        'peak_launches_{0}d'.format(window): np.maximum.reduceat(launches.window_counts(window), starts),
+        'longest_streak': np.maximum.reduceat(launches.streaks(), starts),
+        'success_rate': np.divide(successes, known, out=np.full(len(starts), np.nan), where=known > 0),
+    })
+    summary['max_gap_days'] = summary['max_gap_days'].replace(-np.inf, np.nan)
+    return summary.sort_values(['launches', 'group'], ascending=[False, True], kind="stable") \
+        .reset_index(drop=True)
@@ -0,0 +1,310 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************         CHARTS         *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module draws the charts of the launches saved by the scraper (see scraper.py) in pdf (png, svg) files. The
+# charts read the number of launches per year, country, company and base (the cube of the launches, see cube.py):
+#   - every chart draws on a figure of its own, which is closed as soon as it is saved (even if drawing fails),
+#     hence drawing many charts does not make the memory grow
+#   - render_charts() draws the charts of the whole cube, and of subsets of it for the reports (one folder per
+#     company or per decade, see report_subsets()), in worker processes: every worker receives the cube once
+#     when it starts and the jobs only name the chart and the subset it draws
+
+# Os: To create the folders of the charts
+# Re: To turn the names of the companies into folder names
+# Contextlib: To close the figures when the with-block drawing them ends
+# Concurrent.futures: To draw the charts in worker processes
+
+import os
+import re
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+# Matplotlib.pyplot: Tools to plot our charts. The charts are only written to files, hence we use the "Agg"
+# backend, which does not need a display and is the fastest to load
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from .cube import as_cube, load_cube
+from .processes import worker_context
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Formats the charts can be saved in (the extension of their files)
+CHART_FORMATS = ("pdf", "png", "svg")
+
+# Resolution of the png files, in dots per inch
+PNG_DPI = 100
+
+# Number of worker processes drawing the charts (None: one per core). With 1 the charts are drawn in the
+# calling process
+CHART_WORKERS = None
+
+# Columns the reports can be split by (see report_subsets), and the folder the reports are written in
+REPORT_COLUMNS = ("company", "decade", "Country")
+REPORTS_DIRECTORY = "reports"
+
+# The cube the worker processes draw from, set once per worker by init_worker()
+shared_cube = None
+
+
+# 0) figure
+# This context manager creates the figure of a chart with one plot and closes it when the with-block ends, even if
+# drawing the chart failed: pyplot keeps every figure it creates until it is closed.
+#   It gives the figure and its axis
+@contextmanager
+def figure(figsize=(12, 6)):
+    fig, ax1 = plt.subplots(1, 1, figsize=figsize)
+    try:
+        yield fig, ax1
+    finally:
+        plt.close(fig)
+
+
+# 0.1) save_figure
+# This Function saves a figure in every format asked for.
+#   As Arguments, the function takes the figure, the name of the file (without extension), the folder and the
+#   formats
+#   It returns the list of the files written
+def save_figure(fig, name, directory=".", formats=("pdf",)):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for file_format in formats:
+        path = os.path.join(directory, "{0}.{1}".format(name, file_format))
+        fig.savefig(path, format=file_format, dpi=PNG_DPI if file_format == "png" else "figure")
+        paths.append(path)
+    return paths
+
+
+# **************************************************************************************************************
+# ***********************************      CHART GENERATORS    *************************************************
+# ***********************************                          *************************************************
+# ***********************************      1) by Country       *************************************************
+# **************************************************************************************************************
+
+# we wrap all the processing and printing in a function. Here we have 1 charts as output: number of launches
+# by country. The files are written in `directory`, in every one of `formats`, and their list is returned
+def plot_launches_by_country(res, directory=".", formats=("pdf",)):
+    # The charts read the number of launches per (year, Country, company, base), i.e. the cube of the launches
+    # (see cube.py) which is built once and saved next to the data. If we are given the launches themselves
+    # instead of the cube, we count them here. The Country of each launch is the last element of the base,
+    # i.e. "Site 9401 (SLS-2), Jiuquan Satellite Launch Center, China" gives "China"
+    cube = as_cube(res)
+    if cube.empty:
+        return []
+
+    # figure() is a utility wrapper creating the figure and its plot in a single call, and closing the figure
+    # at the end of the with-block
+    with figure() as (fig, ax1):
+        # We want to plot launches by country, hence we group by them, we sort by descending countries per number
+        # of launches and we plot them
+        cube.groupby('Country', observed=True)['launches'].sum().sort_values(ascending=False).head(10) \
+            .plot(ax=ax1, kind='bar', rot=30);
+
+        # we set some chart characteristics
+        ax1.xaxis.set_label_text("");
+        ax1.yaxis.set_label_text("Launches");
+        fig.tight_layout();
+
+        # and we create the files
+        return save_figure(fig, "by_country", directory, formats)
+
+
+## **************************************************************************************************************
+# ***********************************      CHART GENERATORS    *************************************************
+# ***********************************                          *************************************************
+# ***********************************    2) by Country, Year   *************************************************
+# **************************************************************************************************************
+
+# we wrap all the processing and printing in a function. Here we have 2 charts as outputs: number of launches by
+# by country and by year
+def plot_launches_byCountryYear(res, directory=".", formats=("pdf",)):
+    # The charts read the number of launches per (year, Country, company, base), i.e. the cube of the launches
+    # (see cube.py) which is built once and saved next to the data. If we are given the launches themselves
+    # instead of the cube, we count them here. The Country of each launch is the last element of the base,
+    # i.e. "Site 9401 (SLS-2), Jiuquan Satellite Launch Center, China" gives "China"
+    cube = as_cube(res)
+    if cube.empty:
+        return []
+
+    with figure() as (fig, ax1):
+        # we group by the variables we want to show in the x axis
+        cube.groupby('year')['launches'].sum().plot(ax=ax1, marker='o', color='#3f9624', markersize=10);
+
+        # we set some chart characteristics
+        ax1.xaxis.set_label_text("Take Off Countries");
+        ax1.yaxis.set_label_text("Launches");
+        ax1.grid(True)
+        fig.tight_layout();
+        paths = save_figure(fig, "by_year", directory, formats)
+
+    with figure() as (fig, ax1):
+        # we group by the variables we want to show in the x axis
+        order = cube.groupby('Country', observed=True)['launches'].sum().sort_values(ascending=False).head(10).index
+
+        # we define the legend (one color per Decade)
+        cube.assign(Decade=cube['year'] // 10 * 10).groupby(['Decade', 'Country'], observed=True)['launches'].sum() \
+            .unstack(level=0).loc[order].head(10).fillna(0) \
+            .plot(ax=ax1, kind='bar', stacked=True, rot=30);
+
+        # we set some chart characteristics
+        ax1.xaxis.set_label_text("Countries");
+        ax1.yaxis.set_label_text("Launches");
+        fig.tight_layout();
+        return paths + save_figure(fig, "by_country_year", directory, formats)
+
+
+# **************************************************************************************************************
+# ***********************************      CHART GENERATORS    *************************************************
+# ***********************************                          *************************************************
+# ***********************************     3) USA vs RUSSIA     *************************************************
+# **************************************************************************************************************
+
+# we wrap all the processing and printing in a function. Here we have 1 chart as output: number of launches by
+# year of US vs Russia
+def plot_launches_USAvsRUSSIA(res, directory=".", formats=("pdf",)):
+    # The charts read the number of launches per (year, Country, company, base), i.e. the cube of the launches
+    # (see cube.py) which is built once and saved next to the data. If we are given the launches themselves
+    # instead of the cube, we count them here. The Country of each launch is the last element of the base,
+    # i.e. "Site 9401 (SLS-2), Jiuquan Satellite Launch Center, China" gives "China"
+    cube = as_cube(res)
+
+    te = cube[cube['Country'].isin(['USA', 'Russia'])]
+    if te.empty:
+        return []
+
+    # Russia is always red and USA blue, even in the reports where only one of them launched
+    per_year = te.groupby(['year', 'Country'], observed=True)['launches'].sum().unstack() \
+        .reindex(columns=['Russia', 'USA'])
+
+    with figure() as (fig, ax1):
+        ax2 = ax1.twinx()
+
+        per_year.cumsum().fillna(0).plot(ax=ax2, marker='o', color=['r', 'b'], markersize=10)
+
+        per_year.fillna(0).plot(ax=ax1, color=['r', 'b'], kind='area', alpha=0.1, legend=False, stacked=False)
+
+        ax1.xaxis.set_label_text("");
+        ax2.yaxis.set_label_text("TotalLaunches");
+        ax1.yaxis.set_label_text("LaunchesperYear");
+        return save_figure(fig, "usa_russia", directory, formats)
+
+
+# **************************************************************************************************************
+# ***********************************      CHART RENDERING     *************************************************
+# **************************************************************************************************************
+
+# The chart functions, by the name of the job drawing them
+CHARTS = {
+    "by_country": plot_launches_by_country,
+    "by_country_year": plot_launches_byCountryYear,
+    "usa_russia": plot_launches_USAvsRUSSIA,
+}
+
+
+# 4) report_subsets
+# This Function lists the subsets of the cube drawn in the reports: one per company, per decade or per country
+# (the "decade" of a launch is its year rounded down to ten), the largest first.
+#   As Arguments, the function takes the cube, the columns the reports are split by and the number of values kept
+#   per column (None: all of them)
+#   It returns a list of (column, value, folder) tuples, the folder being relative to the folder of the reports
+def report_subsets(cube, by=(), top=None):
+    subsets = []
+    for column in by:
+        if column not in REPORT_COLUMNS:
+            raise ValueError("the reports can only be split by " + ", ".join(REPORT_COLUMNS))
+        launches = with_decade(cube).groupby(column, observed=True)['launches'].sum().sort_values(ascending=False)
+        for value in launches.index[:top]:
+            name = "{0}s".format(value) if column == "decade" else str(value)
+            subsets.append((column, value, os.path.join(column, re.sub(r"[^\w.-]+", "_", name).strip("_"))))
+    return subsets
+
+
+# 4.1) with_decade
+# This Function adds the 'decade' column to a cube, if it is not there yet
+def with_decade(cube):
+    if 'decade' in cube:
+        return cube
+    return cube.assign(decade=cube['year'] // 10 * 10)
+
+
+# 4.2) select
+# This Function gives the part of the cube a chart of a report is drawn from.
+#   As Arguments, the function takes the cube and the column and value of the subset (None: the whole cube)
+def select(cube, column=None, value=None):
+    if column is None:
+        return cube
+    if column == "decade":
+        return cube[cube['year'] // 10 * 10 == value]
+    return cube[cube[column] == value]
+
+
+# 5) init_worker
+# This Function is run once by every worker process when it starts: it keeps the cube sent by render_charts(), so
+# that the jobs do not have to carry it
+def init_worker(cube):
+    global shared_cube
+    shared_cube = cube
+
+
+# 5.1) render_job
+# This Function draws one chart of one subset of the shared cube, in a worker process (or in the calling process
+# when there is a single worker).
+#   As Arguments, the function takes the job: (name of the chart, column, value, folder, formats)
+#   It returns the list of the files written
+def render_job(job):
+    chart, column, value, directory, formats = job
+    return CHARTS[chart](select(shared_cube, column, value), directory, formats)
+
+
+# 6) render_charts
+# This Function draws the charts of a cube, and the reports of its subsets, in worker processes. The charts are
+# independent of each other, hence every (chart, subset) pair is a job of its own.
+#   As Arguments, the function takes the cube, the folder the charts are written in, the formats, the columns the
+#   reports are split by (see report_subsets), the number of values per column and the number of workers
+#   It returns the list of the files written
+def render_charts(cube, output=".", formats=("pdf",), report_by=(), top=None, workers=CHART_WORKERS):
+    for file_format in formats:
+        if file_format not in CHART_FORMATS:
+            raise ValueError("the charts can only be saved as " + ", ".join(CHART_FORMATS))
+
+    subsets = [(None, None, output)] + [(column, value, os.path.join(output, REPORTS_DIRECTORY, folder))
+                                        for column, value, folder in report_subsets(cube, report_by, top)]
+    jobs = [(chart, column, value, directory, tuple(formats))
+            for column, value, directory in subsets for chart in CHARTS]
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        init_worker(cube)
+        try:
+            return [path for job in jobs for path in render_job(job)]
+        finally:
+            init_worker(None)
+
+    # we fork the workers when it is safe: they start with matplotlib already imported (and the cube already in
+    # memory), instead of importing it again (see processes.py)
+    with ProcessPoolExecutor(workers, mp_context=worker_context(), initializer=init_worker, initargs=(cube,)) as pool:
+        return [path for paths in pool.map(render_job, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+                for path in paths]
+
+
+# 7) plot_all
+# This Function draws all the charts of a horizon, from its saved cube.
+#   As Arguments, the function takes the horizon ("Past" or "Future"), the folder of the saved launches, the folder
+#   the charts are written in, their formats, and the reports to draw (see render_charts)
+#   It returns the list of the files written
+def plot_all(horizon="Past", directory=".", output=".", formats=("pdf",), report_by=(), top=None,
+             workers=CHART_WORKERS):
+    # the charts only need the number of launches per year, country, company and base, hence we read the cube of
+    # the launches (a few thousand rows, see cube.py) instead of the launches themselves
+    res = load_cube(horizon, directory)
+
+    # we draw the charts of the data stored in res
+    return render_charts(res, output, formats, report_by, top, workers)
@@ -0,0 +1,128 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************      CHECKPOINTS       *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module lets a long crawl (the ~215 pages of past launches take about 20 minutes) be stopped and resumed
+# without starting again from page 1:
+#   - every listing page, once its launches and their details are scraped, is written with its records in a
+#     small SQLite file next to the csv files, in one transaction: a page is either completely saved or not at
+#     all, even if the program is killed while writing it
+#   - the records are not kept in memory while crawling, the memory used stays the same whatever the number of
+#     pages
+#   - when the crawl is started again with the same parameters, the pages already saved are skipped. The number of
+#     pages is not one of them: a page added on the website since the crawl was stopped makes it one page longer,
+#     it does not make it another crawl
+#   - at the end the records are read back from the file a few pages at a time to write the csv file, and the
+#     checkpoint is deleted
+# The listing pages shift when the website adds a launch, hence a crawl resumed days later may miss the launches
+# added in between: update_past_launches() in main.py adds them.
+
+import json
+import os
+import sqlite3
+import time
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Extension of the checkpoint files, added to the name of the launches file of the horizon
+CHECKPOINT_SUFFIX = ".checkpoint.sqlite"
+
+
+# 1) CrawlCheckpoint
+# This class stores the pages completed by a crawl and their records.
+#   As Arguments, the constructor takes the path of the checkpoint file, the parameters of the crawl
+#   (dictionary of what determines the pages crawled, e.g. the horizon) and whether a checkpoint left by a previous
+#   run is resumed: a checkpoint left by a crawl with other parameters is always discarded
+class CrawlCheckpoint:
+    def __init__(self, path, parameters=None, resume=True):
+        self.path = path
+        self.parameters = json.dumps(parameters or {}, sort_keys=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS crawl (parameters TEXT NOT NULL, started_at REAL NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS pages ("
+                         " page INTEGER PRIMARY KEY,"
+                         " launches INTEGER NOT NULL,"
+                         " done_at REAL NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS records ("
+                         " page INTEGER NOT NULL,"
+                         " position INTEGER NOT NULL,"
+                         " id INTEGER NOT NULL,"
+                         " record TEXT NOT NULL,"
+                         " PRIMARY KEY (page, position))")
+
+        row = self._db.execute("SELECT parameters FROM crawl").fetchone()
+        if row is not None and (not resume or row[0] != self.parameters):
+            if resume:
+                print("The checkpoint {0} was left by another crawl, starting again".format(path))
+            self._db.execute("DELETE FROM crawl")
+            self._db.execute("DELETE FROM pages")
+            self._db.execute("DELETE FROM records")
+            row = None
+        if row is None:
+            self._db.execute("INSERT INTO crawl VALUES (?, ?)", (self.parameters, time.time()))
+        self._db.commit()
+
+    # 1.1) done_pages
+    # This Method gives the pages already saved.
+    #   It returns the set of page numbers
+    def done_pages(self):
+        return {row[0] for row in self._db.execute("SELECT page FROM pages")}
+
+    # 1.2) save_page
+    # This Method saves a completed page and its records in one transaction.
+    #   As Arguments, the method takes the page number and the list of records of the page (see records.py)
+    def save_page(self, page, records):
+        with self._db:
+            self._db.execute("DELETE FROM records WHERE page = ?", (page,))
+            self._db.executemany("INSERT INTO records VALUES (?, ?, ?, ?)",
+                                 [(page, position, int(record['id']), json.dumps(record))
+                                  for position, record in enumerate(records)])
+            self._db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", (page, len(records), time.time()))
+
+    # 1.3) count_records
+    # This Method gives the number of records saved.
+    def count_records(self):
+        return self._db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    # 1.4) iter_records
+    # This Method reads back the records saved, in the order of the pages, a few pages at a time. A launch listed
+    # on two pages (the listing shifted between two runs) is given only once, with the record of its first page.
+    #   As Arguments, the method takes the number of pages read at a time and optionally the last page read (the
+    #   pages after it, saved by a longer crawl, are left out)
+    #   It yields lists of records
+    def iter_records(self, pages_per_chunk=20, last_page=None):
+        pages = sorted(page for page in self.done_pages() if last_page is None or page <= last_page)
+        seen = set()
+        for start in range(0, len(pages), pages_per_chunk):
+            chunk = pages[start:start + pages_per_chunk]
+            rows = self._db.execute("SELECT id, record FROM records WHERE page BETWEEN ? AND ? "
+                                    "ORDER BY page, position", (chunk[0], chunk[-1]))
+            records = []
+            for launch_id, record in rows:
+                if launch_id not in seen:
+                    seen.add(launch_id)
+                    records.append(json.loads(record))
+            yield records
+
+    # 1.5) close
+    # This Method closes the file, and deletes it if the crawl is over
+    def close(self, remove=False):
+        self._db.close()
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+# 2) checkpoint_path
+# This Function gives the path of the checkpoint of a crawl, next to the csv file it will write.
+#   As Arguments, the function takes the path of the csv file
+#   It returns the path as a string
+def checkpoint_path(csv_path):
+    return os.path.splitext(csv_path)[0] + CHECKPOINT_SUFFIX
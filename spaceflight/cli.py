@@ -0,0 +1,311 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************      COMMAND LINE      *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module is the command line of the program, started with "python -m spaceflight <command>" from the folder
+# of the repository, or with "spaceflight <command>" from any folder once the package is installed (pip install .,
+# see pyproject.toml):
+#   scrape   scrape the past launches (or the upcoming ones with --future) and save them
+#   update   only add the past launches which are not saved yet
+#   plot     draw the charts of the saved launches
+#   export   write the saved (typed) launches to a csv, Parquet, Feather or JSON file
+#   query    show the saved launches matching some filters, or their success rate (see database.py)
+#   reextract  extract the launches again from the archive of the downloaded pages (see archive.py)
+#   cadence  show how often the companies, bases or countries launch (see cadence.py)
+# Each command imports the modules it needs only when it runs: "plot" and "export" never load the HTML parsers
+# nor the HTTP clients, "export" does not load matplotlib. Starting the program costs a few imports instead of
+# all of them (benchmarks/check_cold_start.py checks that "plot" starts within PLOT_COLD_START_BUDGET).
+# interactive() is the program as it used to run from main.py: it asks how many pages to scrape, scrapes them and
+# draws the charts.
+
+import argparse
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Seconds "python -m spaceflight plot" may take to import what it needs before drawing the charts
+PLOT_COLD_START_BUDGET = 1.5
+
+# Formats of the export command, with the extension of their files
+EXPORT_FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather", "json": ".json"}
+
+
+# 1) build_parser
+# This Function describes the commands and their options.
+#   It returns the argparse parser
+def build_parser():
+    parser = argparse.ArgumentParser(prog="spaceflight", description="Scrape nextspaceflight.com and chart the "
+                                                                     "launches")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    scrape = commands.add_parser("scrape", help="scrape the launches and save them")
+    scrape.add_argument("--pages", type=int, default=0, help="number of listing pages to scrape (0: all of them)")
+    scrape.add_argument("--future", action="store_true", help="scrape the upcoming launches instead of the past ones")
+    add_network_options(scrape)
+    scrape.add_argument("--restart", action="store_true", help="do not resume a crawl which was stopped")
+    scrape.set_defaults(run=run_scrape)
+
+    update = commands.add_parser("update", help="add the past launches which are not saved yet")
+    update.add_argument("--max-pages", type=int, default=None, help="maximum number of listing pages to go through")
+    add_network_options(update)
+    update.set_defaults(run=run_update)
+
+    plot = commands.add_parser("plot", help="draw the charts of the saved launches")
+    plot.add_argument("--horizon", choices=["Past", "Future"], default="Past")
+    plot.add_argument("--directory", default=".", help="folder of the saved launches")
+    plot.add_argument("--output", default=".", help="folder the charts are written in")
+    plot.add_argument("--format", nargs="+", default=["pdf"], dest="formats",
+                      help="formats of the charts: pdf, png and/or svg")
+    plot.add_argument("--reports", nargs="+", default=[], metavar="COLUMN",
+                      help="also draw the charts per company, decade and/or Country (in <output>/reports)")
+    plot.add_argument("--top", type=int, default=None, help="number of companies, decades or countries drawn per "
+                                                            "report (by default all of them)")
+    plot.add_argument("--workers", type=int, default=None, help="processes drawing the charts (by default one per "
+                                                                "core)")
+    plot.set_defaults(run=run_plot)
+
+    export = commands.add_parser("export", help="write the saved launches to a file")
+    export.add_argument("output", help="file to write")
+    export.add_argument("--horizon", choices=["Past", "Future"], default="Past")
+    export.add_argument("--directory", default=".", help="folder of the saved launches")
+    export.add_argument("--format", choices=sorted(EXPORT_FORMATS),
+                        help="format of the file (by default guessed from its extension)")
+    export.add_argument("--columns", nargs="+", help="columns to export (by default all of them)")
+    export.set_defaults(run=run_export)
+
+    query = commands.add_parser("query", help="show the saved launches matching some filters")
+    query.add_argument("--company", help="e.g. SpaceX")
+    query.add_argument("--country", help="country of the base, e.g. USA")
+    query.add_argument("--base", help="whole name of the base")
+    query.add_argument("--pad", help="pad of the base (first part of its name), e.g. SLC-40")
+    query.add_argument("--rocket", help="beginning of the name of the rocket, e.g. \"Falcon 9\"")
+    query.add_argument("--horizon", choices=["Past", "Future"])
+    query.add_argument("--year", type=int)
+    query.add_argument("--start", help="first date, e.g. 2021-06-01")
+    query.add_argument("--end", help="date after the last one")
+    query.add_argument("--limit", type=int, default=None, help="maximum number of launches shown")
+    query.add_argument("--rate-by", metavar="COLUMN", help="show the success rate per value of a column, e.g. "
+                                                          "company or year")
+    query.add_argument("--count", action="store_true", help="only show the number of launches")
+    query.add_argument("--directory", default=".", help="folder of the saved launches")
+    query.set_defaults(run=run_query)
+
+    reextract = commands.add_parser("reextract", help="extract the launches again from the archived pages")
+    reextract.add_argument("--archive", default=None, help="archive of the pages (by default pages.archive)")
+    reextract.add_argument("--horizon", nargs="+", choices=["Past", "Future"], default=["Past", "Future"])
+    reextract.add_argument("--workers", type=int, default=None, help="processes extracting the pages (by default "
+                                                                    "one per core)")
+    reextract.add_argument("--directory", default=".", help="folder the launches are saved in")
+    reextract.set_defaults(run=run_reextract)
+
+    cadence = commands.add_parser("cadence", help="show how often the companies, bases or countries launch")
+    cadence.add_argument("--by", choices=["company", "base", "Country"], default="company")
+    cadence.add_argument("--horizon", choices=["Past", "Future"], default="Past")
+    cadence.add_argument("--top", type=int, default=20, help="number of groups shown, the most active first")
+    cadence.add_argument("--group", help="show the cadence of every launch of this company, base or country")
+    cadence.add_argument("--directory", default=".", help="folder of the saved launches")
+    cadence.set_defaults(run=run_cadence)
+    return parser
+
+
+# 1.1) add_network_options
+# This Function adds to a command the options of the downloads
+def add_network_options(command):
+    command.add_argument("--no-cache", action="store_true", help="do not use the on-disk cache of the pages")
+    command.add_argument("--urllib", action="store_true", help="send the requests with urllib instead of aiohttp")
+    command.add_argument("--workers", type=int, default=None, help="detail pages downloaded at the same time")
+    command.add_argument("--no-archive", action="store_true", help="do not keep the downloaded pages in the archive")
+
+
+# 2) setup_downloads
+# This Function prepares the downloads of the scraper: the HTTP client, the on-disk cache and the archive of the
+# pages, from the options of the command (or the global variables of scraper.py). The number of workers is given
+# to the crawl itself (args.workers, see run_scrape and run_update).
+#   As Arguments, the function takes the parsed options (or None for the defaults)
+#   It returns the scraper module
+def setup_downloads(args=None):
+    from . import scraper
+    from .fetching import use_archive, use_cache
+
+    if scraper.USE_ASYNC_CLIENT and not (args is not None and args.urllib):
+        from .async_fetching import use_async_client
+        use_async_client()
+    if scraper.USE_HTTP_CACHE and not (args is not None and args.no_cache):
+        from .http_cache import ResponseCache
+        use_cache(ResponseCache())
+    if scraper.ARCHIVE_PAGES and not (args is not None and args.no_archive):
+        from .archive import PageArchive
+        use_archive(PageArchive())
+    return scraper
+
+
+# 3) measured_crawl
+# This Function runs a crawl and saves its measures at the end, even if it failed (see metrics.py), as well as the
+# index of the archive of the pages and the times the cached pages were read (see http_cache.py).
+#   As Arguments, the function takes the function running the crawl and its arguments
+def measured_crawl(crawl, *args):
+    from . import fetching, scraper
+    from .metrics import metrics
+
+    metrics.reset()
+    try:
+        crawl(*args)
+    finally:
+        if fetching.page_archive is not None:
+            fetching.page_archive.commit()
+        if fetching.response_cache is not None:
+            fetching.response_cache.commit()
+        print(metrics.summary())
+        if scraper.METRICS_JSON:
+            metrics.write_json(scraper.METRICS_JSON)
+        if scraper.METRICS_PROMETHEUS:
+            metrics.write_prometheus(scraper.METRICS_PROMETHEUS)
+
+
+# 4) run_scrape
+# This Function runs the "scrape" command
+def run_scrape(args):
+    scraper = setup_downloads(args)
+    if args.restart:
+        scraper.RESUME_CRAWL = False
+    if args.future:
+        measured_crawl(scraper.scrape_future_launches, args.workers)
+    else:
+        measured_crawl(scraper.scrape_past_launches, args.pages, args.workers)
+
+
+# 5) run_update
+# This Function runs the "update" command
+def run_update(args):
+    scraper = setup_downloads(args)
+    measured_crawl(scraper.update_past_launches, args.max_pages, args.workers)
+
+
+# 6) run_plot
+# This Function runs the "plot" command
+def run_plot(args):
+    from .charts import plot_all
+    try:
+        paths = plot_all(args.horizon, args.directory, args.output, args.formats, args.reports, args.top,
+                         args.workers)
+    except ValueError as e:
+        raise SystemExit("spaceflight plot: error: {0}".format(e))
+    print("{0:0.0f} charts written to {1}".format(len(paths), args.output))
+
+
+# 7) run_export
+# This Function runs the "export" command: the typed launches (see normalize.py) are read from the columnar
+# file, or from the csv file without pyarrow, and written in the format asked for
+def run_export(args):
+    import os
+    from .storage import load_launches
+
+    file_format = args.format
+    if file_format is None:
+        extension = os.path.splitext(args.output)[1].lower()
+        file_format = {value: key for key, value in EXPORT_FORMATS.items()}.get(extension, "csv")
+
+    res = load_launches(args.horizon, args.columns, args.directory)
+    if file_format == "csv":
+        res.to_csv(args.output, index=False)
+    elif file_format == "parquet":
+        res.to_parquet(args.output, index=False)
+    elif file_format == "feather":
+        res.reset_index(drop=True).to_feather(args.output)
+    else:
+        res.to_json(args.output, orient="records", lines=True, date_format="iso")
+    print("{0:0.0f} launches written to {1}".format(len(res), args.output))
+
+
+# 7.1) run_query
+# This Function runs the "query" command on the database of the launches, which is built from the csv files if
+# it is missing or older than them (see database.py)
+def run_query(args):
+    import pandas as pd
+    from .database import open_database
+
+    filters = {name: getattr(args, name) for name in ("company", "country", "base", "pad", "rocket", "horizon",
+                                                        "year", "start", "end")}
+    with open_database(args.directory) as store:
+        if args.count:
+            print(store.count(**filters))
+            return
+        if args.rate_by:
+            res = store.success_rate(args.rate_by, **filters)
+        else:
+            res = store.query(['date', 'title_1', 'title_2', 'company', 'pad', 'Country', 'status'], args.limit,
+                              **filters)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(res.to_string(index=False))
+
+
+# 7.2) run_reextract
+# This Function runs the "reextract" command
+def run_reextract(args):
+    from .archive import ARCHIVE_PATH, reextract
+    from .metrics import metrics
+
+    try:
+        saved = reextract(args.archive or ARCHIVE_PATH, args.horizon, args.workers, args.directory)
+    except FileNotFoundError as e:
+        raise SystemExit("spaceflight reextract: error: {0}".format(e))
+    for horizon, count in saved.items():
+        print("{0}: {1:0.0f} launches extracted from the archive".format(horizon, count))
+    for reason, count in sorted(metrics.dropped.items()):
+        print("{0}: {1:0.0f}".format(reason, count))
+
+
+# 7.3) run_cadence
+# This Function runs the "cadence" command: the summary of the most active groups, or the cadence of every launch
+# of one group
+def run_cadence(args):
+    import pandas as pd
+    from .cadence import CADENCE_SOURCE_COLUMNS, cadence_summary, launch_cadence
+    from .storage import load_launches
+
+    res = load_launches(args.horizon, CADENCE_SOURCE_COLUMNS, args.directory)
+    if args.group is not None:
+        res = res[res[args.by] == args.group]
+        if res.empty:
+            raise SystemExit("spaceflight cadence: error: no launch of {0} {1}".format(args.by, args.group))
+        res = launch_cadence(res, args.by).drop(columns=['by'])
+    else:
+        res = cadence_summary(res, args.by).head(args.top)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(res.to_string(index=False))
+
+
+# 8) interactive
+# This Function runs the program as main.py always did: it asks how many pages to scrape, scrapes them (or only
+# the new launches) and draws the charts of the past launches
+def interactive():
+    scraper = setup_downloads()
+    page_scraped = int(input("How many pages you'd like to scrape? 100 pages should take around 20 mins. Input 0 to"
+                             " scrape them all, -1 to only add the launches that are not in the csv file yet"))
+    if page_scraped < 0:
+        measured_crawl(scraper.update_past_launches)
+    else:
+        measured_crawl(scraper.scrape_past_launches, page_scraped)
+
+    from .charts import plot_all
+    plot_all("Past")
+
+    print("*************************************************************************************************************\n"
+          "Thank you for using our program\n"
+          "*************************************************************************************************************\n")
+
+
+# 9) main
+# This Function is the entry point of "python -m spaceflight".
+#   As Arguments, the function optionally takes the list of arguments (by default those of the command line)
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return
+    args.run(args)
@@ -0,0 +1,166 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************     LAUNCH CUBE        *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module keeps the number of launches and of successful launches per (year, Country, company, base),
+# the "cube" of the launches. The charts only need these counts, hence they read a table of a few thousand
+# rows instead of going through every launch:
+#   - the cube is built once from the typed launches (see storage.py) and saved next to them
+#   - when new launches are scraped (see update_past_launches in main.py) their counts are added to the cube
+#     without going through the launches already counted
+#   - if the cube is missing or older than the launches it was built from, it is built again
+
+import os
+
+import pandas as pd
+
+from . import storage
+from .normalize import add_derived_columns
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# the columns the launches are counted by
+CUBE_KEYS = ['year', 'Country', 'company', 'base']
+
+# the columns of the launches needed to build the cube
+CUBE_SOURCE_COLUMNS = CUBE_KEYS + ['status']
+
+
+# 1) build_cube
+# This Function counts the launches and the successful launches per (year, Country, company, base).
+#   As Arguments, the function takes the DataFrame of the launches (typed, or at least with 'base' and 'date')
+#   It returns the cube: one row per combination of keys found, with the 'launches' and 'successes' columns
+def build_cube(res):
+    res = add_derived_columns(res)
+
+    # status is True/1 for a success; a missing status is not counted as a success
+    if 'status' in res:
+        successes = pd.to_numeric(res['status'], errors="coerce").astype("Float64").fillna(0).astype("int32")
+    else:
+        successes = 0
+
+    cube = res[CUBE_KEYS].assign(launches=1, successes=successes) \
+        .groupby(CUBE_KEYS, observed=True, dropna=False, sort=True)[['launches', 'successes']].sum() \
+        .reset_index()
+    cube['launches'] = cube['launches'].astype("int32")
+    cube['successes'] = cube['successes'].astype("int32")
+    return cube
+
+
+# 2) merge_cubes
+# This Function adds up two cubes, e.g. the cube of the launches already stored and the cube of new launches.
+#   As Arguments, the function takes the two cubes
+#   It returns the cube of all the launches
+def merge_cubes(cube, other):
+    merged = pd.concat([cube, other], ignore_index=True)
+
+    # the categories of the two cubes may differ (e.g. a new base), we merge them before grouping
+    for column in CUBE_KEYS:
+        dtypes = [cube[column].dtype, other[column].dtype]
+        if any(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            merged[column] = merged[column].astype("category")
+
+    merged = merged.groupby(CUBE_KEYS, observed=True, dropna=False, sort=True)[['launches', 'successes']].sum() \
+        .reset_index()
+    merged['launches'] = merged['launches'].astype("int32")
+    merged['successes'] = merged['successes'].astype("int32")
+    return merged
+
+
+# 3) as_cube
+# This Function lets the charts accept either a cube or the launches themselves.
+#   As Arguments, the function takes a cube or a DataFrame of launches
+#   It returns a cube
+def as_cube(res):
+    if 'launches' in res and all(key in res for key in CUBE_KEYS):
+        return res
+    return build_cube(res)
+
+
+# 4) cube_path
+# This Function gives the path of the file storing the cube of a horizon, next to the launches.
+#   As Arguments, the function takes the horizon ("Past" or "Future") and the folder of the files
+#   It returns the path as a string
+def cube_path(horizon, directory="."):
+    file_format = storage.STORE_FORMAT if storage.pyarrow is not None else "csv"
+    launches = storage.launches_path(horizon, file_format, directory)
+    root, extension = os.path.splitext(launches)
+    return root + "_cube" + extension
+
+
+# 5) save_cube
+# This Function writes the cube of a horizon in its file.
+#   As Arguments, the function takes the cube, the horizon and the folder of the files
+def save_cube(cube, horizon, directory="."):
+    path = cube_path(horizon, directory)
+    tmp = path + ".tmp"
+    if storage.pyarrow is None:
+        cube.to_csv(tmp, index=False)
+    elif storage.STORE_FORMAT == "feather":
+        cube.to_feather(tmp)
+    else:
+        cube.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+# 6) load_cube
+# This Function reads the cube of a horizon, building it again from the launches if it is missing or older
+# than them.
+#   As Arguments, the function takes the horizon and the folder of the files
+#   It returns the cube
+def load_cube(horizon, directory="."):
+    path = cube_path(horizon, directory)
+    sources = [storage.launches_path(horizon, file_format, directory) for file_format in ("csv", None)]
+    newest_source = max([os.path.getmtime(source) for source in sources if os.path.exists(source)], default=0)
+
+    if not os.path.exists(path) or os.path.getmtime(path) < newest_source:
+        return refresh_cube(horizon, directory)
+
+    return load_cube_file(path)
+
+
+# 6.1) load_cube_file
+# This Function reads a cube file, without checking whether it is up to date.
+#   As Arguments, the function takes the path of the file
+#   It returns the cube
+def load_cube_file(path):
+    if path.endswith(".csv"):
+        cube = pd.read_csv(path)
+        for column in ['Country', 'company', 'base']:
+            cube[column] = cube[column].astype("category")
+        return cube
+    if path.endswith(".feather"):
+        return pd.read_feather(path)
+    return pd.read_parquet(path)
+
+
+# 7) refresh_cube
+# This Function builds the cube of a horizon from all its launches and saves it.
+#   As Arguments, the function takes the horizon and the folder of the files
+#   It returns the cube
+def refresh_cube(horizon, directory="."):
+    cube = build_cube(storage.load_launches(horizon, CUBE_SOURCE_COLUMNS, directory))
+    save_cube(cube, horizon, directory)
+    return cube
+
+
+# 8) update_cube
+# This Function adds new launches to the saved cube of a horizon, without going through the launches already
+# counted. The launches must really be new (not already in the cube), as update_past_launches in main.py
+# guarantees.
+#   As Arguments, the function takes the DataFrame of the new launches, the horizon and the folder of the files
+#   It returns the updated cube
+def update_cube(new_launches, horizon, directory="."):
+    path = cube_path(horizon, directory)
+    if not os.path.exists(path):
+        return refresh_cube(horizon, directory)
+
+    cube = merge_cubes(load_cube_file(path), build_cube(new_launches))
+    save_cube(cube, horizon, directory)
+    return cube
+
@@ -0,0 +1,378 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************     LAUNCH DATABASE    *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module keeps the past and the future launches in one SQLite database (launches.sqlite, next to the csv
+# files), so that a question like "Falcon 9 launches from SLC-40 in 2021" or "success rate by company" is
+# answered by reading the few rows it needs instead of loading every launch in pandas:
+#   - the scrapers upsert the launches they save by their id (see save_launches in storage.py): a launch scraped
+#     again replaces its previous version, and an upcoming launch which took place moves from "Future" to "Past"
+#   - the launches are stored typed (see normalize.py), with the Country and the pad of their base (the part
+#     before the first comma, e.g. "SLC-40") and their year in columns of their own, and the dates as
+#     "YYYY-MM-DD HH:MM:SS" strings in UTC
+#   - the specs of the rockets are stored once per rocket in the vehicles table, the launches referencing their
+#     rocket by its name (title_1, see vehicles.py): the queries asking for specs join the two tables
+#   - the date, company, Country, base, pad and rocket (title_1) columns are indexed, each index being sorted by
+#     date too, hence a filter on any of them (and on a date range) only reads the matching rows of the index
+#   - saving all the launches of a horizon also removes the launches of that horizon which are not saved any
+#     more (e.g. an upcoming launch cancelled), so that the database holds the same launches as the csv files
+#   - if the database is missing or older than the csv files, it is built again from them (see open_database)
+# The database is a single file, read and written with the sqlite3 module of the standard library.
+
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from .normalize import CATEGORIES, COUNTS, MEASURES, VEHICLE_SPECS, normalize_launches
+from .vehicles import split_vehicles
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Name of the database file
+DATABASE_NAME = "launches.sqlite"
+
+# Version of the tables below: a database written with other tables is emptied and built again
+SCHEMA_VERSION = 2
+
+# The columns of the launches table and their SQLite type, the typed columns having the names given by
+# normalize.py
+DATABASE_COLUMNS = {
+    'id': "INTEGER PRIMARY KEY",
+    'horizon': "TEXT NOT NULL",
+    'date': "TEXT",
+    'year': "INTEGER",
+    'title_1': "TEXT",
+    'title_2': "TEXT",
+    'company': "TEXT",
+    'base': "TEXT",
+    'pad': "TEXT",
+    'Country': "TEXT",
+    'link': "TEXT",
+    'status': "INTEGER",
+    'updated_at': "REAL NOT NULL",
+}
+
+# The columns of the vehicles table: the name of the rocket and its specs
+VEHICLE_DATABASE_COLUMNS = {'title_1': "TEXT PRIMARY KEY"}
+VEHICLE_DATABASE_COLUMNS.update({column: "REAL" if column in [typed for typed, units in MEASURES.values()] else
+                                 "INTEGER" if column in COUNTS else "TEXT" for column in VEHICLE_SPECS})
+
+# The names of the columns are not case sensitive in SQLite, hence 'Status' (the status of the rocket, e.g.
+# "Active") is stored under another name than 'status' (the success of the launch)
+SQL_NAMES = {'Status': 'rocket_status'}
+COLUMN_NAMES = {name: column for column, name in SQL_NAMES.items()}
+
+# The indexed columns, each index being sorted by (column, date)
+INDEXED_COLUMNS = ['company', 'Country', 'base', 'pad', 'title_1', 'horizon']
+
+# Number of launches from which an upsert writing more launches than the table holds drops the indexes and builds
+# them again at the end (see upsert)
+BULK_ROWS = 10000
+
+# The filters of query(), count() and success_rate(): name of the argument -> column. "rocket" matches the
+# rockets whose name starts with the value, e.g. "Falcon 9" matches "Falcon 9 Block 5"
+FILTERS = {'company': 'company', 'country': 'Country', 'base': 'base', 'pad': 'pad', 'rocket': 'title_1',
+           'horizon': 'horizon'}
+
+
+# 1) quote
+# This Function gives the quoted SQL name of a column (some have spaces or parentheses, e.g. "Price ($M)")
+def quote(column):
+    column = SQL_NAMES.get(column, column)
+    return '"' + column.replace('"', '""') + '"'
+
+
+# 2) LaunchStore
+# This class reads and writes the launches of the database.
+#   As Arguments, the constructor takes the path of the database file (created if it does not exist)
+#   The created attribute tells whether the tables were created (the database is empty)
+class LaunchStore:
+    def __init__(self, path=DATABASE_NAME):
+        self.path = path
+        self._db = sqlite3.connect(path)
+
+        # a database written by a previous version of the program is emptied
+        self.created = self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION
+        if self.created:
+            self._db.execute("DROP TABLE IF EXISTS launches")
+            self._db.execute("DROP TABLE IF EXISTS vehicles")
+            self._db.execute("PRAGMA user_version = {0:d}".format(SCHEMA_VERSION))
+        for table, columns in (("launches", DATABASE_COLUMNS), ("vehicles", VEHICLE_DATABASE_COLUMNS)):
+            self._db.execute("CREATE TABLE IF NOT EXISTS {0} ({1})".format(table, ", ".join(
+                "{0} {1}".format(quote(column), kind) for column, kind in columns.items())))
+        self.create_indexes()
+        self._db.commit()
+
+    # 2.1) create_indexes, drop_indexes
+    # These Methods create (if they do not exist) and remove the indexes of the launches table
+    def create_indexes(self):
+        self._db.execute("CREATE INDEX IF NOT EXISTS launches_date ON launches (date)")
+        for column in INDEXED_COLUMNS:
+            self._db.execute("CREATE INDEX IF NOT EXISTS launches_{0} ON launches ({1}, date)".format(
+                column.lower(), quote(column)))
+
+    def drop_indexes(self):
+        for column in ['date'] + INDEXED_COLUMNS:
+            self._db.execute("DROP INDEX IF EXISTS launches_{0}".format(column.lower()))
+
+    # 2.2) upsert
+    # This Method inserts the launches, or replaces them if their id is already in the database, and the specs of
+    # their rockets (see vehicles.py), in one transaction.
+    #   As Arguments, the method takes the DataFrame of the launches (as scraped, indexed by id, or typed with an
+    #   'id' column), their horizon ("Past" or "Future") and optionally the time of the update (see prune)
+    #   It returns the number of launches written
+    def upsert(self, res, horizon, updated_at=None):
+        rows, vehicle_rows = launch_rows(res, horizon, updated_at or time.time())
+        with self._db:
+            self._db.executemany(upsert_sql("vehicles", VEHICLE_DATABASE_COLUMNS), vehicle_rows)
+
+            # every row written updates the 7 indexes one entry at a time: when most of the table is written (e.g.
+            # the database is built from the csv files) it is faster to build the indexes again at the end, by
+            # sorting, and it happens in the same transaction
+            bulk = len(rows) >= BULK_ROWS and len(rows) > self.count()
+            if bulk:
+                self.drop_indexes()
+            self._db.executemany(upsert_sql("launches", DATABASE_COLUMNS), rows)
+            if bulk:
+                self.create_indexes()
+        return len(rows)
+
+    # 2.3) prune
+    # This Method removes the launches of a horizon which were not written since a given time, i.e. after all the
+    # launches of a horizon were upserted with that time, those which are not among them.
+    #   As Arguments, the method takes the horizon and the time
+    #   It returns the number of launches removed
+    def prune(self, horizon, updated_before):
+        with self._db:
+            return self._db.execute("DELETE FROM launches WHERE horizon = ? AND updated_at < ?",
+                                    (horizon, updated_before)).rowcount
+
+    # 2.4) query
+    # This Method reads the launches matching the filters, the newest first.
+    #   As Arguments, the method takes the filters (see where() below: company, country, base, pad, rocket,
+    #   horizon, year, start, end), optionally the list of columns to read and the maximum number of launches
+    #   It returns the typed DataFrame of the launches (see normalize.py)
+    def query(self, columns=None, limit=None, **filters):
+        columns = columns or [column for column in DATABASE_COLUMNS if column != 'updated_at'] + VEHICLE_SPECS
+        condition, parameters = where(**filters)
+        sql = "SELECT {0} FROM {1}{2} ORDER BY date DESC".format(
+            ", ".join(quote(column) for column in columns), tables(columns), condition)
+        if limit is not None:
+            sql += " LIMIT {0:d}".format(limit)
+        cursor = self._db.execute(sql, parameters)
+        res = pd.DataFrame.from_records(cursor.fetchall(), columns=[COLUMN_NAMES.get(column[0], column[0])
+                                                                     for column in cursor.description])
+        return typed_frame(res)
+
+    # 2.5) count
+    # This Method counts the launches matching the filters (see query), reading the indexes only.
+    #   It returns the number of launches
+    def count(self, **filters):
+        condition, parameters = where(**filters)
+        return self._db.execute("SELECT COUNT(*) FROM launches" + condition, parameters).fetchone()[0]
+
+    # 2.6) success_rate
+    # This Method computes the number of launches, of successes and the success rate per value of a column,
+    # among the launches matching the filters (the launches without status are not counted in the rate).
+    #   As Arguments, the method takes the column the launches are grouped by (e.g. 'company' or 'year') and the
+    #   filters (see query)
+    #   It returns a DataFrame with one row per value, the most launches first
+    def success_rate(self, by='company', **filters):
+        if by not in DATABASE_COLUMNS and by not in VEHICLE_DATABASE_COLUMNS:
+            raise ValueError("Unknown column: " + by)
+        condition, parameters = where(**filters)
+        cursor = self._db.execute(
+            "SELECT {0}, COUNT(*), SUM(status), COUNT(status) FROM {1}{2} GROUP BY {0} "
+            "ORDER BY COUNT(*) DESC".format(quote(by), tables([by]), condition), parameters)
+        res = pd.DataFrame.from_records(cursor.fetchall(), columns=[by, 'launches', 'successes', 'known'])
+        res['successes'] = res['successes'].fillna(0).astype("int64")
+        res['success_rate'] = res['successes'] / res['known'].where(res['known'] > 0)
+        return res.drop(columns='known')
+
+    # 2.7) explain
+    # This Method gives the plan SQLite follows for a query with these filters, e.g. to check that it uses an
+    # index ("SEARCH launches USING INDEX ...") instead of reading the whole table ("SCAN launches")
+    def explain(self, **filters):
+        condition, parameters = where(**filters)
+        rows = self._db.execute("EXPLAIN QUERY PLAN SELECT * FROM launches" + condition + " ORDER BY date DESC",
+                                parameters)
+        return "\n".join(row[-1] for row in rows)
+
+    # 2.8) close
+    # This Method closes the database
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# 2.9) upsert_sql
+# This Function writes the statement inserting a row in a table, or updating it if its key (the first column) is
+# already there.
+#   As Arguments, the function takes the name of the table and its columns
+def upsert_sql(table, columns):
+    columns = list(columns)
+    return "INSERT INTO {0} ({1}) VALUES ({2}) ON CONFLICT({3}) DO UPDATE SET {4}".format(
+        table, ", ".join(quote(column) for column in columns), ", ".join("?" * len(columns)), quote(columns[0]),
+        ", ".join("{0}=excluded.{0}".format(quote(column)) for column in columns[1:]))
+
+
+# 2.10) tables
+# This Function gives the tables a query reads: the launches, joined with the vehicles if some specs are read
+#   As Arguments, the function takes the columns read
+def tables(columns):
+    if any(column in VEHICLE_DATABASE_COLUMNS and column != 'title_1' for column in columns):
+        return "launches LEFT JOIN vehicles USING (title_1)"
+    return "launches"
+
+
+# 3) where
+# This Function builds the WHERE clause of the filters.
+#   As Arguments, the function takes the filters: company, country, base, pad, rocket and horizon (see FILTERS),
+#   year, and start/end (dates, the end excluded)
+#   It returns the clause (empty without filters) and the list of its parameters
+def where(year=None, start=None, end=None, **filters):
+    conditions, parameters = [], []
+    for name, value in filters.items():
+        if name not in FILTERS:
+            raise TypeError("Unknown filter: " + name)
+        if value is None:
+            continue
+        if name == 'rocket':
+            # a prefix is a range of the sorted index: from the prefix to the prefix followed by the last character
+            conditions.append("title_1 >= ? AND title_1 < ?")
+            parameters += [value, value + "\U0010ffff"]
+        else:
+            conditions.append("{0} = ?".format(quote(FILTERS[name])))
+            parameters.append(value)
+
+    # the dates are stored as ISO strings, which sort like the dates themselves: the year is a range of dates
+    if year is not None:
+        start, end = "{0:04d}-01-01".format(int(year)), "{0:04d}-01-01".format(int(year) + 1)
+    if start is not None:
+        conditions.append("date >= ?")
+        parameters.append(sql_date(start))
+    if end is not None:
+        conditions.append("date < ?")
+        parameters.append(sql_date(end))
+
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), parameters
+
+
+# 3.1) sql_date
+# This Function writes a date (string, datetime or Timestamp, in UTC if it has no time zone) as it is stored
+def sql_date(date):
+    date = pd.Timestamp(date)
+    if date.tzinfo is not None:
+        date = date.tz_convert("UTC").tz_localize(None)
+    return date.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# 4) launch_rows
+# This Function turns launches into the rows of the launches table and of the vehicles table.
+#   As Arguments, the function takes the DataFrame of the launches (as scraped or typed), their horizon and the
+#   time of the update
+#   It returns the list of the rows of the launches and the list of the rows of their vehicles (tuples, in the
+#   order of DATABASE_COLUMNS and of VEHICLE_DATABASE_COLUMNS)
+def launch_rows(res, horizon, updated_at):
+    if 'id' not in res:
+        res = res.reset_index()
+    if 'Country' not in res or 'Price ($M)' not in res:
+        res = normalize_launches(res)
+    res, vehicles = split_vehicles(res)
+
+    # the rows are written in the order of the ids, the order of the primary key, which is faster to insert
+    res = res.assign(horizon=horizon, updated_at=updated_at,
+                     id=pd.to_numeric(res['id']).astype("int64"),
+                     date=pd.to_datetime(res['date'], utc=True).dt.tz_localize(None).astype("string"),
+                     pad=res['base'].astype("string").str.split(", ", n=1).str[0]).sort_values('id')
+    return table_rows(res, DATABASE_COLUMNS), table_rows(vehicles, VEHICLE_DATABASE_COLUMNS)
+
+
+# 4.1) table_rows
+# This Function turns a DataFrame into rows for SQLite: we convert the columns one at a time to lists of Python
+# values (numbers, strings, booleans), the missing values (NaN, NaT, pd.NA) being written as NULL, and we zip them
+# into rows. The float32 specs are rounded, so that 5.2 m is stored as 5.2 and not as 5.199999809265137
+#   As Arguments, the function takes the DataFrame and the columns of the table with their SQLite type
+#   It returns the list of tuples
+def table_rows(res, columns):
+    values = []
+    for column, kind in columns.items():
+        if column not in res:
+            values.append([None] * len(res))
+            continue
+        column_values = res[column]
+        if kind == "REAL" and column != 'updated_at':
+            column_values = column_values.astype("float64").round(4)
+        column_values = column_values.astype(object)
+        values.append(column_values.where(column_values.notna(), None).tolist())
+    return list(zip(*values))
+
+
+# 5) typed_frame
+# This Function gives the columns read from the database their types (see normalize.py).
+#   As Arguments, the function takes the DataFrame read from the database
+#   It returns the typed DataFrame
+def typed_frame(res):
+    if 'date' in res:
+        res['date'] = pd.to_datetime(res['date'], utc=True)
+    for column in CATEGORIES:
+        if column in res:
+            res[column] = res[column].astype("category")
+    for typed_column, units in MEASURES.values():
+        if typed_column in res:
+            res[typed_column] = res[typed_column].astype("float32")
+    for column in COUNTS + ['year']:
+        if column in res:
+            res[column] = res[column].astype("Int16")
+    if 'status' in res:
+        res['status'] = res['status'].astype("Float64").astype("boolean")
+    return res
+
+
+# 6) open_database
+# This Function opens the database of the launches of a folder, building it again from the csv files of the
+# launches when it is missing, older than them (e.g. the csv files were copied from another computer) or written by
+# a previous version of the program.
+#   As Arguments, the function takes the folder of the files
+#   It returns the LaunchStore
+def open_database(directory="."):
+    from .storage import launches_path
+
+    path = os.path.join(directory, DATABASE_NAME)
+    sources = [launches_path(horizon, "csv", directory) for horizon in ("Past", "Future")]
+    stale = not os.path.exists(path) or any(os.path.getmtime(source) > os.path.getmtime(path)
+                                            for source in sources if os.path.exists(source))
+
+    store = LaunchStore(path)
+    if stale or store.created:
+        # the past launches are written last: a launch found in both files took place and is a past launch
+        load_csv_files(store, ("Future", "Past"), directory)
+        os.utime(path)
+    return store
+
+
+# 6.1) load_csv_files
+# This Function upserts in the database the launches of the csv files of some horizons, and removes the launches of
+# these horizons which are not in the files.
+#   As Arguments, the function takes the LaunchStore, the horizons and the folder of the files
+def load_csv_files(store, horizons, directory="."):
+    from .storage import launches_path, read_csv_typed
+
+    updated_at = time.time()
+    for horizon in horizons:
+        source = launches_path(horizon, "csv", directory)
+        if os.path.exists(source):
+            store.upsert(read_csv_typed(source), horizon, updated_at)
+        store.prune(horizon, updated_at)
@@ -0,0 +1,293 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************        FETCHING        *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module collects the helpers used by main.py to download pages from the website.
+# All the downloads go through the download() function, so that the number of requests sent to the
+# same host per second can be limited in one single place, the fetch_all() function lets us
+# download many pages at the same time with a bounded pool of worker threads and pipelined_crawl()
+# overlaps the downloads of the listing pages with the downloads of their detail pages.
+# The requests themselves are sent by an HTTP client (urllib by default, or the pooled aiohttp client of
+# async_fetching.py), with a timeout and retries.
+
+# Threading / concurrent.futures: standard library modules used to run the downloads in parallel. Since the
+# scraping spends most of its time waiting for the network, threads are enough to overlap the round-trips.
+
+import queue
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from .metrics import metrics
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Maximum number of requests sent per second to the same host, shared by all the worker threads.
+# Set it to 0 (or None) to disable the rate limiting.
+REQUESTS_PER_SECOND = 5
+
+# Seconds after which a request is abandoned (and retried), so that one slow answer cannot stall the crawl
+TIMEOUT = 30
+
+# Number of times a request is sent again after a network error, a timeout or an answer telling us to retry
+# later (RETRY_STATUSES). Between two attempts we wait BACKOFF seconds, doubled at each attempt, with some
+# random jitter so that the worker threads do not all retry at the same moment
+RETRIES = 3
+BACKOFF = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# 1) HostRateLimiter
+# This class spaces out the requests sent to the same host. Each host has its own "next free slot" and
+# every call to wait() books the next slot and sleeps until it is reached, so that with many threads
+# the requests are still sent at most REQUESTS_PER_SECOND times per second to each host.
+class HostRateLimiter:
+    def __init__(self, requests_per_second):
+        self.requests_per_second = requests_per_second
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.requests_per_second:
+            return
+
+        host = urlparse(url).netloc
+        interval = 1.0 / self.requests_per_second
+
+        # we book the slot while holding the lock, but we sleep outside of it so that other threads
+        # can book the following slots in the meantime
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# the limiter shared by all the downloads of the program
+rate_limiter = HostRateLimiter(REQUESTS_PER_SECOND)
+
+
+# 1.1) UrllibClient
+# This class sends the requests with urllib, the HTTP module of the standard library: every request opens a
+# new connection. It is the default client, see use_http_client() and async_fetching.py for a faster one.
+class UrllibClient:
+    # errors after which a request can be sent again (HTTP errors are checked on their status, see is_retryable)
+    retryable_errors = (urllib.error.URLError, OSError)
+
+    def __init__(self, timeout=TIMEOUT):
+        self.timeout = timeout
+
+    # This Method sends one request.
+    #   As Arguments, the method takes the url and a dictionary of request headers
+    #   It returns the HTTP status, the response headers and the body, a "304 Not Modified" answer is returned as
+    #   a status instead of an error
+    def request(self, url, headers):
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, e.headers, b""
+            raise
+
+
+# the client sending the requests, the on-disk cache of the pages (see http_cache.py) and the archive of the
+# pages (see archive.py), None as long as use_cache() or use_archive() was not called
+http_client = UrllibClient()
+response_cache = None
+page_archive = None
+
+
+# 2) download
+# This Function returns a page, from the on-disk cache when it is enabled and the page is there, otherwise
+# by downloading it after waiting for its turn on the rate limiter. When the archive is enabled the page is also
+# appended to it (unless the same page is already archived).
+#   As Arguments, the function takes the url of the page (string) and optionally how many seconds a cached
+#   copy of this page stays valid (by default the TTL of the cache)
+#   It returns the HTML page as bytes
+def download(url, ttl=None):
+    # the time spent is measured as the "fetch" stage of the crawl (see metrics.py)
+    with metrics.stage("fetch"):
+        if response_cache is None:
+            body = open_url(url, {})[2]
+        else:
+            body = response_cache.fetch(url, open_url, ttl)
+    if page_archive is not None:
+        with metrics.stage("archive"):
+            page_archive.append(url, body)
+    return body
+
+
+# 2.1) open_url
+# This Function sends the request to the website through the HTTP client, with the extra headers given (used by
+# the cache to ask whether a page changed), and sends it again up to RETRIES times if it fails for a reason that
+# may not happen again (see is_retryable). A "304 Not Modified" answer is returned as a status instead of an error.
+#   As Arguments, the function takes the url and a dictionary of request headers
+#   It returns the HTTP status, the response headers and the body
+def open_url(url, headers):
+    attempt = 0
+    while True:
+        rate_limiter.wait(url)
+        try:
+            status, response_headers, body = http_client.request(url, headers)
+            metrics.count("requests")
+            metrics.count("bytes_downloaded", len(body))
+            return status, response_headers, body
+        except Exception as e:
+            metrics.count("request_errors")
+            if attempt >= RETRIES or not is_retryable(e, http_client):
+                raise
+        metrics.count("retries")
+        time.sleep(backoff_delay(attempt))
+        attempt += 1
+
+
+# 2.2) is_retryable
+# This Function tells whether a failed request is worth sending again: network errors and timeouts, and the HTTP
+# answers of RETRY_STATUSES (e.g. 503 Service Unavailable). A 404 Not Found, for instance, is not retried.
+#   As Arguments, the function takes the exception raised by the request and the client which sent it
+#   It returns True or False
+def is_retryable(error, client):
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRY_STATUSES
+    return isinstance(error, client.retryable_errors)
+
+
+# 2.3) backoff_delay
+# This Function gives how long to wait before sending a request again: BACKOFF seconds doubled at each attempt,
+# multiplied by a random factor between 0.5 and 1.5 (jitter)
+#   As Arguments, the function takes the number of the attempt which failed (starting from 0)
+#   It returns the delay in seconds
+def backoff_delay(attempt):
+    return BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+# 2.4) use_http_client
+# This Function changes the client sending the requests.
+#   As Arguments, the function takes the client: any object with a request(url, headers) method returning the
+#   status, the headers and the body, and a retryable_errors tuple (see UrllibClient)
+def use_http_client(client):
+    global http_client
+    http_client = client
+
+
+# 2.5) use_cache
+# This Function makes download() go through an on-disk cache.
+#   As Arguments, the function takes a ResponseCache (see http_cache.py), or None to disable the cache
+def use_cache(cache):
+    global response_cache
+    response_cache = cache
+
+
+# 2.6) use_archive
+# This Function makes download() keep every page in an archive.
+#   As Arguments, the function takes a PageArchive (see archive.py), or None to disable the archive
+def use_archive(archive):
+    global page_archive
+    page_archive = archive
+
+
+# 3) fetch_all
+# This Function calls func on each element of items using a pool of worker threads and returns the results
+# in the same order as the items, whatever the order in which the downloads finish.
+#   As Arguments, the function takes the function to call, the list of arguments and the maximum number of
+#   requests in flight at the same time. With max_workers=1 everything runs in the calling thread.
+#   It returns the list of results
+def fetch_all(func, items, max_workers=1):
+    if max_workers is None or max_workers <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # map() already gives back the results in the order of the items
+        return list(executor.map(func, items))
+
+
+# 4) pipelined_crawl
+# This Function crawls a list of listing pages as a producer/consumer pipeline. A producer thread downloads
+# the listing pages ahead of time and, as soon as the items of a page are known, submits their detail
+# downloads to a pool of max_workers threads shared by all the pages. The pages then go through a bounded
+# queue to the caller, who waits for their details and assembles them in order. This way the round-trips of
+# the next listing pages overlap with the detail downloads of the current one.
+#   As Arguments, the function takes the pages to crawl, a function returning the list of items of a page,
+#   a function returning the detail of one item, a function assembling the items and details of a page, the
+#   number of detail downloads in flight and the number of listing pages that may be fetched ahead
+#   It yields the assembled pages, in the same order as the pages
+def pipelined_crawl(pages, list_page, get_detail, assemble, max_workers=1, prefetch=2):
+    for items, details in crawl_futures(pages, list_page, get_detail, max_workers, prefetch):
+        yield assemble(items, [future.result() for future in details])
+
+
+# 4.1) streamed_crawl
+# This Function crawls the listing pages with the same pipeline as pipelined_crawl, but gives back every item
+# with its detail as soon as the detail is downloaded, instead of waiting for the whole page. The items keep the
+# order of the pages.
+#   As Arguments, the function takes the pages to crawl, a function returning the list of items of a page,
+#   a function returning the detail of one item, the number of detail downloads in flight and the number of
+#   listing pages that may be fetched ahead
+#   It yields (item, detail) pairs
+def streamed_crawl(pages, list_page, get_detail, max_workers=1, prefetch=2):
+    for items, details in crawl_futures(pages, list_page, get_detail, max_workers, prefetch):
+        for item, future in zip(items, details):
+            yield item, future.result()
+
+
+# 4.2) crawl_futures
+# This Function is the pipeline shared by pipelined_crawl and streamed_crawl: the producer thread, the bounded
+# queue of pages and the pool of detail downloads.
+#   It yields, for each page in order, the list of items and the list of the futures of their details
+def crawl_futures(pages, list_page, get_detail, max_workers=1, prefetch=2):
+    pages_queue = queue.Queue(maxsize=max(prefetch, 1))
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        # we retry the put so that the producer notices when the consumer stopped early
+        while not stop.is_set():
+            try:
+                pages_queue.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce(executor):
+        try:
+            for page in pages:
+                items = list_page(page)
+                details = [executor.submit(get_detail, item) for item in items]
+                if not put((items, details, None)):
+                    return
+        except Exception as e:
+            # the error is raised again in the caller's thread, as the serial loop would do
+            put((None, None, e))
+            return
+        put(done)
+
+    with ThreadPoolExecutor(max_workers=max(max_workers or 1, 1)) as executor:
+        producer = threading.Thread(target=produce, args=(executor,), daemon=True)
+        producer.start()
+        try:
+            while True:
+                entry = pages_queue.get()
+                if entry is done:
+                    break
+                items, details, error = entry
+                if error is not None:
+                    raise error
+                yield items, details
+        finally:
+            stop.set()
+            producer.join()
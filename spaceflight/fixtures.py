@@ -0,0 +1,275 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************        FIXTURES        *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module rebuilds listing and detail pages with the same HTML structure as the nextspaceflight.com pages
+# the scraper reads, starting from the launches of a csv file (by default launches_until_2022.csv). The pages
+# are used to check the parsers (see benchmarks/check_parsers.py) and to run the scraper without the website:
+# serve_fixtures() starts a local HTTP server answering like nextspaceflight.com with these pages.
+# Since we know the launches each page was built from, we also know what the scraper has to extract from it.
+
+import hashlib
+import html as html_escape
+import os
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from .records import DETAIL_COLUMNS
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# launches per listing page, as on the website
+PAGE_SIZE = 30
+
+# csv file the pages are built from
+FIXTURE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "launches_until_2022.csv")
+
+# format of the dates shown on the listing pages
+DATE_FORMAT = "%a %B %d, %Y %H:%M UTC"
+
+# number of "503 Service Unavailable" answers of a failing page before it is served (see FixtureServer), lower
+# than the number of retries of the scraper (RETRIES in fetching.py) so that every page is eventually downloaded
+FAILED_ATTEMPTS = 2
+
+# the menu, scripts and footer around the content of every page, which the parsers have to skip
+HEADER = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Next Spaceflight</title>
+<link rel="stylesheet" href="/static/css/material.min.css">
+<script>window.dataLayer = window.dataLayer || []; function gtag(){dataLayer.push(arguments);}</script>
+</head><body><div class="mdl-layout mdl-js-layout mdl-layout--fixed-header">
+<header class="mdl-layout__header"><div class="mdl-layout__header-row"><span class="mdl-layout-title">Next
+Spaceflight</span><nav class="mdl-navigation">""" + "".join(
+    '<a class="mdl-navigation__link" href="/{0}/">{0}</a>'.format(name)
+    for name in ["launches", "events", "rockets", "agencies", "locations", "news", "calendar"]) + """</nav></div>
+</header><main class="mdl-layout__content">"""
+
+FOOTER = """</main><footer class="mdl-mini-footer"><div class="mdl-mini-footer__left-section"><ul>""" + "".join(
+    '<li><a href="/{0}/">{0}</a></li>'.format(name) for name in ["about", "privacy", "terms", "contact"]) + \
+    """</ul></div></footer></div><script src="/static/js/material.min.js"></script></body></html>"""
+
+
+# 1) load_launches
+# This Function reads the launches the pages are built from.
+#   As Arguments, the function takes the csv file (by default FIXTURE_CSV)
+#   It returns a DataFrame of strings with one row per launch, in the order of the file
+def load_launches(path=FIXTURE_CSV):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+# 2) listing_date
+# This Function writes the date of a launch as shown on the listing pages.
+#   As Arguments, the function takes the date as stored in the csv file
+#   It returns the date as a string
+def listing_date(date):
+    return pd.Timestamp(date).strftime(DATE_FORMAT)
+
+
+# 3) render_listing_page
+# This Function builds a listing page.
+#   As Arguments, the function takes the launches (DataFrame returned by load_launches), the page number
+#   (integer, starting from 1) and the "Future"/"Past" flag
+#   It returns the HTML page as a string
+def render_listing_page(launches, page, future=False):
+    n_pages = max((len(launches) + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+    rows = launches.iloc[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+
+    cells = []
+    for row in rows.to_dict('records'):
+        # on the upcoming launches the base is on the third line, on the past ones it follows the date
+        if future:
+            when = "NET {0}\n<br>\n{1}".format(listing_date(row['date']), html_escape.escape(row['base']))
+        else:
+            when = "{0}\n{1}".format(listing_date(row['date']), html_escape.escape(row['base']))
+        cells.append(
+            '<div class="mdl-cell mdl-cell--6-col"><div class="mdl-card mdl-shadow--2dp">'
+            '<div class="mdl-card__title"><h5 class="header-style">{0} | {1}</h5>'
+            '<span>\n\t\t{2}\n\t</span></div>'
+            '<div class="mdl-card__supporting-text">\n{3}\n</div>'
+            '<div class="mdl-card__actions mdl-card--border">'
+            '<button class="mdc-button" onclick="location.href = \'/launches/details/{4}\'">Details</button>'
+            '</div></div></div>'.format(html_escape.escape(row['title_1']), html_escape.escape(row['title_2']),
+                                        html_escape.escape(row['company']), when, row['id']))
+
+    pagination = "".join(
+        '<button class="mdc-button mdc-button--raised" onclick="location.href = \'?page={0}\'">{1}</button>'.format(
+            target, label) for target, label in [(1, "FIRST"), (n_pages, "LAST")])
+
+    return HEADER + '<div class="mdl-grid">' + "".join(cells) + '</div><div class="pagination">' + pagination + \
+        '</div>' + FOOTER
+
+
+# 4) render_detail_page
+# This Function builds the detail page of a launch.
+#   As Arguments, the function takes one row of the launches (dictionary)
+#   It returns the HTML page as a string
+def render_detail_page(row):
+    # the status of the mission is written in the header, the specs of the rocket in the second card
+    status = {'1': '<span>Success</span>', '0': '<span>Failure</span>'}.get(row['status'], '')
+    specs = "".join('<div class="mdl-cell mdl-cell--6-col-desktop">{0}: {1}</div>'.format(
+        label, html_escape.escape(row[label])) for label in DETAIL_COLUMNS if label != 'status' and row[label])
+
+    return HEADER + \
+        '<div class="mdl-grid"><div class="mdl-cell mdl-cell--12-col"><h4>{0}</h4><h6 class="status">' \
+        '{1}</h6></div></div>'.format(html_escape.escape(row['title_2']), status) + \
+        '<div class="mdl-card"><div class="mdl-card__supporting-text">{0}<br>{1}</div></div>'.format(
+            html_escape.escape(row['company']), html_escape.escape(row['base'])) + \
+        '<div class="mdl-card"><div class="mdl-card__supporting-text"><div class="mdl-grid">{0}' \
+        '<div class="mdl-cell mdl-cell--12-col"></div></div></div></div>'.format(specs) + FOOTER
+
+
+# 5) expected_listing
+# This Function gives what parse_listing has to return for a listing page built by render_listing_page.
+#   As Arguments, the function takes the launches, the page number and the "Future"/"Past" flag
+#   It returns the list of launches stored as dictionaries
+def expected_listing(launches, page, future=False):
+    rows = launches.iloc[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+    return [{'id': int(row['id']), 'date': listing_date(row['date']), 'title_1': row['title_1'],
+             'title_2': row['title_2'], 'company': row['company'], 'base': row['base'], 'link': row['link']}
+            for row in rows.to_dict('records')]
+
+
+# 6) expected_detail
+# This Function gives what parse_detail has to return for a detail page built by render_detail_page.
+#   As Arguments, the function takes one row of the launches (dictionary)
+#   It returns the dictionary with the detailed information of the launch
+def expected_detail(row):
+    infos = {label: row[label] for label in DETAIL_COLUMNS if label != 'status' and row[label]}
+    infos['status'] = int(row['status'] == '1') if row['status'] in ('0', '1') else float('nan')
+    return infos
+
+
+# 7) FixtureServer
+# This class is a local HTTP server answering the requests of the scraper with the fixture pages:
+#   /launches/past/?page=N, /launches/?page=N and /launches/details/ID
+# It speaks HTTP/1.1 (the connections are kept alive), sends an ETag with every page and answers "304 Not
+# Modified" when the ETag is sent back, and can wait `latency` seconds before each answer to imitate the
+# round-trip to the real website, or answer "503 Service Unavailable" to check the retries: a share of the pages,
+# always the same ones (chosen from a checksum of their path), fail their first FAILED_ATTEMPTS requests, hence the
+# checks of the retries give the same result at every run. It counts the requests and the connections it received.
+#   As Arguments, the constructor takes the launches (DataFrame returned by load_launches), the latency in
+#   seconds, the share of pages failing (between 0 and 1) and the port (0 to let the system choose a free one)
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, launches, latency=0.0, error_rate=0.0, port=0):
+        super().__init__(("127.0.0.1", port), FixtureHandler)
+        self.launches = launches
+        self.rows = {int(row['id']): row for row in launches.to_dict('records')}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.connections = 0
+        self.bytes_sent = 0
+        self.attempts = {}
+        self._counter_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:{0}".format(self.server_address[1])
+
+    # This Method builds the page of a path, it returns None for an unknown path
+    def page(self, path):
+        match = re.match(r"^/launches/details/(\d+)$", path)
+        if match:
+            row = self.rows.get(int(match.group(1)))
+            return render_detail_page(row) if row is not None else None
+        match = re.match(r"^/launches/(past/)?\?page=(\d+)", path)
+        if match:
+            return render_listing_page(self.launches, int(match.group(2)), future=match.group(1) is None)
+        return None
+
+    # This Method tells whether a request of a path is answered "503 Service Unavailable"
+    def fails(self, path):
+        if not self.error_rate or zlib.crc32(path.encode()) % 1000 >= self.error_rate * 1000:
+            return False
+        with self._counter_lock:
+            self.attempts[path] = self.attempts.get(path, 0) + 1
+            return self.attempts[path] <= FAILED_ATTEMPTS
+
+    def count(self, requests=0, connections=0, bytes_sent=0):
+        with self._counter_lock:
+            self.requests += requests
+            self.connections += connections
+            self.bytes_sent += bytes_sent
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# 7.1) FixtureHandler
+# This class answers one connection of the FixtureServer
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # the headers and the body are written separately, without this the kept-alive connections wait for the
+    # delayed ACK of the client between the two
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count(connections=1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.count(requests=1)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        page = self.server.page(self.path)
+        if self.server.fails(self.path):
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if page is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = page.encode("utf-8")
+        etag = '"{0}"'.format(hashlib.sha1(body).hexdigest())
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(bytes_sent=len(body))
+
+
+# 8) serve_fixtures
+# This Function starts a FixtureServer in a background thread.
+#   As Arguments, the function takes optionally the launches (by default those of FIXTURE_CSV), the latency in
+#   seconds added to each answer, the share of pages failing (see FixtureServer) and the port
+#   It returns the running server: its base_url replaces "https://nextspaceflight.com" and stop() shuts it down
+def serve_fixtures(launches=None, latency=0.0, error_rate=0.0, port=0):
+    if launches is None:
+        launches = load_launches()
+    return FixtureServer(launches, latency, error_rate, port).start()
@@ -0,0 +1,249 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************       HTTP CACHE       *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module keeps the downloaded pages on disk, so that running the scraper again does not download again
+# the pages it already has. Past launches almost never change, hence most of the pages can be read back from
+# the disk instead of the network.
+#   - the bodies are stored by the SHA-256 of their content ("content-addressed"), so two urls returning the
+#     same page share one file
+#   - a small SQLite table maps every url to its body, its ETag / Last-Modified headers and the time it was
+#     downloaded and last read
+#   - a page younger than the TTL is returned straight from the disk, an older one is revalidated by sending
+#     the If-None-Match / If-Modified-Since headers: if the website answers "304 Not Modified" we keep the
+#     stored body, otherwise we store the new one
+#   - when the bodies take more than max_bytes, the least recently read ones are deleted
+# A page read from the disk does not write to the table right away: the times it was read (and revalidated) are
+# kept in memory and written with the next page stored, every TOUCH_COMMIT_EVERY pages read, or by commit(), so
+# that a crawl served from the cache does not wait for one transaction per page. The size of the bodies is
+# counted once when the cache is opened, then kept up to date as the pages are stored and deleted.
+
+# Hashlib: used to compute the SHA-256 of the pages. Sqlite3: embedded database of the standard library, used
+# for the url index.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from .metrics import metrics
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Folder where the cached pages are stored
+CACHE_DIR = ".http_cache"
+
+# After this many seconds a cached page is revalidated with the website (30 days)
+CACHE_TTL = 30 * 24 * 3600
+
+# Maximum size of the cached bodies in bytes (500 MB)
+CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# The times the pages were read are written to the table at the latest every TOUCH_COMMIT_EVERY pages read
+TOUCH_COMMIT_EVERY = 100
+
+
+# 1) ResponseCache
+# This class stores the pages on disk and decides whether a page has to be downloaded again.
+#   As Arguments, the constructor takes the folder of the cache, the TTL in seconds and the maximum size
+#   of the bodies in bytes
+class ResponseCache:
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+
+        # the same connection is shared by the download threads, hence the lock around every query
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                         " url TEXT PRIMARY KEY,"
+                         " digest TEXT NOT NULL,"
+                         " size INTEGER NOT NULL,"
+                         " etag TEXT,"
+                         " last_modified TEXT,"
+                         " fetched_at REAL NOT NULL,"
+                         " accessed_at REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._db.commit()
+
+        # the pages read and not written to the table yet: url -> (accessed_at, fetched_at or None), and the size of
+        # all the bodies of the table
+        self._touched = {}
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        # the size limit may have been lowered since the last run
+        self._evict()
+
+    # 1.1) fetch
+    # This Method returns the body of a url, reading it from the disk when possible.
+    #   As Arguments, the method takes the url and a function opening the url: it is called with the url and a
+    #   dictionary of request headers and must return the HTTP status, the response headers and the body.
+    #   Optionally a ttl (seconds) replacing the default one for this url
+    #   It returns the body of the page as bytes
+    def fetch(self, url, open_url, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        entry = self._lookup(url)
+
+        # fresh page: no network at all
+        if entry is not None and time.time() - entry['fetched_at'] < ttl:
+            body = self._read(entry['digest'])
+            if body is not None:
+                self._touch(url, refreshed=False)
+                metrics.count("cache_hits")
+                return body
+            entry = None
+
+        # stale page: we ask the website whether it changed since we downloaded it
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        status, response_headers, body = open_url(url, headers)
+
+        if status == 304 and entry is not None:
+            body = self._read(entry['digest'])
+            if body is not None:
+                self._touch(url, refreshed=True)
+                metrics.count("cache_revalidated")
+                return body
+            # the body disappeared from the disk, we download it again without conditions
+            status, response_headers, body = open_url(url, {})
+
+        self._store(url, body, response_headers.get('ETag'), response_headers.get('Last-Modified'))
+        metrics.count("cache_misses")
+        return body
+
+    # 1.2) clear
+    # This Method deletes all the cached pages
+    def clear(self):
+        with self._lock:
+            digests = [row[0] for row in self._db.execute("SELECT DISTINCT digest FROM responses")]
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self._touched.clear()
+            self._total = 0
+        for digest in digests:
+            self._remove_object(digest)
+
+    # 1.3) commit, close
+    # These Methods write the times the pages were read to the table, and close the cache
+    def commit(self):
+        with self._lock:
+            self._write_touched()
+            self._db.commit()
+
+    def close(self):
+        self.commit()
+        with self._lock:
+            self._db.close()
+
+    # support methods used above
+    def _path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def _lookup(self, url):
+        with self._lock:
+            row = self._db.execute("SELECT digest, etag, last_modified, fetched_at FROM responses WHERE url = ?",
+                                   (url,)).fetchone()
+            touched = self._touched.get(url)
+        if row is None:
+            return None
+        # a page revalidated since the table was written
+        fetched_at = touched[1] if touched is not None and touched[1] is not None else row[3]
+        return {'digest': row[0], 'etag': row[1], 'last_modified': row[2], 'fetched_at': fetched_at}
+
+    def _read(self, digest):
+        try:
+            with open(self._path(digest), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _touch(self, url, refreshed):
+        now = time.time()
+        with self._lock:
+            # a page revalidated earlier keeps its new fetched_at until it is written
+            fetched_at = now if refreshed else self._touched.get(url, (None, None))[1]
+            self._touched[url] = (now, fetched_at)
+            if len(self._touched) >= TOUCH_COMMIT_EVERY:
+                self._write_touched()
+                self._db.commit()
+
+    # writes the times the pages were read to the table, in the current transaction (called with the lock held)
+    def _write_touched(self):
+        if not self._touched:
+            return
+        self._db.executemany("UPDATE responses SET accessed_at = ?, fetched_at = COALESCE(?, fetched_at) "
+                             "WHERE url = ?",
+                             [(accessed_at, fetched_at, url)
+                              for url, (accessed_at, fetched_at) in self._touched.items()])
+        self._touched.clear()
+
+    def _store(self, url, body, etag, last_modified):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._path(digest)
+
+        # the body is written to a temporary file and renamed, so that a crash never leaves half a page
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = "{0}.{1}.tmp".format(path, threading.get_ident())
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+
+        now = time.time()
+        with self._lock:
+            self._write_touched()
+            old = self._db.execute("SELECT digest, size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (url, digest, len(body), etag, last_modified, now, now))
+            self._db.commit()
+            self._total += len(body) - (old[1] if old is not None else 0)
+        if old is not None and old[0] != digest:
+            self._release(old[0])
+        self._evict()
+
+    def _release(self, digest):
+        # a body is deleted only when no url points to it anymore
+        with self._lock:
+            used = self._db.execute("SELECT 1 FROM responses WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        if used is None:
+            self._remove_object(digest)
+
+    def _remove_object(self, digest):
+        try:
+            os.remove(self._path(digest))
+        except OSError:
+            pass
+
+    def _evict(self):
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._total <= self.max_bytes:
+                return
+            # the least recently read pages are chosen with the times of the pages read so far
+            self._write_touched()
+            removed = []
+            for url, digest, size in self._db.execute(
+                    "SELECT url, digest, size FROM responses ORDER BY accessed_at").fetchall():
+                if self._total <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                removed.append(digest)
+                self._total -= size
+            self._db.commit()
+        for digest in set(removed):
+            self._release(digest)
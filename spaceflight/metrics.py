@@ -0,0 +1,246 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************        METRICS         *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module measures where a crawl spends its time and what it loses on the way. The other modules report to
+# the shared `metrics` object:
+#   - the time spent in each stage, as histograms: "fetch" (download, from the network or the cache), "parse"
+#     (building the tree of a page), "extract" (reading the fields of the cards and detail pages) and "assemble"
+#     (putting the launches and their details together)
+#   - counters: listing pages and launches scraped, bytes downloaded, requests retried, pages read from the cache
+#     (fresh, revalidated or downloaded), and the cards dropped or details lost, by reason
+#   - the pages and launches per second since the crawl started
+# The measures can be printed (summary), saved as JSON (write_json) or in the text format of Prometheus
+# (write_prometheus), e.g. to be collected by the node exporter.
+
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Upper bounds (in seconds) of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, math.inf)
+
+# Prefix of the names of the Prometheus metrics
+PROMETHEUS_PREFIX = "spaceflight_scraper"
+
+
+# 1) Histogram
+# This class counts durations in the buckets of LATENCY_BUCKETS, with their sum, as Prometheus histograms do.
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+        self.total += seconds
+        self.count += 1
+
+    # This Method estimates a quantile (e.g. 0.5 for the median) from the buckets: it returns the upper bound of
+    # the bucket the quantile falls in, or None when it falls in the last bucket, which has no upper bound (the
+    # JSON export writes null there, JSON has no infinity)
+    def quantile(self, q):
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bound if bound != math.inf else None
+        return 0.0
+
+    def to_dict(self):
+        cumulative, seen = {}, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            cumulative["+Inf" if bound == math.inf else repr(bound)] = seen
+        return {'count': self.count, 'sum': self.total, 'mean': self.total / self.count if self.count else 0.0,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'buckets': cumulative}
+
+
+# 2) CrawlMetrics
+# This class holds the histograms and the counters of a crawl. Its methods can be called from any thread.
+class CrawlMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    # 2.1) reset
+    # This Method forgets everything measured so far, it is called when a crawl starts
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.stages = defaultdict(Histogram)
+            self.counters = defaultdict(int)
+            self.dropped = defaultdict(int)
+
+    # 2.2) stage
+    # This Context Manager measures the time spent in the block and adds it to the histogram of a stage:
+    #   with metrics.stage("parse"):
+    #       ...
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self.stages[name].observe(seconds)
+
+    # 2.3) count
+    # This Method adds a value (1 by default) to a counter, e.g. "launches" or "bytes_downloaded"
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    # 2.4) drop
+    # This Method counts a card (or a detail page) lost and the reason why, e.g. "listing:title"
+    def drop(self, reason):
+        with self._lock:
+            self.dropped[reason] += 1
+
+    # 2.5) rates
+    # This Method computes the values derived from the counters: the pages and launches per second since the
+    # crawl started and the share of the pages read from the cache
+    #   It returns a dictionary
+    def rates(self):
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            hits = self.counters['cache_hits'] + self.counters['cache_revalidated']
+            lookups = hits + self.counters['cache_misses']
+            return {'elapsed_seconds': elapsed,
+                    'pages_per_second': self.counters['listing_pages'] / elapsed,
+                    'launches_per_second': self.counters['launches'] / elapsed,
+                    'cache_hit_ratio': hits / lookups if lookups else 0.0}
+
+    # 2.6) to_dict
+    # This Method gives all the measures as a dictionary (the content of the JSON export)
+    def to_dict(self):
+        rates = self.rates()
+        with self._lock:
+            return {'started': self.started,
+                    'rates': rates,
+                    'counters': dict(self.counters),
+                    'dropped': dict(self.dropped),
+                    'stages': {name: histogram.to_dict() for name, histogram in self.stages.items()}}
+
+    # 2.7) summary
+    # This Method gives a one-line summary of the crawl, printed as a live feedback while scraping
+    def summary(self):
+        rates = self.rates()
+        with self._lock:
+            stages = ", ".join("{0} {1:.0f} ms".format(name, histogram.total / histogram.count * 1000)
+                               for name, histogram in sorted(self.stages.items()) if histogram.count)
+            return "{0} pages, {1} launches ({2:.2f} pages/s, {3:.1f} launches/s), {4:.1f} MB downloaded, " \
+                   "cache hit ratio {5:.0%}, {6} dropped | mean {7}".format(
+                       self.counters['listing_pages'], self.counters['launches'], rates['pages_per_second'],
+                       rates['launches_per_second'], self.counters['bytes_downloaded'] / 1e6,
+                       rates['cache_hit_ratio'], sum(self.dropped.values()), stages)
+
+    # 2.8) write_json
+    # This Method saves the measures in a JSON file.
+    #   As Arguments, the method takes the path of the file
+    def write_json(self, path):
+        write_atomic(path, json.dumps(self.to_dict(), indent=2, allow_nan=False))
+
+    # 2.9) write_prometheus
+    # This Method saves the measures in the text format read by Prometheus (e.g. by the textfile collector of
+    # the node exporter).
+    #   As Arguments, the method takes the path of the file
+    def write_prometheus(self, path):
+        write_atomic(path, self.to_prometheus())
+
+    def to_prometheus(self):
+        rates = self.rates()
+        lines = []
+        with self._lock:
+            name = PROMETHEUS_PREFIX + "_stage_seconds"
+            lines += ["# HELP {0} Time spent in each stage of the crawl.".format(name),
+                      "# TYPE {0} histogram".format(name)]
+            for stage, histogram in sorted(self.stages.items()):
+                seen = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    seen += count
+                    lines.append('{0}_bucket{{stage="{1}",le="{2}"}} {3}'.format(
+                        name, stage, "+Inf" if bound == math.inf else repr(bound), seen))
+                lines.append('{0}_sum{{stage="{1}"}} {2!r}'.format(name, stage, histogram.total))
+                lines.append('{0}_count{{stage="{1}"}} {2}'.format(name, stage, histogram.count))
+
+            for counter, value in sorted(self.counters.items()):
+                name = "{0}_{1}_total".format(PROMETHEUS_PREFIX, counter)
+                lines += ["# TYPE {0} counter".format(name), "{0} {1}".format(name, value)]
+
+            name = PROMETHEUS_PREFIX + "_dropped_total"
+            lines += ["# HELP {0} Cards or detail pages lost, by reason.".format(name),
+                      "# TYPE {0} counter".format(name)]
+            for reason, value in sorted(self.dropped.items()):
+                lines.append('{0}{{reason="{1}"}} {2}'.format(name, reason.replace('"', "'"), value))
+
+        for rate, value in rates.items():
+            name = "{0}_{1}".format(PROMETHEUS_PREFIX, rate)
+            lines += ["# TYPE {0} gauge".format(name), "{0} {1!r}".format(name, value)]
+        return "\n".join(lines) + "\n"
+
+    # 2.10) take
+    # This Method gives the counters, the cards dropped and the histograms measured since the last call (or the
+    # last reset) and forgets them. A worker process (see reextract in archive.py) measures in its own copy of
+    # `metrics`, it sends what it measured to the parent process, which merges it.
+    #   It returns a dictionary, which can be pickled
+    def take(self):
+        with self._lock:
+            measures = {'counters': dict(self.counters),
+                        'dropped': dict(self.dropped),
+                        'stages': {name: (histogram.counts, histogram.total, histogram.count)
+                                   for name, histogram in self.stages.items()}}
+            self.stages = defaultdict(Histogram)
+            self.counters = defaultdict(int)
+            self.dropped = defaultdict(int)
+        return measures
+
+    # 2.11) merge
+    # This Method adds the measures given by take() (e.g. in another process) to these ones.
+    #   As Arguments, the method takes the dictionary returned by take()
+    def merge(self, measures):
+        with self._lock:
+            for name, value in measures['counters'].items():
+                self.counters[name] += value
+            for reason, value in measures['dropped'].items():
+                self.dropped[reason] += value
+            for name, (counts, total, count) in measures['stages'].items():
+                histogram = self.stages[name]
+                histogram.counts = [mine + theirs for mine, theirs in zip(histogram.counts, counts)]
+                histogram.total += total
+                histogram.count += count
+
+
+# 3) write_atomic
+# This Function writes a text file next to its final path and renames it, so that a reader (e.g. Prometheus)
+# never sees half a file.
+#   As Arguments, the function takes the path and the text
+def write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# the measures of the program, shared by all the modules
+metrics = CrawlMetrics()
@@ -0,0 +1,132 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************     NORMALIZATION      *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module turns the scraped launches, where the specs of the rockets are stored as the strings shown on
+# the website ("3.8 m", "2,993 kN", "$64.68 million"), into typed columns:
+#   - the specs become float32 (or Int16 for the counts) columns, with the unit in the column name, e.g.
+#     "Liftoff Thrust" -> "Liftoff Thrust (kN)"
+#   - company, Status, base, title_1 (the rocket) and the Country of the base (last part of the base, e.g.
+#     "China") become categoricals
+#   - status becomes a nullable boolean (True = success)
+#   - the year and the Decade of the launch are added, so that the charts do not have to compute them
+# All the conversions work on whole columns with the pandas string methods (no Python loop over the rows),
+# and the result takes a fraction of the memory of the strings. The derived columns (Country, year, Decade)
+# are stored with the typed launches (see storage.py), hence they are computed once and not at every chart.
+
+import numpy as np
+import pandas as pd
+
+from .records import VEHICLE_COLUMNS
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Specs stored with a unit: scraped column -> (typed column, {unit written on the website: factor to apply})
+# a value written with a unit that is not listed here becomes NaN
+MEASURES = {
+    'Fairing Diameter': ('Fairing Diameter (m)', {'m': 1}),
+    'Fairing Height': ('Fairing Height (m)', {'m': 1}),
+    'Rocket Height': ('Rocket Height (m)', {'m': 1}),
+    'Liftoff Thrust': ('Liftoff Thrust (kN)', {'kN': 1, 'MN': 1000}),
+    'Payload to LEO': ('Payload to LEO (kg)', {'kg': 1, 't': 1000}),
+    'Payload to GTO': ('Payload to GTO (kg)', {'kg': 1, 't': 1000}),
+    'Price': ('Price ($M)', {'million': 1, 'billion': 1000}),
+}
+
+# Specs which are plain counts
+COUNTS = ['Stages', 'Strap-ons']
+
+# Columns with few distinct values (companies, bases, rockets...), stored as categoricals
+CATEGORIES = ['company', 'Status', 'Country', 'base', 'title_1']
+
+# Typed columns describing the rocket of a launch (see VEHICLE_COLUMNS in records.py and vehicles.py), in the order
+# of the scraped columns
+VEHICLE_SPECS = [MEASURES[column][0] if column in MEASURES else column for column in VEHICLE_COLUMNS]
+
+
+# 1) parse_measure
+# This Function converts a column of strings like "2,993 kN" or "$64.68 million" into numbers.
+#   As Arguments, the function takes the column (Series) and the dictionary unit -> factor
+#   It returns a float32 Series, NaN where the value is missing or its unit is unknown
+def parse_measure(column, units):
+    # we capture the number (dropping the thousands separators) and the word following it
+    parts = column.astype("string").str.extract(r"([\d.,]+)\s*([A-Za-z]+)?")
+    numbers = pd.to_numeric(parts[0].str.replace(",", "", regex=False), errors="coerce")
+    factors = parts[1].map(units).astype("float64")
+    return (numbers * factors).astype("float32")
+
+
+# 2) parse_count
+# This Function converts a column of counts stored as strings ("3") or floats (3.0) into nullable integers.
+#   As Arguments, the function takes the column (Series)
+#   It returns an Int16 Series
+def parse_count(column):
+    return pd.to_numeric(column, errors="coerce").round().astype("Int16")
+
+
+# 3) base_country
+# This Function extracts the Country of each launch from its base, i.e. the part after the last comma:
+# "Site 9401 (SLS-2), Jiuquan Satellite Launch Center, China" -> "China"
+# There are only a few hundred different bases, hence we split each distinct base once (the categories of the
+# base column) and we look up the country of every launch through the category codes.
+#   As Arguments, the function takes the base column (Series)
+#   It returns the categorical Series of the countries
+def base_country(base):
+    base = base.astype("category")
+    countries = pd.Categorical(pd.Series(base.cat.categories).str.rsplit(", ", n=1).str[-1])
+
+    # the code -1 marks a missing base, which gives a missing country
+    base_codes = base.cat.codes.to_numpy()
+    codes = np.where(base_codes < 0, -1, countries.codes[base_codes])
+    return pd.Series(pd.Categorical.from_codes(codes, countries.categories), index=base.index)
+
+
+# 3.1) add_derived_columns
+# This Function adds to the launches the columns the charts need, when they are not there yet: the Country
+# (see base_country), the year and the Decade of the launch.
+#   As Arguments, the function takes the DataFrame of the launches (with 'base' and 'date')
+#   It returns a new DataFrame, the one passed as argument is not modified
+def add_derived_columns(res):
+    res = res.copy(deep=False)
+    if 'Country' not in res and 'base' in res:
+        res['Country'] = base_country(res['base'])
+    if 'year' not in res and 'date' in res:
+        res['year'] = res['date'].dt.year.astype("Int16")
+    if 'Decade' not in res and 'year' in res:
+        res['Decade'] = (res['year'] // 10 * 10).astype("Int16")
+    return res
+
+
+# 4) normalize_launches
+# This Function builds the typed version of the launches.
+#   As Arguments, the function takes the DataFrame of the launches (as scraped or as read from the csv file)
+#   It returns a new DataFrame: the spec columns are replaced by their typed version, Country, year and Decade
+#   are added and the other columns are kept as they are (apart from the categoricals and status)
+def normalize_launches(res):
+    res = res.copy()
+
+    for column, (typed_column, units) in MEASURES.items():
+        if column in res:
+            res.insert(res.columns.get_loc(column), typed_column, parse_measure(res[column], units))
+            del res[column]
+
+    for column in COUNTS:
+        if column in res:
+            res[column] = parse_count(res[column])
+
+    res = add_derived_columns(res)
+
+    for column in CATEGORIES:
+        if column in res:
+            res[column] = res[column].astype("category")
+
+    # status is 1 for a success and 0 for a failure, missing when the website does not tell
+    if 'status' in res:
+        res['status'] = pd.to_numeric(res['status'], errors="coerce").astype("Float64").astype("boolean")
+
+    return res
@@ -0,0 +1,290 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************        PARSING         *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module extracts the launches from the downloaded HTML pages. It is kept apart from the downloads (see
+# main.py) so that the same extraction can be run on pages saved on disk, and so that the HTML parser can be
+# changed in one place. PARSER chooses how the pages are turned into a tree:
+#   - "lxml": the page is parsed by lxml (written in C) and the extraction runs directly on the lxml tree
+#     through the small LxmlNode wrapper below, which offers the few BeautifulSoup methods we use (find,
+#     find_all, text, get). It is several times faster than BeautifulSoup, hence it is used whenever the lxml
+#     package is installed
+#   - any other name ("html.parser", "html5lib", ...) is passed to BeautifulSoup, and each page is parsed with
+#     a SoupStrainer, so that only the elements the extraction needs are turned into a tree (the grid of
+#     launches for a listing page, the two supporting-text blocks and the status header for a detail page)
+#     and all the rest of the page (menus, scripts, footer) is skipped
+# Whatever the parser, the extraction code is the same, and benchmarks/check_parsers.py checks that every
+# parser gives the same launches field for field.
+# The time spent building the trees and extracting the fields, and the cards dropped because a field could not be
+# read, are reported to metrics.py.
+
+import numpy as np
+from bs4 import BeautifulSoup, SoupStrainer, UnicodeDammit
+
+from .metrics import metrics
+
+# Lxml is an optional dependency: without it we fall back to BeautifulSoup with the parser of the standard library
+try:
+    import lxml.html
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# the parts of the pages we need, see the functions below
+LISTING_STRAINER = SoupStrainer('div', {'class': 'mdl-grid'})
+PAGINATION_STRAINER = SoupStrainer('button', {'class': 'mdc-button mdc-button--raised'})
+DETAIL_STRAINER = SoupStrainer(['div', 'h6'], {'class': ['mdl-card__supporting-text', 'status']})
+STATUS_STRAINER = SoupStrainer('h6', {'class': 'status'})
+
+
+# 1) LxmlNode
+# This class wraps an element of an lxml tree and offers the BeautifulSoup methods used by the extraction.
+# As in BeautifulSoup, a {'class': ...} filter matches an element having that class among its classes or
+# having exactly that class attribute.
+class LxmlNode:
+    def __init__(self, element):
+        self.element = element
+
+    @property
+    def text(self):
+        return self.element.text_content()
+
+    def get(self, attribute):
+        return self.element.get(attribute)
+
+    def find(self, name, attrs=None):
+        for node in self._iter(name, attrs):
+            return node
+        return None
+
+    def find_all(self, name, attrs=None):
+        return list(self._iter(name, attrs))
+
+    def _iter(self, name, attrs):
+        wanted = (attrs or {}).get('class')
+        for element in self.element.iterdescendants(name):
+            if wanted is not None:
+                classes = element.get('class')
+                if classes is None or (classes != wanted and wanted not in classes.split()):
+                    continue
+            yield LxmlNode(element)
+
+
+# 2) make_soup
+# This Function parses an HTML page. With BeautifulSoup only the elements selected by the strainer are kept.
+#   As Arguments, the function takes the page (bytes or string), the strainer (None to keep the whole page)
+#   and optionally the parser to use (by default PARSER)
+#   It returns the tree (a BeautifulSoup object, or an LxmlNode for the "lxml" parser)
+def make_soup(html, strainer=None, parser=None):
+    parser = parser or PARSER
+    if parser == "lxml":
+        # the bytes are decoded as BeautifulSoup would do (declared charset, then utf-8, then windows-1252), since
+        # lxml alone falls back to latin-1 on pages that do not declare their charset
+        if isinstance(html, bytes):
+            html = UnicodeDammit(html, is_html=True).unicode_markup
+        return LxmlNode(lxml.html.document_fromstring(html))
+    return BeautifulSoup(html, parser, parse_only=strainer)
+
+
+# 3) parse_listing
+# This Function collects the launches shown in a listing page (without their details).
+#   As Arguments, the function takes the page, the "Future"/"Past" flag and optionally the parser to use
+#   It returns the list of launches of the page stored as dictionaries
+def parse_listing(html, future=False, parser=None):
+    # Parsing the page (with lxml or BS4, see make_soup), i.e. identifying HTML elements
+    with metrics.stage("parse"):
+        soup = make_soup(html, LISTING_STRAINER, parser)
+
+    with metrics.stage("extract"):
+        page_launches = extract_listing(soup, future)
+    metrics.count("listing_pages")
+    return page_launches
+
+
+# 3.1) extract_listing
+# This Function reads the launches from the tree of a listing page.
+#   As Arguments, the function takes the tree (see make_soup) and the "Future"/"Past" flag
+#   It returns the list of launches of the page stored as dictionaries
+def extract_listing(soup, future=False):
+    # page_launches will contain the launches stored as dictionaries (see later for more info)
+    page_launches = []
+
+    # Storing the  by going through the HTML formatted page and searching for rocket launches as HTML elements:
+    # the find() function searches for all the div elements with a specific class in the downloaded page and returns
+    # ONLY the first element. In our case, per each page we have one mdl-grid class div containing many "mdl-cell"
+    # class divs, which we fetch with the find_all() function and store in the cells Set.
+    table = soup.find('div', {'class': 'mdl-grid'})
+    cells = table.find_all('div', {'class': 'mdl-cell'})
+
+    # Looping through rocket launches of this page and attempting to collect and store the information of each launch
+    for cell in cells:
+        # the field being read, which tells why a card is dropped if something goes wrong
+        step = "company"
+        try:
+            # Company
+            # The Company name is always contained inside a span element which is inside a "mdl-card__title" class div
+            # we then use the functions replace() and strip() to trim the string (= to get rid of unwanted backspace or tabs)
+            comp_cell = cell.find('div', {"class": "mdl-card__title"})
+            company = comp_cell.find("span").text
+            company = company.replace("\n", "").replace("\t", "").strip()
+
+            # Title
+            # The title is always formatted as a h5 div, but since there are sometimes 2 titles divided by a "|" character
+            # we collect them both through the split() function
+            step = "title"
+            title = cell.find('h5').text.strip()
+            title_1, title_2 = title.split(' | ')
+
+            # Date and Base
+            # The Date and Base of the launches are inside a "mdl-card_supporting-text" class div one on top of each other
+            # (= divided by a \n character) inside a unique string.
+            # For the Dates: In some cases, some dates begin with the "NET" characters when it is estimated or the Day is not available,
+            # hence we remove this portion of the string
+            # For the past launches we identify the base by splitting the string on the UTC char, always present, we then remove any
+            # unneeded backspace "\n" and we trim the string.
+            step = "date and base"
+            text = cell.find('div', {"class": "mdl-card__supporting-text"}).text.strip()
+            date = text.split('\n')[0].replace("NET ", '')
+            if future:
+                base = text.split("\n")[2].replace("\n", '').strip()
+            else:
+                base = text.split('UTC')[1].replace("\n", '').strip()
+
+            # Link to additional information
+            # As explained, each rocket launch has additional data in a separate page whose link is embedded in a button. Every
+            # cell as a "button" HTML element with the onclick HTML property of redirecting the user to the relative page.
+            # we scrape the link by removing the unwanted "location.href = '" bit of the string and we select the splitted element
+            # after this one '[1]'
+            step = "link"
+            link = cell.find('button').get("onclick").split("location.href = '")[1][:-1]
+
+            # Rocket Launch Identifier
+            # Per each rocket, we scrape the ID from the variables that the website uses to fetch the pages and are shown in the url bar,
+            # indeed, we notice that the detailed information page is always called with the following url:
+            # "https://nextspaceflight.com/launches/details/5056" hence by splitting on "details/" and slicing on the last element [-1]
+            # we collect the id of the rocket. To avoid any string stored as integer, we also cast it.
+            step = "id"
+            rocket_id = int(link.split("details/")[-1])
+
+            # Summary
+            # We store all the data we scraped inside a Dictionary and we label each element accordingly
+            launch = {
+                'id': rocket_id,
+                'date': date,
+                'title_1': title_1,
+                'title_2': title_2,
+                'company': company,
+                'base': base,
+                'link': link,
+            }
+
+            # We append the launch to the list of dictionaries we created to be able to go through
+            # them independently
+            page_launches.append(launch)
+
+        # getting rid of unwanted exceptions generated while reading through the HTML doc, some of the
+        # BS4 ones can be ignored, but we count the cards dropped by the field which could not be read so that a
+        # change of the layout of the website does not go unnoticed
+        except Exception as e:
+            metrics.drop("listing: " + step)
+
+    return page_launches
+
+
+# 4) parse_page_count
+# This Function reads how many listing pages the website has from the first listing page.
+#   As Arguments, the function takes the page and optionally the parser to use
+#   It returns the number of pages (integer)
+def parse_page_count(html, parser=None):
+    soup = make_soup(html, PAGINATION_STRAINER, parser)
+
+    # we notice that the information related to the number of pages is contained in the bottom-of-the-page button
+    # redirecting to the "LAST" page...
+    button = soup.find_all('button', {'class': 'mdc-button mdc-button--raised'})[1]
+
+    # ...hence we collect the link from the onclick HTML property and we parse it to scrape the integer we need
+    return int(button.get("onclick").split("?page=")[-1].split("&")[0].replace("'", ""))
+
+
+# 5) parse_detail
+# This Function collects the detailed information of a launch from its detail page.
+#   As Arguments, the function takes the page and optionally the parser to use
+#   It returns a dictionary with the detailed information of the launch (labels of the page and 'status').
+#   It raises an exception if the page does not have the expected structure
+def parse_detail(html, parser=None):
+    # we parse the page, same as before
+    with metrics.stage("parse"):
+        soup = make_soup(html, DETAIL_STRAINER, parser)
+
+    with metrics.stage("extract"):
+        return extract_detail(soup)
+
+
+# 5.1) extract_detail
+# This Function reads the detailed information of a launch from the tree of its detail page.
+#   As Arguments, the function takes the tree (see make_soup)
+#   It returns a dictionary with the detailed information of the launch
+def extract_detail(soup):
+    # we create the data structures to replicate a portion of the HTML structure of the page with the divs
+    # we are interested in
+    table = soup.find_all("div", {'class': 'mdl-card__supporting-text'})[1]
+    cells = table.find_all('div', {'class': 'mdl-cell'})
+
+    # we initialize an empty dictionary to store the information we will retrieve
+    infos = {}
+
+    # Launch Details
+    # we populate the dictionary by looping through the "mdl-cell" class divs o the detail page. We noticed that
+    # every attribute is always divided by a ":" from its correspondent value, hence through the split function
+    # we are able to capture all the information. Since there might be "mdl-cell" class divs used for other purposes
+    # or left empty, we also handle exceptions by ignoring them
+    for cell in cells:
+        try:
+            label, value = cell.text.split(": ")
+            infos[label] = value
+        except:
+            pass
+
+    # Mission Status (see extract_status below)
+    infos['status'] = extract_status(soup)
+
+    return infos
+
+
+# 5.2) parse_status
+# This Function only collects the status of the mission from a detail page, when the specs of the rocket are
+# already known (see vehicles.py): with BeautifulSoup only the status header is turned into a tree, and the cells
+# of the specs are not read.
+#   As Arguments, the function takes the page and optionally the parser to use
+#   It returns a dictionary with the 'status' of the launch
+def parse_status(html, parser=None):
+    with metrics.stage("parse"):
+        soup = make_soup(html, STATUS_STRAINER, parser)
+
+    with metrics.stage("extract"):
+        return {'status': extract_status(soup)}
+
+
+# 5.3) extract_status
+# This Function reads the status of the mission from the tree of a detail page.
+#   As Arguments, the function takes the tree (see make_soup)
+#   It returns 1 for a success, 0 for a failure and NaN when the page does not tell
+def extract_status(soup):
+    # As visible in the website, the status appears in Green or Red on top of each page.
+    # We therefore try to scrape this information from a "status"-class div and we look for
+    # the span element containing the "Success" string. We store it in our
+    # infos dictionary under the 'status' key as an integer with 1 being
+    # success and 0 a failure. We handle exceptions storing as numpy NaN value all the other elements
+    try:
+        status = soup.find('h6', {'class': 'status'}).find('span')
+        return int(status.text == 'Success')
+    except Exception as e:
+        metrics.count("details_without_status")
+        return np.nan
@@ -0,0 +1,26 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************    WORKER PROCESSES    *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# The charts (see render_charts in charts.py) and the re-extraction of the archived pages (see reextract in
+# archive.py) run in pools of worker processes. Forking the workers is the fastest way to start them (they start
+# with the modules already imported and the data already in memory), but forking a process where other threads
+# are running can deadlock: a lock held by another thread at the moment of the fork (the event loop of the aiohttp
+# client, the sqlite connections of the cache, the logging module...) stays locked forever in the child. Hence we
+# only fork when the calling thread is the only one, and start clean processes ("forkserver", or "spawn" where
+# forkserver does not exist) otherwise.
+
+import multiprocessing
+import threading
+
+
+# 1) worker_context
+# This Function chooses how the worker processes are started.
+#   It returns the multiprocessing context to give to ProcessPoolExecutor
+def worker_context():
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods and threading.active_count() == 1:
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
@@ -0,0 +1,54 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************        RECORDS         *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module defines the columns of a scraped launch and the helpers turning the scraped launches into a
+# DataFrame. While scraping we only keep plain dictionaries (one per launch), which are cheap to create, and
+# we build a single DataFrame at the very end instead of one small DataFrame per launch.
+
+import pandas as pd
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Columns scraped from the listing pages (see scrape_listing in main.py), 'id' is used as index
+LAUNCH_COLUMNS = ['date', 'title_1', 'title_2', 'company', 'base', 'link']
+
+# Labels scraped from the detail pages (see get_detailed_info in main.py) plus the mission status
+DETAIL_COLUMNS = ['Fairing Diameter', 'Fairing Height', 'Liftoff Thrust', 'Payload to GTO', 'Payload to LEO',
+                  'Price', 'Rocket Height', 'Stages', 'Status', 'Strap-ons', 'status']
+
+# Labels of the detail pages which describe the rocket (the vehicle, 'title_1') and not the launch: they are the
+# same for every launch of a rocket (see vehicles.py)
+VEHICLE_COLUMNS = [column for column in DETAIL_COLUMNS if column != 'status']
+
+# All the columns of a launch, in the same order as the header of launches_until_2022.csv
+COLUMNS = sorted(LAUNCH_COLUMNS + DETAIL_COLUMNS)
+
+
+# 1) make_record
+# This Function puts together a launch scraped from a listing page and its detailed information.
+#   As Arguments, the function takes the launch (dictionary with 'id' and the LAUNCH_COLUMNS) and its
+#   detailed information (dictionary returned by get_detailed_info)
+#   It returns one dictionary with all the information on the launch
+def make_record(launch, detail):
+    record = dict(launch)
+    record.update(detail)
+    return record
+
+
+# 2) records_to_frame
+# This Function builds the DataFrame of a list of launches in one go.
+#   As Arguments, the function takes the list of records (dictionaries returned by make_record)
+#   It returns a DataFrame indexed by the launch id, with the columns of COLUMNS (missing values are NaN and
+#   labels that are not in COLUMNS are ignored)
+def records_to_frame(records):
+    res = pd.DataFrame.from_records(records, columns=['id'] + COLUMNS).set_index('id')
+
+    # we convert to a datetime format the dates stored as string, once for all the launches
+    res['date'] = pd.to_datetime(res['date'])
+    return res
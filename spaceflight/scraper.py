@@ -0,0 +1,489 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************        SCRAPER         *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module holds the scraping functions of the program: the pages of nextspaceflight.com are downloaded, the
+# launches and their details are extracted and saved in csv (and Parquet/Feather) files. The charts are drawn
+# by charts.py and the command line is in cli.py.
+
+# Pandas: pandas is a software library written for the Python programming language for data manipulation
+# and analysis.In particular, it offers data structures and operations for manipulating numerical tables
+# and time series.
+# Used to save the scraped pages into DataFrames objects
+
+# BeautifulSoup4: Beautiful Soup is a Python package for parsing HTML and XML documents. It creates a
+# parse tree for parsed pages that can be used to extract data from HTML, which is useful for web scraping
+# Used to iterate through the pages of the website and grab specific content (see parsing.py)
+
+# Fetching: our own module (fetching.py) with the download helpers, used to download the pages while respecting
+# a maximum number of requests per second and to fetch the detail pages concurrently
+
+# Async_fetching: our own module (async_fetching.py) sending the requests with aiohttp, which keeps the connections
+# to the website open between requests, when it is installed
+
+# Http_cache: our own module (http_cache.py) keeping the downloaded pages on disk, so that running the scraper
+# again only downloads the pages that changed
+
+# Parsing: our own module (parsing.py) extracting the launches from the downloaded pages, with the lxml parser
+# when it is installed
+
+# Records: our own module (records.py) with the columns of a launch and the helpers building the DataFrame of the
+# scraped launches
+
+# Normalize: our own module (normalize.py) converting the specs scraped as strings ("2,993 kN") into typed columns
+
+# Storage: our own module (storage.py) storing the typed launches in Parquet/Feather files next to the csv files
+
+# Checkpoints: our own module (checkpoints.py) saving every scraped page on disk, so that a crawl which was stopped
+# can be resumed where it stopped
+
+# Streaming: our own module (streaming.py) passing the launches, while they are scraped, to "sinks" writing them to a
+# file, counting them or printing them (see stream_launches)
+
+# Metrics: our own module (metrics.py) measuring the time spent downloading, parsing and assembling the pages,
+# the pages and launches scraped per second, the cache hit ratio and the cards dropped
+
+# Cube: our own module (cube.py) keeping the number of launches per year, country, company and base, which is all
+# the charts need
+
+import pandas as pd
+
+from .fetching import download, fetch_all, pipelined_crawl, streamed_crawl
+from .records import make_record, records_to_frame
+from .parsing import parse_detail, parse_listing, parse_page_count, parse_status
+from .storage import launches_path, load_launches, save_launches, save_launches_chunks
+from .checkpoints import CrawlCheckpoint, checkpoint_path
+from .metrics import metrics
+from .vehicles import vehicle_specs
+from .cube import refresh_cube, update_cube
+
+
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************     Global Variables   *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# Scraped website's URL defined as a constant
+base_url = "https://nextspaceflight.com"
+
+# Number of detail pages downloaded at the same time by scrape_page. Set it to 1 to download them one
+# after the other as before
+MAX_WORKERS = 8
+
+# Number of listing pages that crawl_pages may download ahead of the page whose details are being collected
+PREFETCH_PAGES = 2
+
+# Whether the downloaded pages are kept in the on-disk cache (.http_cache folder). The detail pages of a past
+# launch are kept as long as the TTL of the cache (30 days) while the listing pages, which change every time a new
+# launch is added, and the detail pages of the upcoming launches, whose date and status change until the launch,
+# are revalidated after LISTING_CACHE_TTL seconds
+USE_HTTP_CACHE = True
+LISTING_CACHE_TTL = 3600
+
+# Whether the requests are sent with the pooled aiohttp client (see async_fetching.py), which reuses the
+# connections to the website, instead of urllib which opens a new connection for each page
+USE_ASYNC_CLIENT = True
+
+# Whether a full scrape stopped before the end (error, Ctrl-C...) is resumed from the pages already saved in its
+# checkpoint file (see checkpoints.py) instead of starting again from page 1
+RESUME_CRAWL = True
+
+# Files where the measures of the crawl are saved at the end (see metrics.py): JSON, and the text format read by
+# Prometheus. Set them to None to skip them
+METRICS_JSON = "crawl_metrics.json"
+METRICS_PROMETHEUS = "crawl_metrics.prom"
+
+# Whether the specs of a rocket read on the detail page of one of its launches are reused for its other launches,
+# whose detail pages are then only read for the status of the mission (see vehicles.py)
+REUSE_VEHICLE_SPECS = True
+
+# Whether every downloaded page is kept in the archive of the pages (see archive.py), so that the launches can be
+# extracted again later without crawling the website ("python -m spaceflight reextract")
+ARCHIVE_PAGES = True
+
+
+# or less rocket launches listed
+# (ca. 215 pages) and per each of them we will extract info on
+
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************    SUPPORT FUNCTIONS   *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# 1) scrape_page:
+# This Function first downloads the HTML page and loops through the 30 the displayed launches (30 launches
+# per page) including the link to the 'detail' page of each launch.
+#   As Arguments, the function takes the page (integer, here not defined as int), a flag used to scrape
+#   either "Future" or "Past" launches and the number of detail pages to download at the same time (by default
+#   MAX_WORKERS, read when the function is called)
+#   It returns a DataFrame with the scraped launches in it.
+def scrape_page(page, future=False, max_workers=None):
+    # page_launches will contain the launches stored as dictionaries (see scrape_listing() for more info)
+    page_launches = scrape_listing(page, future)
+
+    # We then proceed to get detailed information for each rocket by calling the get_detailed_info()
+    # function defined below. The detail pages are downloaded max_workers at a time and fetch_all() gives
+    # back the dictionaries with detailed info returned by the function 2 in the same order as the launches
+    page_details = fetch_all(lambda launch: get_launch_details(launch, future), page_launches,
+                             max_workers or MAX_WORKERS)
+
+    # we put the launches and their details together and we store the result of our scraping in a DataFrame
+    # with the detailed information indexed by the relative uid
+    res = records_to_frame(assemble_page(page_launches, page_details))
+
+    # printing the results to debug and have a live feedback of the scraping
+    print("RES")
+    print(res)
+
+    # returning the indexed dataframe of page launches
+    return res
+
+
+# 1.1) listing_url:
+# This Function builds the url of a listing page.
+#   As Arguments, the function takes the page (integer) and the "Future"/"Past" flag
+#   It returns the url as a string
+def listing_url(page, future=False):
+    # Now we edit the url of the page to download based on the launches we want to collect, reflecting
+    # the structure of the website. The format() method formats the specified value(s) and inserts them
+    # inside the string's placeholder, defined using curly brackets: {}.
+    if future:
+        return base_url + "/launches/?page={0}".format(page)
+    else:
+        return base_url + "/launches/past/?page={0}".format(page)
+
+
+# 1.2) scrape_listing:
+# This Function downloads a listing page and collects the launches shown in it (without their details).
+#   As Arguments, the function takes the page (integer) and the "Future"/"Past" flag
+#   It returns the list of launches of the page stored as dictionaries
+def scrape_listing(page, future=False):
+    url = listing_url(page, future)
+
+    # Downloading the page as previously defined
+    html = download(url, ttl=LISTING_CACHE_TTL)
+
+    # Parsing the page and collecting its launches (see parse_listing() in parsing.py)
+    return parse_listing(html, future)
+
+
+# 1.3) assemble_page:
+# This Function puts together the launches of a page and their detailed information.
+#   As Arguments, the function takes the list of launches (dictionaries) and the list of their details
+#   (dictionaries returned by get_detailed_info, in the same order)
+#   It returns the list of records of the page (one dictionary per launch)
+def assemble_page(page_launches, page_details):
+    # we merge each launch with its details in one dictionary (see records.py): building the DataFrame is left
+    # to the caller, which can do it once for all the pages instead of once per page
+    with metrics.stage("assemble"):
+        records = [make_record(launch, detail) for launch, detail in zip(page_launches, page_details)]
+    metrics.count("launches", len(records))
+
+    # printing a live feedback of the scraping
+    print("Scraped {0:0.0f} launches".format(len(records)))
+
+    return records
+
+
+# 1.4) crawl_pages:
+# This Function scrapes many listing pages as a pipeline: while the detail pages of a listing page are being
+# downloaded, the next listing pages are already fetched (up to PREFETCH_PAGES ahead) and their detail pages are
+# queued on the same pool of max_workers threads (see pipelined_crawl() in fetching.py).
+#   As Arguments, the function takes the pages to scrape (e.g. a range), the "Future"/"Past" flag and the number
+#   of detail pages to download at the same time (by default MAX_WORKERS)
+#   It yields the records of each page (see assemble_page), in the order of the pages
+def crawl_pages(pages, future=False, max_workers=None):
+    return pipelined_crawl(pages,
+                           lambda page: scrape_listing(page, future),
+                           lambda launch: get_launch_details(launch, future),
+                           assemble_page,
+                           max_workers=max_workers or MAX_WORKERS,
+                           prefetch=PREFETCH_PAGES)
+
+
+# 1.5) count_pages:
+# This Function reads how many listing pages the website has.
+#   As Arguments, the function takes the "Future"/"Past" flag
+#   It returns the number of pages (integer)
+def count_pages(future=False):
+    # initializing the url container with the first page, again we take advantage of the URL not changing
+    # across pages, i.e. ".../launches/past/?page=1" where 1 changes up to the last page
+    url = listing_url(1, future)
+
+    # we download the page
+    html = download(url, ttl=LISTING_CACHE_TTL)
+
+    # the number of pages is in the "LAST" button at the bottom of the page (see parse_page_count() in parsing.py)
+    return parse_page_count(html)
+
+
+# 1.6) stream_launches:
+# This Function scrapes the listing pages with the same pipeline as crawl_pages, but yields every launch as soon
+# as its detail page is parsed instead of a list per page, so that the launches can be processed while the next
+# ones are downloaded. The records can be passed to the sinks of streaming.py, e.g. to write them in a csv file
+# and print them at the same time:
+#   fan_out(stream_launches(range(1, 3)), [CsvSink("launches.csv"), PrintSink()])
+#   As Arguments, the function takes the pages to scrape (e.g. a range), the "Future"/"Past" flag and the number
+#   of detail pages to download at the same time (by default MAX_WORKERS)
+#   It yields the records of the launches (dictionaries, see records.py), in the order of the pages
+def stream_launches(pages, future=False, max_workers=None):
+    for launch, detail in streamed_crawl(pages,
+                                         lambda page: scrape_listing(page, future),
+                                         lambda launch: get_launch_details(launch, future),
+                                         max_workers=max_workers or MAX_WORKERS,
+                                         prefetch=PREFETCH_PAGES):
+        with metrics.stage("assemble"):
+            record = make_record(launch, detail)
+        metrics.count("launches")
+        yield record
+
+
+# 2) get_detailed_info
+# This Function opens the page including the data of a specific launch, stores the elements and returns
+# the findings. The specs on the page describe the rocket of the launch: when the rocket is given and its specs
+# were already read on the page of another launch (see vehicles.py), only the status of the mission is read and
+# the specs are copied from the other launch.
+#   As Arguments, the function takes the rocket launch id (integer), optionally the rocket (title_1) and the
+#   "Future"/"Past" flag
+#   It returns a dictionary with the detailed information of a launch (labels of the page and 'status')
+def get_detailed_info(rocket_id, vehicle=None, future=False):
+    try:
+        # As mentioned, each detail page is characterized by the unique identifier of the rocket launch it describes.
+        # In addition, each detailed page's URL is always "/launches/details/000" where 000 is the unique id, which
+        # we add through the format() method: it formats the specified value(s) and inserts them
+        # inside the string's placeholder, defined using curly brackets: {}.
+        url = base_url + "/launches/details/{0}".format(rocket_id)
+
+        # we then download the page, same as before: the page of an upcoming launch changes until the launch, hence
+        # a cached copy is only kept as long as a listing page
+        html = download(url, ttl=LISTING_CACHE_TTL if future else None)
+
+        # and we collect the information through parse_detail() (see parsing.py), or only the status through
+        # parse_status() if the specs of the rocket are known
+        specs = vehicle_specs.lookup(vehicle) if REUSE_VEHICLE_SPECS and vehicle is not None else None
+        if specs is not None:
+            infos = dict(specs)
+            infos.update(parse_status(html))
+        else:
+            infos = parse_detail(html)
+            if vehicle is not None:
+                vehicle_specs.remember(vehicle, infos)
+
+        # if everything goes well, we return the dictionary with the information on the launch: it is merged with
+        # the launch by the caller, hence we do not build a one-row DataFrame per launch
+        return infos
+
+    # otherwise, we print the exception, we count the launch as having lost its details (see metrics.py) and we
+    # return an empty dictionary
+    except Exception as e:
+        print(e)
+        metrics.drop("detail: " + type(e).__name__)
+        return {}
+
+
+# 2.1) get_launch_details
+# This Function gives the detailed information of a launch of a listing page (see get_detailed_info)
+#   As Arguments, the function takes the launch (dictionary with 'id' and 'title_1') and the "Future"/"Past" flag
+def get_launch_details(launch, future=False):
+    return get_detailed_info(launch['id'], launch.get('title_1'), future)
+
+
+# 3) read CSV
+# This Function reads the CSV file created by the scraping functions and returns data in a DataFrame
+# structure
+#   As Arguments, the function takes a String indicating whether past or future launches have to be read and
+#   optionally a flag to get the typed version of the data (see normalize.py: specs as numbers with their unit in
+#   the column name, categoricals, Country column and status as boolean) and the list of (typed) columns wanted
+#   It returns a panda DataFrame with the detailed information of a launch read from the csv file
+def read_csv(horizon, normalized=False, columns=None):
+    # the typed version is read from the Parquet/Feather file written next to the csv file (see storage.py),
+    # which is much faster than parsing the csv file and lets us read only the columns we need
+    if normalized:
+        try:
+            return load_launches(horizon, columns)
+        except Exception as e:
+            print(e)
+            return
+
+    # we read the file containing future or past launches specifying the date fields as they need
+    # to be stored as such, we handle common errors
+    try:
+        if horizon == "Future":
+            res = pd.read_csv("launches_from_2022.csv", parse_dates=['date'])
+        elif horizon == "Past":
+            res = pd.read_csv("launches_until_2022.csv", parse_dates=['date'])
+        else:
+            raise Exception(" Error while reading csv file, lines 260-280. "
+                            "Please pass as arguments either 'Past' or 'Future'")
+            return
+    except Exception as e:
+        print(e)
+        return
+
+    return res
+
+
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************   SCRAPING FUNCTIONS   *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# 4) scrape_past_launches()
+# This Function uses the previously defined functions to scrape the past launches pages and
+# to store data in csv files. It takes the number of pages to scrape (0: all of them) and optionally the number
+# of detail pages to download at the same time (by default MAX_WORKERS)
+
+def scrape_past_launches(page_scraped, max_workers=None):
+    # we read the number of pages from the first listing page. there should be around 215 past launches pages
+    # on the website
+    N_PAGES = count_pages()
+    print("Pages to scrape for past launches: {0:0.0f}".format(N_PAGES))
+
+    # ***********************************       WARNING:     *********************************************
+    # In the interest of time, we debug the program with 2 pages only. Comment the following line to
+    # scrape all the pages (it may take a while)
+    if page_scraped > 0:
+        N_PAGES = page_scraped
+
+    print("Currently Scraping: {0:0.0f}".format(N_PAGES))
+
+    # We loop through the pages of the website (see crawl_with_checkpoint() below), every page being saved in the
+    # checkpoint file as soon as it is scraped
+    checkpoint = crawl_with_checkpoint("Past", N_PAGES, max_workers=max_workers)
+
+    # We store past launches (in the Parquet/Feather file and as CSV, see storage.py), reading the records back
+    # from the checkpoint a few pages at a time, and handle common errors, then we count them again for the charts
+    # (see cube.py). The checkpoint is deleted only once the files are written
+    try:
+        save_launches_chunks((records_to_frame(records) for records in checkpoint.iter_records(last_page=N_PAGES)),
+                             "Past")
+        refresh_cube("Past")
+        checkpoint.close(remove=True)
+    except Exception as e:
+        checkpoint.close()
+        print("error while creating the csv file. Try closing any previously open .csv")
+        print(e)
+    return
+
+
+# 4.1) crawl_with_checkpoint()
+# This Function scrapes the listing pages 1 to n_pages with the crawl_pages() pipeline, which does for each page
+# what the scrape_page() function does (calling the detailed info function too) while fetching the next pages
+# ahead. The records of every page are written in the checkpoint file of the horizon as soon as the page is
+# complete, instead of being kept in memory, and the pages found in the checkpoint (left by a previous run
+# which was stopped) are not scraped again. The checkpoint is kept from one run to the next whatever the number of
+# pages, which grows when the website adds launches.
+#   As Arguments, the function takes the horizon ("Past" or "Future"), the number of pages, the "Future"/"Past"
+#   flag of the listing pages and the number of detail pages to download at the same time (by default MAX_WORKERS)
+#   It returns the CrawlCheckpoint holding the records of all the pages (see checkpoints.py)
+def crawl_with_checkpoint(horizon, n_pages, future=False, max_workers=None):
+    checkpoint = CrawlCheckpoint(checkpoint_path(launches_path(horizon, "csv")),
+                                 {'horizon': horizon}, resume=RESUME_CRAWL)
+
+    done = {page for page in checkpoint.done_pages() if page <= n_pages}
+    pages = [page for page in range(1, n_pages + 1) if page not in done]
+    if done:
+        print("Resuming the crawl: {0:0.0f} pages already scraped, {1:0.0f} to go".format(len(done), len(pages)))
+
+    # crawl_pages() gives the records of the pages in the order of the pages, hence we can zip them
+    try:
+        for page, records in zip(pages, crawl_pages(pages, future, max_workers)):
+            checkpoint.save_page(page, records)
+            print("Page {0:0.0f}: {1}".format(page, metrics.summary()))
+    except BaseException:
+        print("Crawl stopped, {0:0.0f} pages saved in {1}: run it again to resume".format(
+            len(checkpoint.done_pages()), checkpoint.path))
+        checkpoint.close()
+        raise
+
+    return checkpoint
+
+
+# 5) scrape_future_launches()
+# This Function uses the previously defined functions to scrape the upcoming launches pages and
+# to store data in csv files. It optionally takes the number of detail pages to download at the same time (by
+# default MAX_WORKERS)
+
+def scrape_future_launches(max_workers=None):
+    # we read the number of pages from the first listing page. There should be around 11 upcoming launches pages
+    # on the website
+    N_PAGES_FUTURE = count_pages(future=True)
+    print("Pages to scrape for future launches: {0:0.0f}".format(N_PAGES_FUTURE))
+
+    # ***********************************       WARNING:     *********************************************
+    # In the interest of time, we debug the program with 2 pages only. Comment the following line to
+    # scrape all the pages (it may take a while)
+    N_PAGES_FUTURE = 10
+    print("Currently Scraping: {0:0.0f}".format(N_PAGES_FUTURE))
+
+    # We loop through the pages of the website, every page being saved in the checkpoint file as soon as it is
+    # scraped (see crawl_with_checkpoint())
+    checkpoint = crawl_with_checkpoint("Future", N_PAGES_FUTURE, future=True, max_workers=max_workers)
+
+    # We store future launches (in the Parquet/Feather file and as CSV, see storage.py) and we count them for
+    # the charts (see cube.py)
+    save_launches_chunks((records_to_frame(records)
+                          for records in checkpoint.iter_records(last_page=N_PAGES_FUTURE)), "Future")
+    refresh_cube("Future")
+    checkpoint.close(remove=True)
+
+    return
+
+
+# 6) update_past_launches()
+# This Function adds to the csv file of the past launches only the launches that are not in it yet. Since the
+# website lists the launches from the newest to the oldest, we go through the listing pages only until we find
+# a launch whose id we already know, and we download the detail pages of the new launches only.
+#   As Arguments, the function optionally takes the maximum number of listing pages to go through and the number
+#   of detail pages to download at the same time (by default MAX_WORKERS)
+#   It returns the number of launches added
+
+def update_past_launches(max_pages=None, max_workers=None):
+    # we read the launches we already have, if any, and collect their ids
+    known = read_csv("Past")
+    if known is None:
+        known = pd.DataFrame(columns=['id'])
+    known_ids = set(known['id'])
+
+    N_PAGES = count_pages()
+    if max_pages is not None:
+        N_PAGES = min(N_PAGES, max_pages)
+
+    # we go through the listing pages keeping the launches we do not know and we stop at the first page
+    # containing a known launch (the launches after it are older, hence already known)
+    new_launches = []
+    for page in range(1, N_PAGES + 1):
+        page_launches = scrape_listing(page)
+        page_new = [launch for launch in page_launches if launch['id'] not in known_ids]
+        new_launches += page_new
+        if not page_launches or len(page_new) < len(page_launches):
+            break
+
+    print("New launches found: {0:0.0f}".format(len(new_launches)))
+    if not new_launches:
+        return 0
+
+    # we download the detail pages of the new launches only, and we put them in front of the launches we had,
+    # replacing any launch scraped twice with its latest version
+    # the specs of the rockets already known are taken from the saved launches (see vehicles.py)
+    if not known.empty:
+        vehicle_specs.remember_frame(known)
+    new_details = fetch_all(get_launch_details, new_launches, max_workers or MAX_WORKERS)
+    new = records_to_frame(assemble_page(new_launches, new_details))
+    known = known.set_index('id')
+    res = pd.concat([new, known[~known.index.isin(new.index)]], sort=True)
+
+    # We store past launches (in the Parquet/Feather file and as CSV, see storage.py) and handle common errors,
+    # then we add the new launches to the counts used by the charts (see cube.py)
+    try:
+        save_launches(res, "Past")
+        update_cube(new, "Past")
+    except Exception as e:
+        print("error while creating the csv file. Try closing any previously open .csv")
+        print(e)
+    return len(new_launches)
@@ -0,0 +1,355 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************        STORAGE         *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module stores the launches in a columnar file next to the csv files:
+#   - the launches are stored typed (see normalize.py) in a Parquet or Feather file, which is read back without
+#     parsing any text, with the right types and only with the columns asked for (e.g. the charts only need
+#     'Country', 'year' and 'Decade')
+#   - the files are read through a memory map, so the operating system only loads the pages of the file which
+#     are needed
+#   - the csv files are still written, as an export that can be opened in Excel, and if a csv file is newer
+#     than its columnar file (or the columnar file is missing) the columnar file is rebuilt from the csv file
+# Parquet and Feather files are written and read with pyarrow. Without pyarrow, the launches are read from the
+# csv files as before. The specs of the rockets are stored once per rocket, in a vehicle table written next to the
+# columnar file of the launches (see vehicles.py), and put back into the launches when they are read. The saved
+# launches are also upserted in the SQLite database of the launches, which answers
+# the filtered queries (see database.py).
+
+import os
+import time
+from contextlib import nullcontext
+
+import pandas as pd
+
+from .database import DATABASE_NAME, LaunchStore, load_csv_files
+from .normalize import VEHICLE_SPECS, normalize_launches
+from .records import LAUNCH_COLUMNS
+from .vehicles import join_vehicles, split_vehicles
+
+# Pyarrow is an optional dependency: without it only the csv files are used
+try:
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Name of the files of each horizon, without extension
+FILE_NAMES = {"Past": "launches_until_2022", "Future": "launches_from_2022"}
+
+# Format of the columnar files: "parquet" (compressed, smaller) or "feather" (Arrow IPC, faster to read)
+STORE_FORMAT = "parquet"
+
+# Whether the csv files are still written when the launches are saved
+EXPORT_CSV = True
+
+# Whether the saved launches are also upserted in the database of the launches (see database.py)
+UPSERT_DATABASE = True
+
+# Number of launches read at a time from the csv file by save_launches_chunks
+CSV_CHUNK_ROWS = 1000
+
+# Columns of the csv files holding text, read as strings whatever their content
+TEXT_COLUMNS = [column for column in LAUNCH_COLUMNS if column != 'date'] + ['Status']
+
+# Extension of the files of each format
+EXTENSIONS = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+
+
+# 1) launches_path
+# This Function gives the path of the file storing the launches of a horizon.
+#   As Arguments, the function takes the horizon ("Past" or "Future"), the format and the folder of the files
+#   It returns the path as a string
+def launches_path(horizon, file_format=None, directory="."):
+    if horizon not in FILE_NAMES:
+        raise ValueError("Please pass as arguments either 'Past' or 'Future'")
+    return os.path.join(directory, FILE_NAMES[horizon] + EXTENSIONS[file_format or STORE_FORMAT])
+
+
+# 1.1) vehicles_path
+# This Function gives the path of the file storing the vehicles of a horizon (see vehicles.py), next to the
+# columnar file of the launches.
+#   As Arguments, the function takes the horizon and the folder of the files
+#   It returns the path as a string
+def vehicles_path(horizon, directory="."):
+    root, extension = os.path.splitext(launches_path(horizon, directory=directory))
+    return root + "_vehicles" + extension
+
+
+# 2) save_launches
+# This Function saves the launches of a horizon: typed in the columnar file and as they were scraped in the csv
+# file (if EXPORT_CSV is set or pyarrow is not installed), and in the database of the launches.
+#   As Arguments, the function takes the DataFrame of the launches indexed by id (as built by the scrapers), the
+#   horizon and the folder of the files
+def save_launches(res, horizon, directory="."):
+    if EXPORT_CSV or pyarrow is None:
+        res.to_csv(launches_path(horizon, "csv", directory))
+    if pyarrow is not None or UPSERT_DATABASE:
+        typed = normalize_launches(res.reset_index())
+        if pyarrow is not None:
+            write_store(typed, horizon, directory)
+        if UPSERT_DATABASE:
+            save_database(typed, horizon, directory)
+
+
+# 2.1) save_launches_chunks
+# This Function saves the launches of a horizon given a few at a time (e.g. read back from a crawl checkpoint,
+# see checkpoints.py), without ever holding all of them in one DataFrame: each chunk is appended to the csv file,
+# then the csv file is read back CSV_CHUNK_ROWS launches at a time (see read_csv_chunks), and every typed chunk is
+# appended to the columnar file (see TableWriter) and upserted in the database. Only the vehicles, a few hundred
+# rows, are gathered until the end.
+#   As Arguments, the function takes an iterable of DataFrames indexed by id (with the same columns), the horizon
+#   and the folder of the files
+#   It returns the number of launches saved
+def save_launches_chunks(chunks, horizon, directory="."):
+    csv_path = launches_path(horizon, "csv", directory)
+    tmp = csv_path + ".tmp"
+    count = 0
+    with open(tmp, "w", newline="") as f:
+        for number, res in enumerate(chunks):
+            res.to_csv(f, header=number == 0)
+            count += len(res)
+    os.replace(tmp, csv_path)
+    if count == 0 or (pyarrow is None and not UPSERT_DATABASE):
+        return count
+
+    writer = TableWriter(launches_path(horizon, directory=directory)) if pyarrow is not None else None
+    vehicles = []
+    try:
+        with LaunchStore(os.path.join(directory, DATABASE_NAME)) if UPSERT_DATABASE else nullcontext() as store:
+            if store is not None and store.created:
+                load_csv_files(store, [other for other in FILE_NAMES if other != horizon], directory)
+            updated_at = time.time()
+            for typed in read_csv_chunks(csv_path):
+                if writer is not None:
+                    launches, chunk_vehicles = split_vehicles(typed)
+                    writer.write(launches)
+                    vehicles.append(chunk_vehicles)
+                if store is not None:
+                    store.upsert(typed, horizon, updated_at)
+            if store is not None:
+                store.prune(horizon, updated_at)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+
+    if writer is not None:
+        # the chunks have their own categories of title_1, we gather the vehicles as strings first
+        vehicles = pd.concat([chunk.astype({'title_1': object}) for chunk in vehicles], ignore_index=True) \
+            .drop_duplicates('title_1').reset_index(drop=True)
+        vehicles['title_1'] = vehicles['title_1'].astype(str).astype("category")
+        write_table(vehicles, vehicles_path(horizon, directory))
+        writer.close()
+    return count
+
+
+# 2.2) save_database
+# This Function upserts all the launches of a horizon in the database of the launches (see database.py) and
+# removes from it the launches of the horizon which are not among them any more. When the database is new, the
+# launches of the other horizon are read from their csv file first.
+#   As Arguments, the function takes the typed DataFrame (with an 'id' column), the horizon and the folder
+def save_database(typed, horizon, directory="."):
+    with LaunchStore(os.path.join(directory, DATABASE_NAME)) as store:
+        if store.created:
+            load_csv_files(store, [other for other in FILE_NAMES if other != horizon], directory)
+        updated_at = time.time()
+        store.upsert(typed, horizon, updated_at)
+        store.prune(horizon, updated_at)
+
+
+# 3) write_store
+# This Function writes the typed launches in the columnar file, their specs being written once per vehicle in the
+# file of the vehicles.
+#   As Arguments, the function takes the typed DataFrame (with an 'id' column), the horizon and the folder
+def write_store(typed, horizon, directory="."):
+    launches, vehicles = split_vehicles(typed)
+    write_table(vehicles, vehicles_path(horizon, directory))
+    write_table(launches, launches_path(horizon, directory=directory))
+
+
+# 3.1) write_table
+# This Function writes a DataFrame in a columnar file, in the format of STORE_FORMAT.
+#   As Arguments, the function takes the DataFrame and the path of the file
+def write_table(res, path):
+    # the file is written next to the old one and renamed, so that a reader never sees half a file
+    tmp = path + ".tmp"
+    table = pyarrow.Table.from_pandas(res, preserve_index=False)
+    if STORE_FORMAT == "feather":
+        # without compression the columns can be used straight from the memory map
+        pyarrow.feather.write_feather(table, tmp, compression="uncompressed")
+    else:
+        pyarrow.parquet.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+# 3.2) TableWriter
+# This class writes a columnar file one DataFrame at a time (e.g. the chunks of save_launches_chunks), next to its
+# final path: close() renames it, abort() removes it. The schema is taken from the first DataFrame: a column empty
+# in it has no type yet, it is stored as strings, and the dictionaries of the categoricals are indexed with int32
+# so that any later DataFrame fits.
+# A Parquet file gets one row group per DataFrame, whose dictionaries may differ from a row group to the next and
+# are read back as categoricals. A Feather file (Arrow IPC) allows only one dictionary per column: the DataFrames
+# are first written in a temporary Parquet file, then copied one row group at a time, every categorical getting
+# the categories of all the row groups.
+#   As Arguments, the constructor takes the path of the file and its format (by default STORE_FORMAT)
+class TableWriter:
+    def __init__(self, path, file_format=None):
+        self.path = path
+        self.file_format = file_format or STORE_FORMAT
+        self.parquet_path = path + (".tmp" if self.file_format == "parquet" else ".parquet.tmp")
+        self.schema = None
+        self.writer = None
+        self.categories = {}
+
+    # 3.2.1) write
+    # This Method appends a DataFrame (typed, with the same columns as the previous ones) to the file
+    def write(self, res):
+        table = pyarrow.Table.from_pandas(res, preserve_index=False)
+        if self.writer is None:
+            fields = []
+            for field in table.schema:
+                if pyarrow.types.is_null(field.type):
+                    field = field.with_type(pyarrow.string())
+                elif pyarrow.types.is_dictionary(field.type):
+                    field = field.with_type(pyarrow.dictionary(pyarrow.int32(), field.type.value_type))
+                fields.append(field)
+            self.schema = pyarrow.schema(fields, metadata=table.schema.metadata)
+            self.writer = pyarrow.parquet.ParquetWriter(self.parquet_path, self.schema)
+        self.writer.write_table(table.cast(self.schema))
+        for column in res.select_dtypes("category"):
+            self.categories.setdefault(column, set()).update(res[column].cat.categories)
+
+    # 3.2.2) close
+    # This Method finishes the file and puts it at its final path (nothing is written if no DataFrame was given)
+    def close(self):
+        if self.writer is None:
+            return
+        self.writer.close()
+        if self.file_format == "feather":
+            self.write_feather()
+            os.remove(self.parquet_path)
+        else:
+            os.replace(self.parquet_path, self.path)
+
+    def write_feather(self):
+        tmp = self.path + ".tmp"
+        source = pyarrow.parquet.ParquetFile(self.parquet_path)
+        categories = {column: sorted(values) for column, values in self.categories.items()}
+        # without compression the columns can be used straight from the memory map
+        with pyarrow.ipc.new_file(tmp, self.schema) as writer:
+            for row_group in range(source.num_row_groups):
+                res = source.read_row_group(row_group).to_pandas()
+                for column, values in categories.items():
+                    res[column] = res[column].cat.set_categories(values)
+                writer.write_table(pyarrow.Table.from_pandas(res, preserve_index=False).cast(self.schema))
+        os.replace(tmp, self.path)
+
+    # 3.2.3) abort
+    # This Method removes what was written
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+            os.remove(self.parquet_path)
+
+
+# 4) load_launches
+# This Function reads the typed launches of a horizon, from the columnar file when possible. The specs of the
+# rockets are read from the file of the vehicles only when they are asked for.
+#   As Arguments, the function takes the horizon, optionally the list of columns to read (by default all of them,
+#   see normalize.py for their names) and the folder of the files
+#   It returns the typed DataFrame of the launches
+def load_launches(horizon, columns=None, directory="."):
+    path = launches_path(horizon, directory=directory)
+    csv_path = launches_path(horizon, "csv", directory)
+    vehicles = vehicles_path(horizon, directory)
+
+    if pyarrow is None:
+        return read_csv_typed(csv_path, columns)
+
+    # the columnar files are (re)built when they are missing, older than the csv file or written by a previous
+    # version of the program without some of the columns asked for
+    stale = not os.path.exists(path) or not os.path.exists(vehicles) or (
+        os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(path)) or (
+        columns is not None and not set(columns) <= set(stored_columns(path)) | set(stored_columns(vehicles)))
+    if stale:
+        typed = read_csv_typed(csv_path)
+        write_store(typed, horizon, directory)
+        return typed[columns] if columns is not None else typed
+
+    # the specs asked for are looked up in the vehicles through title_1, which is read even if it is not asked for
+    specs = [column for column in columns or VEHICLE_SPECS if column in VEHICLE_SPECS]
+    launch_columns = None
+    if columns is not None:
+        launch_columns = [column for column in columns if column not in VEHICLE_SPECS]
+        if specs and 'title_1' not in launch_columns:
+            launch_columns.append('title_1')
+
+    res = read_table(path, launch_columns)
+    if specs:
+        res = join_vehicles(res, read_table(vehicles, ['title_1'] + specs), specs)
+    return res[columns] if columns is not None else res
+
+
+# 4.1) read_table
+# This Function reads some columns of a columnar file through a memory map.
+#   As Arguments, the function takes the path of the file and the list of columns (None: all of them)
+#   It returns the DataFrame
+def read_table(path, columns=None):
+    if STORE_FORMAT == "feather":
+        table = pyarrow.feather.read_table(path, columns=columns, memory_map=True)
+    else:
+        table = pyarrow.parquet.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+# 4.2) load_vehicles
+# This Function reads the table of the vehicles of a horizon: one row per rocket (title_1) with its typed specs.
+#   As Arguments, the function takes the horizon and the folder of the files
+#   It returns the DataFrame of the vehicles
+def load_vehicles(horizon, directory="."):
+    if pyarrow is None:
+        return split_vehicles(read_csv_typed(launches_path(horizon, "csv", directory)))[1]
+    load_launches(horizon, ['title_1'], directory)
+    return read_table(vehicles_path(horizon, directory))
+
+
+# 4.3) stored_columns
+# This Function reads the names of the columns of a columnar file, without reading the data.
+#   As Arguments, the function takes the path of the file
+#   It returns the list of the names
+def stored_columns(path):
+    if STORE_FORMAT == "feather":
+        with pyarrow.memory_map(path) as source:
+            return pyarrow.ipc.open_file(source).schema.names
+    return pyarrow.parquet.read_schema(path).names
+
+
+# 5) read_csv_typed
+# This Function reads the launches from a csv file and converts them to their typed version.
+#   As Arguments, the function takes the path of the csv file and optionally the list of columns wanted
+#   It returns the typed DataFrame
+def read_csv_typed(csv_path, columns=None):
+    typed = normalize_launches(pd.read_csv(csv_path, parse_dates=['date']))
+    return typed[columns] if columns is not None else typed
+
+
+# 5.1) read_csv_chunks
+# This Function reads the launches from a csv file a chunk at a time and converts every chunk to its typed
+# version. The text columns are read as strings, so that a chunk where one of them is empty gets the same types
+# as the others.
+#   As Arguments, the function takes the path of the csv file and the number of launches of a chunk
+#   It yields the typed DataFrames
+def read_csv_chunks(csv_path, chunk_rows=None):
+    text = {column: str for column in TEXT_COLUMNS}
+    for res in pd.read_csv(csv_path, parse_dates=['date'], dtype=text, chunksize=chunk_rows or CSV_CHUNK_ROWS):
+        yield normalize_launches(res)
@@ -0,0 +1,231 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************       STREAMING        *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# This module lets the launches be processed while they are scraped, instead of waiting for the DataFrame of all
+# the launches. stream_launches() in main.py yields one record (dictionary, see records.py) as soon as a launch
+# and its detail page are parsed, and fan_out() passes every record to a list of "sinks":
+#   - CsvSink and ParquetSink write the launches to a file, a chunk of records at a time
+#   - CubeSink counts the launches for the charts (see cube.py)
+#   - PrintSink prints one line per launch, as a live feedback
+# Each sink runs in its own thread and receives the records through a bounded queue: a slow sink makes the
+# scraping wait instead of letting the records pile up in memory, hence the memory used does not grow with the
+# number of launches scraped.
+# A sink is any object with a write(record) method, called for every record, and a close() method, called once
+# at the end, whose return value is given back by fan_out(). If the stream fails, the optional abort() method is
+# called instead of close().
+
+import abc
+import os
+import queue
+import sys
+import threading
+
+from . import storage
+from .cube import build_cube, merge_cubes
+from .normalize import normalize_launches
+from .records import records_to_frame
+
+
+# ********************************************************************************************************
+# ***********************************     Global Variables   *********************************************
+# ********************************************************************************************************
+
+# Maximum number of records waiting in the queue of each sink
+BUFFER_SIZE = 256
+
+# Number of records a file sink gathers before writing them
+CHUNK_SIZE = 500
+
+
+# 1) fan_out
+# This Function passes every record of a stream to each sink, each sink running in its own thread behind a
+# queue of at most buffer_size records. If a sink fails, the stream is stopped and the error is raised again
+# in the caller's thread.
+#   As Arguments, the function takes the stream of records (any iterable, e.g. stream_launches()), the list of
+#   sinks and the size of the queues
+#   It returns the list of the values returned by the close() method of the sinks
+def fan_out(records, sinks, buffer_size=BUFFER_SIZE):
+    queues = [queue.Queue(maxsize=max(buffer_size, 1)) for sink in sinks]
+    results = [None] * len(sinks)
+    errors = []
+    failed = threading.Event()
+    done, aborted = object(), object()
+
+    def consume(index):
+        sink, sink_queue = sinks[index], queues[index]
+        try:
+            while True:
+                record = sink_queue.get()
+                if record is done:
+                    results[index] = sink.close()
+                    return
+                if record is aborted:
+                    if hasattr(sink, "abort"):
+                        sink.abort()
+                    return
+                sink.write(record)
+        except Exception as e:
+            errors.append(e)
+            failed.set()
+
+    def put(sink_queue, entry):
+        # we retry the put so that we notice when a sink failed while its queue is full
+        while not failed.is_set():
+            try:
+                sink_queue.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    threads = [threading.Thread(target=consume, args=(index,), daemon=True) for index in range(len(sinks))]
+    for thread in threads:
+        thread.start()
+
+    end = aborted
+    try:
+        for record in records:
+            if not all(put(sink_queue, record) for sink_queue in queues):
+                break
+        end = done
+    finally:
+        # the sinks are closed once they went through the records they received, or aborted if the stream failed
+        if failed.is_set():
+            end = aborted
+        for sink_queue, thread in zip(queues, threads):
+            while thread.is_alive():
+                try:
+                    sink_queue.put(end, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return results
+
+
+# 2) ChunkedSink
+# This class gathers the records in chunks of chunk_size and passes each chunk, as a DataFrame indexed by id
+# (see records_to_frame), to its write_chunk() method. It is the base of the file sinks, which must define
+# write_chunk(); it cannot be used by itself.
+class ChunkedSink(abc.ABC):
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.chunk = []
+        self.count = 0
+
+    def write(self, record):
+        self.chunk.append(record)
+        if len(self.chunk) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.chunk:
+            self.write_chunk(records_to_frame(self.chunk))
+            self.count += len(self.chunk)
+            self.chunk = []
+
+    @abc.abstractmethod
+    def write_chunk(self, res):
+        pass
+
+    def close(self):
+        self.flush()
+        return self.count
+
+
+# 2.1) CsvSink
+# This class writes the records in a csv file, in the same format as save_launches (see storage.py). The file is
+# written next to its final path and renamed at the end, so that a stopped stream never leaves half a file.
+#   As Arguments, the constructor takes the path of the csv file and the number of records written at a time
+#   Its close() method returns the number of launches written
+class CsvSink(ChunkedSink):
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        super().__init__(chunk_size)
+        self.path = path
+        self.file = open(path + ".tmp", "w", newline="")
+
+    def write_chunk(self, res):
+        res.to_csv(self.file, header=self.count == 0)
+
+    def close(self):
+        count = super().close()
+        if count == 0:
+            # the header is written even if there is no launch
+            records_to_frame([]).to_csv(self.file)
+        self.file.close()
+        os.replace(self.path + ".tmp", self.path)
+        return count
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.path + ".tmp")
+
+
+# 2.2) ParquetSink
+# This class writes the typed records (see normalize.py) in a Parquet file, one row group per chunk (see
+# TableWriter in storage.py). It needs pyarrow.
+#   As Arguments, the constructor takes the path of the Parquet file and the number of records written at a time
+#   Its close() method returns the number of launches written
+class ParquetSink(ChunkedSink):
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        if storage.pyarrow is None:
+            raise ImportError("pyarrow is required to write Parquet files")
+        super().__init__(chunk_size)
+        self.path = path
+        self.writer = storage.TableWriter(path, "parquet")
+
+    def write_chunk(self, res):
+        self.writer.write(normalize_launches(res.reset_index()))
+
+    def close(self):
+        count = super().close()
+        self.writer.close()
+        return count
+
+    def abort(self):
+        self.writer.abort()
+
+
+# 2.3) CubeSink
+# This class counts the launches per (year, Country, company, base) while they are streamed, adding the cube of
+# every chunk to the cube of the previous ones (see cube.py).
+#   As Arguments, the constructor takes the number of records counted at a time
+#   Its close() method returns the cube
+class CubeSink(ChunkedSink):
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        super().__init__(chunk_size)
+        self.cube = None
+
+    def write_chunk(self, res):
+        cube = build_cube(res)
+        self.cube = cube if self.cube is None else merge_cubes(self.cube, cube)
+
+    def close(self):
+        super().close()
+        return self.cube if self.cube is not None else build_cube(records_to_frame([]))
+
+
+# 2.4) PrintSink
+# This class prints one line per launch: its id, date, rocket and mission.
+#   As Arguments, the constructor takes the stream to print to (by default the standard output)
+#   Its close() method returns the number of launches printed
+class PrintSink:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.count = 0
+
+    def write(self, record):
+        print("{0} | {1} | {2} | {3}".format(record['id'], record.get('date'), record.get('title_1'),
+                                             record.get('title_2')), file=self.stream)
+        self.count += 1
+
+    def close(self):
+        self.stream.flush()
+        return self.count
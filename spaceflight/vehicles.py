@@ -0,0 +1,148 @@
+# ********************************************************************************************************
+# ***********************************                        *********************************************
+# ***********************************        VEHICLES        *********************************************
+# ***********************************                        *********************************************
+# ********************************************************************************************************
+
+# The specs shown on a detail page (Fairing Diameter, Liftoff Thrust, Payload to LEO/GTO, Price, Stages,
+# Strap-ons...) describe the rocket of the launch, its "vehicle" (title_1, e.g. "Falcon 9 Block 5"), not the
+# launch itself: the ~3000 past launches only have ~270 different vehicles. This module handles them once per
+# vehicle:
+#   - while crawling, VehicleSpecs remembers the specs of every vehicle met: the detail page of a launch whose
+#     vehicle is already known is only read for the status of the mission (see parse_status in parsing.py) and
+#     the remembered specs are copied into the launch. The page itself is still downloaded, since the status is
+#     only written there
+#   - the typed launches are stored without the specs, which go to a vehicle table (one row per vehicle, see
+#     storage.py and database.py): the launches reference their vehicle by its name (title_1), split_vehicles()
+#     and join_vehicles() go from one form to the other
+#   - nothing forces the launches of a vehicle to carry the same specs (the website may change them between two
+#     crawls): the vehicle gets, for every spec, the first value given by its launches, the newest one since the
+#     website lists the launches from the newest, and the vehicles whose launches give other values are reported
+#     with a warning (see vehicle_rows), since these values are not stored
+
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .metrics import metrics
+from .normalize import VEHICLE_SPECS
+from .records import VEHICLE_COLUMNS
+
+
+# 1) VehicleSpecs
+# This class remembers the specs of the vehicles scraped so far. The detail pages are downloaded by many threads
+# at the same time (see fetch_all in fetching.py), hence the dictionary is guarded by a lock.
+class VehicleSpecs:
+    def __init__(self):
+        self._specs = {}
+        self._lock = threading.Lock()
+
+    # 1.1) lookup
+    # This Method gives the specs of a vehicle, if they are known.
+    #   As Arguments, the method takes the name of the vehicle (title_1)
+    #   It returns the dictionary of the specs (labels of the detail page), or None
+    def lookup(self, vehicle):
+        with self._lock:
+            specs = self._specs.get(vehicle)
+        if specs is not None:
+            metrics.count("vehicle_specs_reused")
+        return specs
+
+    # 1.2) remember
+    # This Method keeps the specs read on the detail page of a launch of a vehicle.
+    #   As Arguments, the method takes the name of the vehicle and the detailed information of the launch
+    def remember(self, vehicle, infos):
+        specs = {label: value for label, value in infos.items() if label in VEHICLE_COLUMNS}
+        with self._lock:
+            self._specs.setdefault(vehicle, specs)
+
+    # 1.3) remember_frame
+    # This Method keeps the specs of the vehicles of launches already scraped (e.g. read back from the csv file),
+    # without reading the detail pages again.
+    #   As Arguments, the method takes the DataFrame of the launches as scraped (with title_1 and the spec labels)
+    def remember_frame(self, res):
+        labels = [label for label in VEHICLE_COLUMNS if label in res]
+        vehicles = vehicle_rows(res, labels)
+        for row in vehicles.itertuples(index=False, name=None):
+            self.remember(row[0], {label: value for label, value in zip(labels, row[1:])
+                                   if isinstance(value, str) or not pd.isna(value)})
+
+    # 1.4) clear
+    # This Method forgets all the vehicles
+    def clear(self):
+        with self._lock:
+            self._specs.clear()
+
+    def __len__(self):
+        return len(self._specs)
+
+
+# 2) split_vehicles
+# This Function splits the typed launches (see normalize.py) into the launches without the specs and the table of
+# their vehicles.
+#   As Arguments, the function takes the typed DataFrame of the launches
+#   It returns the DataFrame of the launches (title_1 being the key of the vehicle) and the DataFrame of the
+#   vehicles (title_1 and the typed specs, one row per vehicle)
+def split_vehicles(typed):
+    specs = [column for column in VEHICLE_SPECS if column in typed]
+    return typed.drop(columns=specs), vehicle_rows(typed, specs)
+
+
+# 2.1) vehicle_rows
+# This Function gathers the specs of every vehicle from its launches: for every spec, the first value given by a
+# launch of the vehicle (missing values are skipped). A launch giving another value would lose it once joined back
+# to its vehicle, hence the vehicles concerned are reported with a warning, with the specs which differ.
+#   As Arguments, the function takes the DataFrame of the launches (typed or as scraped) and the spec columns
+#   It returns the DataFrame of the vehicles: title_1 and the specs, one row per vehicle in the order the vehicles
+#   first appear
+def vehicle_rows(res, columns):
+    res = res[['title_1'] + columns].dropna(subset=['title_1'])
+    vehicles = res.groupby('title_1', sort=False, observed=True)[columns].first()
+
+    # the value kept for every launch, compared to the value given by the launch when there is one
+    kept = vehicles.loc[res['title_1']]
+    conflicts = {}
+    for column in columns:
+        given, chosen = res[column].to_numpy(object), kept[column].to_numpy(object)
+        known = np.asarray(pd.notna(given))
+        differs = np.zeros(len(given), dtype=bool)
+        differs[known] = given[known] != chosen[known]
+        for title in res['title_1'].to_numpy(object)[differs]:
+            conflicts.setdefault(title, []).append(column)
+    if conflicts:
+        described = ["{0} ({1})".format(title, ", ".join(sorted(set(specs))))
+                     for title, specs in list(conflicts.items())[:5]]
+        warnings.warn("The launches of {0} vehicles give different specs, the first value of each spec is kept: "
+                      "{1}{2}".format(len(conflicts), "; ".join(described), "; ..." if len(conflicts) > 5 else ""),
+                      stacklevel=3)
+    return vehicles.reset_index()
+
+
+# 3) join_vehicles
+# This Function puts the specs of their vehicle back into the launches. There are only a few hundred vehicles,
+# hence we look the vehicles up once per category of title_1, and the launches through their category codes,
+# instead of merging the two tables.
+#   As Arguments, the function takes the DataFrame of the launches (with title_1), the DataFrame of the vehicles
+#   and optionally the list of specs wanted (by default all of them)
+#   It returns a new DataFrame, the specs being placed after the id as in the csv files
+def join_vehicles(launches, vehicles, specs=None):
+    specs = [column for column in specs or VEHICLE_SPECS if column in vehicles]
+    title = launches['title_1'].astype("category")
+
+    # the row of the vehicle of every category of title_1 (-1 if the vehicle is unknown), then of every launch
+    # (-1 for the launches without vehicle, code -1): the row -1 is an empty row added at the end of the vehicles
+    vehicles = vehicles.drop_duplicates('title_1')
+    rows = pd.Index(vehicles['title_1'].astype(object)).get_indexer(title.cat.categories.astype(object))
+    codes = title.cat.codes.to_numpy()
+    rows = np.where(codes < 0, -1, rows[codes]) if len(rows) else np.full(len(codes), -1)
+    lookup = vehicles[specs].reset_index(drop=True).reindex(range(len(vehicles) + 1))
+    joined = lookup.iloc[rows].set_axis(launches.index, axis=0)
+
+    position = launches.columns.get_loc('id') + 1 if 'id' in launches else 0
+    return pd.concat([launches.iloc[:, :position], joined, launches.iloc[:, position:]], axis=1)
+
+
+# The vehicles met by the crawls of the program (see get_detailed_info in scraper.py)
+vehicle_specs = VehicleSpecs()